@@ -0,0 +1,8 @@
+
+      #include <number.h>
+      int count() {
+        int result = get_number();
+        set_number(result + 1);
+        return result;
+      }
+    
\ No newline at end of file
@@ -0,0 +1,6 @@
+
+      #ifndef _COUNTER_H
+      #define _COUNTER_H
+      extern int count(void);
+      #endif
+    
\ No newline at end of file
@@ -0,0 +1,7 @@
+
+      #include <number.h>
+
+      static int _number;
+      void set_number(int number) { _number = number; }
+      int get_number() { return _number; }
+    
\ No newline at end of file
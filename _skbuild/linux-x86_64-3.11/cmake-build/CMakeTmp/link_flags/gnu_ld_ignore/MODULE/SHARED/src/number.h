@@ -0,0 +1,7 @@
+
+      #ifndef _NUMBER_H
+      #define _NUMBER_H
+      extern void set_number(int);
+      extern int get_number(void);
+      #endif
+    
\ No newline at end of file
@@ -231,6 +231,7 @@ def setup_package():
         platforms=["Linux", "Mac OS-X", 'Windows'],
         entry_points={
           'console_scripts': [
+              'sfepy-benchmark=sfepy.scripts.benchmark:main',
               'sfepy-convert=sfepy.scripts.convert_mesh:main',
               'sfepy-mesh=sfepy.scripts.gen_mesh:main',
               'sfepy-probe=sfepy.scripts.probe:main',
@@ -2,7 +2,9 @@ from __future__ import absolute_import
 from __future__ import print_function
 import sys
 import os
+import itertools
 from copy import copy, deepcopy
+from collections.abc import MutableMapping
 from types import MethodType
 from .getch import getch
 
@@ -32,51 +34,52 @@ def get_debug():
     """
     Utility function providing ``debug()`` function.
     """
-    try:
-        import IPython
+    old_excepthook = sys.excepthook
 
-    except ImportError:
-        debug = None
+    def debug(frame=None, frames_back=1):
+        # IPython is imported only when needed, as it takes long to import.
+        try:
+            import IPython
 
-    else:
-        old_excepthook = sys.excepthook
+        except ImportError:
+            import pdb
+            if frame is None:
+                frame = sys._getframe(frames_back)
+
+            pdb.Pdb().set_trace(frame)
+            return
 
-        def debug(frame=None, frames_back=1):
-            if IPython.__version__ >= '0.11':
-                from IPython.core.debugger import Pdb
+        if IPython.__version__ >= '0.11':
+            from IPython.core.debugger import Pdb
 
-                try:
-                    ip = get_ipython()
+            try:
+                ip = get_ipython()
 
-                except NameError:
-                    from IPython.frontend.terminal.embed \
-                         import InteractiveShellEmbed
-                    ip = InteractiveShellEmbed()
+            except NameError:
+                from IPython.frontend.terminal.embed \
+                     import InteractiveShellEmbed
+                ip = InteractiveShellEmbed()
 
-                colors = ip.colors
+            colors = ip.colors
 
-            else:
-                from IPython.Debugger import Pdb
-                from IPython.Shell import IPShell
-                from IPython import ipapi
+        else:
+            from IPython.Debugger import Pdb
+            from IPython.Shell import IPShell
+            from IPython import ipapi
 
+            ip = ipapi.get()
+            if ip is None:
+                IPShell(argv=[''])
                 ip = ipapi.get()
-                if ip is None:
-                    IPShell(argv=[''])
-                    ip = ipapi.get()
 
-                colors = ip.options.colors
+            colors = ip.options.colors
 
-            sys.excepthook = old_excepthook
+        sys.excepthook = old_excepthook
 
-            if frame is None:
-                frame = sys._getframe(frames_back)
-
-            Pdb(colors).set_trace(frame)
+        if frame is None:
+            frame = sys._getframe(frames_back)
 
-    if debug is None:
-        import pdb
-        debug = lambda frame=None, frames_back=1: pdb.set_trace()
+        Pdb(colors).set_trace(frame)
 
     debug.__doc__ = """
     Start debugger on line where it is called, roughly equivalent to::
@@ -222,6 +225,16 @@ def assert_(condition, msg='assertion failed!'):
     if not condition:
         raise ValueError(msg)
 
+_versions = itertools.count(1)
+
+def new_version():
+    """
+    Return a new version number of some data, e.g. coordinates or a DOF
+    vector. The numbers are unique in the process, so that the versions of
+    data of different objects never compare equal.
+    """
+    return next(_versions)
+
 ##
 # c: 06.04.2005, r: 05.05.2008
 def pause(msg=None):
@@ -1144,6 +1157,193 @@ def load_classes(filenames, classes, package_name=None, ignore_errors=False,
 
     return table
 
+class LazyClassTable(MutableMapping):
+    """
+    A dictionary of subclasses of the given classes defined in the given
+    files, see :func:`load_classes()`, that imports the files only on the
+    first access to the classes defined in them.
+
+    The class names are mapped to the files using a registry. A class
+    imported into several files is mapped to the file of the module that
+    defines it. If `registry_filename` is given, the registry is persisted in
+    that file and reused as long as the files (their names, modification
+    times and sizes) and the Python executable do not change. Otherwise, or
+    when the registry is outdated, all files are imported and the registry is
+    (re)generated.
+
+    With `ignore_errors`, the files that cannot be imported are recorded in
+    the registry and their import is retried whenever the table is created,
+    so that their classes become available as soon as the missing
+    dependencies are installed.
+
+    The classes can be also added explicitly, as in a dictionary.
+    """
+
+    def __init__(self, filenames, classes, package_name=None,
+                 ignore_errors=False, name_attr='name',
+                 registry_filename=None):
+        self.filenames = list(filenames)
+        self.classes = classes
+        self.package_name = package_name
+        self.ignore_errors = ignore_errors
+        self.name_attr = name_attr
+        self.registry_filename = registry_filename
+
+        self._table = {}
+        self._loaded = set()
+        self._registry, self._failed = self._load_registry()
+        if self._registry is None:
+            self._create_registry()
+            self._save_registry()
+
+        elif len(self._failed):
+            failed = self._failed
+            self._failed = []
+            for filename in failed:
+                self._scan_file(filename)
+
+            if self._failed != failed:
+                self._save_registry()
+
+    def _get_files_info(self):
+        info = {'python' : sys.executable, 'files' : []}
+        for filename in self.filenames:
+            st = os.stat(filename)
+            info['files'].append([filename, st.st_mtime_ns, st.st_size])
+
+        return info
+
+    def _load_registry(self):
+        import json
+
+        if self.registry_filename is None:
+            return None, []
+
+        try:
+            with open(self.registry_filename, 'r') as fd:
+                data = json.load(fd)
+
+        except (OSError, ValueError):
+            return None, []
+
+        if ((data.get('info') != self._get_files_info())
+            or ('failed' not in data)):
+            return None, []
+
+        return data['registry'], data['failed']
+
+    def _save_registry(self):
+        import json
+        import tempfile
+
+        if self.registry_filename is None:
+            return
+
+        data = {'info' : self._get_files_info(), 'registry' : self._registry,
+                'failed' : self._failed}
+        dirname = os.path.dirname(self.registry_filename)
+        try:
+            # Write atomically - many processes can be starting at once.
+            fd, tmp_filename = tempfile.mkstemp(suffix='.tmp', dir=dirname)
+            with os.fdopen(fd, 'w') as fd:
+                json.dump(data, fd)
+            os.replace(tmp_filename, self.registry_filename)
+
+        except OSError:
+            output('WARNING: cannot save class registry to %s!'
+                   % self.registry_filename)
+
+    def _import_classes(self, filename):
+        """
+        Import `filename` and return its module name and the table of its
+        classes. Return None, if the file cannot be imported and errors are
+        ignored.
+        """
+        try:
+            mod = import_file(filename, package_name=self.package_name,
+                              can_reload=False)
+
+        except Exception:
+            if not self.ignore_errors:
+                raise
+
+            output('WARNING: module %s cannot be imported!' % filename)
+            output('reason:\n', sys.exc_info()[1])
+            return None
+
+        table = find_subclasses(vars(mod), self.classes, omit_unnamed=True,
+                                name_attr=self.name_attr)
+        return mod.__name__, table
+
+    def _scan_file(self, filename):
+        """
+        Import `filename` and register its classes. A class already
+        registered is remapped to `filename` only if it is defined there.
+        """
+        out = self._import_classes(filename)
+        self._loaded.add(filename)
+        if out is None:
+            self._failed.append(filename)
+            return
+
+        mod_name, table = out
+        for key, cls in table.items():
+            if (key not in self._registry) or (cls.__module__ == mod_name):
+                self._registry[key] = filename
+                self._table[key] = cls
+
+    def _create_registry(self):
+        self._registry = {}
+        self._failed = []
+        for filename in self.filenames:
+            self._scan_file(filename)
+
+    def _load_file(self, filename):
+        out = self._import_classes(filename)
+        self._loaded.add(filename)
+        if out is None:
+            return
+
+        for key, cls in out[1].items():
+            if self._registry.get(key) == filename:
+                self._table.setdefault(key, cls)
+
+    def __getitem__(self, key):
+        cls = self._table.get(key)
+        if cls is None:
+            filename = self._registry[key]
+            if filename not in self._loaded:
+                self._load_file(filename)
+
+            cls = self._table[key]
+
+        return cls
+
+    def __setitem__(self, key, cls):
+        self._table[key] = cls
+
+    def __delitem__(self, key):
+        if key in self._registry:
+            del self._registry[key]
+            self._table.pop(key, None)
+
+        else:
+            del self._table[key]
+
+    def __contains__(self, key):
+        return (key in self._table) or (key in self._registry)
+
+    def __iter__(self):
+        for key in self._registry:
+            yield key
+
+        for key in self._table:
+            if key not in self._registry:
+                yield key
+
+    def __len__(self):
+        return len(set(self._registry).union(self._table))
+
 def update_dict_recursively(dst, src, tuples_too=False,
                             overwrite_by_none=True):
     """
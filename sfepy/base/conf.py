@@ -219,8 +219,10 @@ def transform_materials(adict):
         elif isinstance(conf, tuple):
             c2 = tuple_to_conf(key, conf,
                                ['values', 'function', 'kind'])
-            if len(conf) == 4:
+            if len(conf) >= 4:
                 c2.flags = conf[3]
+            if len(conf) == 5:
+                c2.dependencies = conf[4]
             d2['material_%s__%d' % (c2.name, ii)] = c2
 
         else:
@@ -24,9 +24,46 @@ def validate_bool(val):
     else:
         raise ValueError('Could not convert "%s" to boolean!' % val)
 
+def validate_positive_int(val):
+    """
+    Convert val to a positive integer or raise a ValueError.
+    """
+    ival = int(val)
+    if ival < 1:
+        raise ValueError('%s is not a positive integer!' % val)
+
+    return ival
+
+def validate_positive_int_or_none(val):
+    """
+    Convert val to a positive integer or None or raise a ValueError.
+    """
+    if val is None:
+        return None
+
+    return validate_positive_int(val)
+
+def validate_positive_float_or_none(val):
+    """
+    Convert val to a positive float or None or raise a ValueError.
+    """
+    if val is None:
+        return None
+
+    fval = float(val)
+    if fval <= 0.0:
+        raise ValueError('%s is not a positive number!' % val)
+
+    return fval
+
 default_goptions = {
     'verbose' : [True, validate_bool],
     'check_term_finiteness' : [False, validate_bool],
+    'assembly_threads' : [1, validate_positive_int],
+    'assembly_scatter_index' : [False, validate_bool],
+    'assembly_chunk_size' : [None, validate_positive_int_or_none],
+    'profile_terms' : [False, validate_bool],
+    'mapping_cache_max_mem' : [None, validate_positive_float_or_none],
 }
 
 class ValidatedDict(dict):
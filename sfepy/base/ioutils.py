@@ -7,6 +7,8 @@ import os.path as op
 import fnmatch
 import shutil
 import glob
+import queue
+import threading
 from .base import output, ordered_iteritems, Struct, basestr
 import six
 import pickle
@@ -35,6 +37,86 @@ class InDir(Struct):
     def __call__(self, filename):
         return op.join(self.dir, filename)
 
+class BackgroundWriter(Struct):
+    """
+    Call output functions in a background thread.
+
+    The calls are passed to the thread through a queue of the maximum size
+    `queue_size`. If the queue is full, :func:`BackgroundWriter.write()`
+    blocks until the thread finishes the oldest call. The calls are
+    performed in the order of submission.
+
+    An exception raised in the thread is re-raised by the next
+    :func:`BackgroundWriter.write()` call or by
+    :func:`BackgroundWriter.close()`, the remaining queued calls are
+    skipped.
+
+    Examples
+    --------
+
+    >>> writer = BackgroundWriter(queue_size=2)
+    >>> writer.write(mesh.write, 'output/mesh.vtk', io='auto', out=out)
+    >>> writer.close()
+    """
+    def __init__(self, queue_size=2, name='background_writer'):
+        Struct.__init__(self, name=name, queue_size=queue_size,
+                        queue=queue.Queue(maxsize=queue_size), error=None)
+        self.thread = threading.Thread(target=self._run, name=name,
+                                       daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    break
+
+                if self.error is None:
+                    fun, args, kwargs = item
+                    fun(*args, **kwargs)
+
+            except Exception as exc:
+                self.error = exc
+
+            finally:
+                self.queue.task_done()
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def write(self, fun, *args, **kwargs):
+        """
+        Queue the call `fun(*args, **kwargs)`. The arguments must not be
+        modified until the call is finished.
+        """
+        if self.thread is None:
+            raise ValueError('writer %s is closed!' % self.name)
+
+        self._raise_error()
+        self.queue.put((fun, args, kwargs))
+
+    def flush(self):
+        """
+        Wait until all queued calls are finished.
+        """
+        self.queue.join()
+        self._raise_error()
+
+    def close(self, raise_error=True):
+        """
+        Finish the queued calls and stop the thread. If `raise_error` is
+        True, re-raise an exception raised in the thread.
+        """
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+        if raise_error:
+            self._raise_error()
+
 def ensure_path(filename):
     """
     Check if path to `filename` exists and if not, create the necessary
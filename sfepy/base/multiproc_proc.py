@@ -10,6 +10,14 @@ except:
     use_multiprocessing = False
     managers = None
 
+try:
+    from multiprocessing import shared_memory, resource_tracker
+    use_shared_memory = True
+except ImportError:
+    use_shared_memory = False
+
+import pickle
+
 try:
     import queue
 except ImportError:
@@ -119,3 +127,93 @@ def get_lock(name):
 def is_remote_dict(d):
     """Return True if 'd' is   instance."""
     return isinstance(d, managers.DictProxy)
+
+
+def init_shared_memory():
+    """
+    Start the shared memory resource tracker, so that it is shared by the
+    worker processes started afterwards. Otherwise the shared memory blocks
+    created by a worker could be removed when the worker terminates.
+    """
+    if use_shared_memory:
+        resource_tracker.ensure_running()
+
+
+def put_shared(val):
+    """
+    Store a picklable value so that it can be passed cheaply between
+    processes.
+
+    The array data of the value are copied into a new shared memory block,
+    only a small descriptor is to be passed between the processes.
+
+    Parameters
+    ----------
+    val : object
+        The value to store.
+
+    Returns
+    -------
+    desc : tuple
+        The descriptor of the stored value, to be used in
+        :func:`get_shared()`.
+    """
+    buffers = []
+    header = pickle.dumps(val, protocol=5, buffer_callback=buffers.append)
+    raws = [buf.raw() for buf in buffers]
+    sizes = [raw.nbytes for raw in raws]
+
+    if not sum(sizes):
+        return ('shared', None, header, sizes)
+
+    shm = shared_memory.SharedMemory(create=True, size=sum(sizes))
+    ii = 0
+    for raw, size in zip(raws, sizes):
+        shm.buf[ii:ii+size] = raw
+        ii += size
+
+    name = shm.name
+    shm.close()
+
+    return ('shared', name, header, sizes)
+
+
+def is_shared(desc):
+    """Return True if `desc` is a descriptor returned by put_shared()."""
+    return (isinstance(desc, tuple) and (len(desc) == 4)
+            and (desc[0] == 'shared'))
+
+
+def get_shared(desc, unlink=False):
+    """
+    Get a copy of the value stored by :func:`put_shared()`.
+
+    Parameters
+    ----------
+    desc : tuple
+        The descriptor of the stored value.
+    unlink : bool
+        If True, release the shared memory block after reading the value.
+
+    Returns
+    -------
+    val : object
+        The stored value.
+    """
+    _, name, header, sizes = desc
+
+    if name is None:
+        return pickle.loads(header)
+
+    shm = shared_memory.SharedMemory(name=name)
+    buffers = []
+    ii = 0
+    for size in sizes:
+        buffers.append(bytearray(shm.buf[ii:ii+size]))
+        ii += size
+
+    shm.close()
+    if unlink:
+        shm.unlink()
+
+    return pickle.loads(header, buffers=buffers)
@@ -67,3 +67,83 @@ class Timers(IndexedStruct):
 
     def get_totals(self):
         return {name : timer.total for name, timer in self.to_dict().items()}
+
+class Profiler(Struct):
+    """
+    Accumulate elapsed times and other counters of named items, for example
+    of terms.
+
+    Parameters
+    ----------
+    name : str
+        The profiler name.
+    time_keys : sequence of str
+        The names of the counters holding elapsed times. Their sum is
+        reported as the total time of an item.
+    """
+
+    def __init__(self, name='profiler', time_keys=()):
+        Struct.__init__(self, name=name, time_keys=tuple(time_keys))
+        self.reset()
+
+    def reset(self):
+        self.stats = {}
+
+    def add(self, key, **values):
+        """
+        Add `values` to the counters of the item `key`.
+        """
+        stats = self.stats.setdefault(key, {})
+        for name, val in values.items():
+            stats[name] = stats.get(name, 0) + val
+
+    def get_stats(self):
+        """
+        Return a dictionary of the item counters, including the total time
+        `'time'`.
+        """
+        out = {}
+        for key, stats in self.stats.items():
+            out[key] = dict(stats)
+            out[key]['time'] = sum(stats.get(name, 0.0)
+                                   for name in self.time_keys)
+
+        return out
+
+    def report(self, fmt='text', sort_by='time'):
+        """
+        Report the item counters as text or JSON.
+
+        Parameters
+        ----------
+        fmt : 'text' or 'json'
+            The report format.
+        sort_by : str
+            The counter used to sort the items in descending order.
+
+        Returns
+        -------
+        report : str
+            The report.
+        """
+        stats = self.get_stats()
+        keys = sorted(stats.keys(), key=lambda x: stats[x].get(sort_by, 0),
+                      reverse=True)
+        if fmt == 'json':
+            import json
+            return json.dumps({key : stats[key] for key in keys}, indent=1)
+
+        elif fmt != 'text':
+            raise ValueError('unknown report format! (%s)' % fmt)
+
+        names = sorted(set(name for key in keys for name in stats[key]
+                           if name not in self.time_keys + ('time',)))
+        header = ['time'] + list(self.time_keys) + names
+        lines = [' '.join('%12s' % name for name in header) + ' item']
+        for key in keys:
+            vals = [stats[key].get(name, 0) for name in header]
+            lines.append(' '.join(('%12.6f' if isinstance(val, float)
+                                   else '%12d') % val for val in vals)
+                         + ' ' + str(key))
+
+        return '\n'.join(lines)
@@ -0,0 +1,80 @@
+"""
+Benchmarks of the matrix graph creation, term evaluation and assembling.
+"""
+from sfepy.benchmarks.utils import create_problem
+
+class MatrixGraph:
+    """
+    The creation of the tangent matrix graph.
+    """
+    params = ([2, 3], [16, 32, 64], ['native', 'coo'])
+    param_names = ['dim', 'size', 'method']
+
+    def setup(self, dim, size, method):
+        if (dim == 3) and (size > 32):
+            raise NotImplementedError
+
+        self.data = create_problem(dim, size, 'dw_laplace')
+
+    def time_create_matrix_graph(self, dim, size, method):
+        self.data.problem.equations.create_matrix_graph(method=method,
+                                                        verbose=False)
+
+class TermAssembling:
+    """
+    The evaluation and assembling of the residual vector and the tangent
+    matrix for the C function based (dw_*) terms and the einsum based (de_*)
+    terms.
+    """
+    params = ([2, 3], [16, 32, 64],
+              ['dw_laplace', 'de_laplace', 'dw_lin_elastic', 'de_lin_elastic'])
+    param_names = ['dim', 'size', 'term']
+
+    def setup(self, dim, size, term):
+        if (dim == 3) and (size > 32):
+            raise NotImplementedError
+
+        # The 'numpy' backend matrix evaluation takes minutes.
+        if (dim == 3) and (size > 16) and (term == 'de_lin_elastic'):
+            raise NotImplementedError
+
+        self.data = create_problem(dim, size, term)
+        self.mtx = self.data.problem.mtx_a.copy()
+
+    def time_residual(self, dim, size, term):
+        self.data.problem.equations.eval_residuals(self.data.state)
+
+    def time_tangent_matrix(self, dim, size, term):
+        self.data.problem.equations.eval_tangent_matrices(self.data.state,
+                                                          self.mtx)
+
+class ETermBackends:
+    """
+    The tangent matrix assembling of an einsum based term for the available
+    :class:`ETermBase <sfepy.terms.terms_multilinear.ETermBase>` backends.
+    The cell loop backends are omitted, as they do not support the constant
+    material parameters.
+    """
+    params = ([2, 3], [16, 32],
+              ['numpy', 'numpy_qloop', 'opt_einsum', 'opt_einsum_qloop', 'jax',
+               'dask_threads'])
+    param_names = ['dim', 'size', 'backend']
+
+    def setup(self, dim, size, backend):
+        from sfepy.terms.terms_multilinear import ETermBase
+
+        if not ETermBase.can_backend.get(backend):
+            raise NotImplementedError
+
+        if (dim == 3) and (size > 16) and (backend == 'numpy'):
+            raise NotImplementedError
+
+        self.data = create_problem(dim, size, 'de_lin_elastic')
+        self.data.term.set_backend(backend=backend)
+        self.mtx = self.data.problem.mtx_a.copy()
+        # Do not include the first evaluation (JIT compilation, etc.).
+        self.time_tangent_matrix(dim, size, backend)
+
+    def time_tangent_matrix(self, dim, size, backend):
+        self.data.problem.equations.eval_tangent_matrices(self.data.state,
+                                                          self.mtx)
@@ -0,0 +1,122 @@
+"""
+Benchmarks of the mesh and results input/output and of the point location.
+"""
+import os
+import os.path as op
+import tempfile
+
+import numpy as nm
+
+from sfepy.base.base import Struct
+from sfepy.benchmarks.utils import create_block_mesh, create_field
+
+# The format names and suffixes of the generated mesh files.
+mesh_formats = {
+    'medit' : '.mesh',
+    'vtk' : '.vtk',
+    'vtu' : '.vtu',
+    'gmsh' : '.msh',
+    'hdf5' : '.h5',
+    'hdf5-xdmf' : '.h5x',
+    'hdf5-ts' : '.h5ts',
+    'xyz' : '.xyz',
+}
+
+# The sample files of the read-only formats.
+sample_meshes = {
+    'comsol' : 'meshes/various_formats/comsol_tri.txt',
+    'mesh3d' : 'meshes/various_formats/hex4.mesh3d',
+    'tetgen' : 'meshes/various_formats/octahedron.node',
+    'abaqus' : 'meshes/various_formats/abaqus_hex.inp',
+    'nastran' : 'meshes/various_formats/cube.bdf',
+}
+
+class MeshReading:
+    """
+    Reading of generated block meshes by the MeshIO classes that support
+    writing.
+    """
+    params = ([2, 3], [16, 32, 64], list(mesh_formats.keys()))
+    param_names = ['dim', 'size', 'format']
+
+    def setup(self, dim, size, format):
+        if (dim == 3) and (size > 32):
+            raise NotImplementedError
+
+        self.tmp_dir = tempfile.mkdtemp(prefix='sfepy_bench_')
+        self.filename = op.join(self.tmp_dir, 'mesh' + mesh_formats[format])
+        mesh = create_block_mesh(dim, size)
+        mesh.write(self.filename, io='auto', file_format=format)
+
+    def teardown(self, dim, size, format):
+        for name in os.listdir(self.tmp_dir):
+            os.remove(op.join(self.tmp_dir, name))
+        os.rmdir(self.tmp_dir)
+
+    def time_from_file(self, dim, size, format):
+        from sfepy.discrete.fem import Mesh
+
+        Mesh.from_file(self.filename, file_format=format)
+
+class SampleMeshReading:
+    """
+    Reading of the sample meshes by the MeshIO classes without writing
+    support.
+    """
+    params = list(sample_meshes.keys())
+    param_names = ['format']
+
+    def time_from_file(self, format):
+        from sfepy import data_dir
+        from sfepy.discrete.fem import Mesh
+
+        Mesh.from_file(sample_meshes[format], prefix_dir=data_dir)
+
+class HDF5TimeSeriesWriting:
+    """
+    Writing of time-dependent results to the HDF5 files.
+    """
+    params = ([16, 32, 64], [10], ['hdf5', 'hdf5-ts'])
+    param_names = ['size', 'n_step', 'format']
+
+    def setup(self, size, n_step, format):
+        from sfepy.solvers.ts import TimeStepper
+
+        self.mesh = create_block_mesh(3, size)
+        self.ts = TimeStepper(0.0, 1.0, n_step=n_step)
+        n_nod = self.mesh.n_nod
+        self.out = {'u' : Struct(name='output_data', mode='vertex',
+                                 data=nm.ones((n_nod, 3)), dofs=None)}
+
+        self.tmp_dir = tempfile.mkdtemp(prefix='sfepy_bench_')
+        self.filename = op.join(self.tmp_dir,
+                                'results' + mesh_formats[format])
+
+    def teardown(self, size, n_step, format):
+        for name in os.listdir(self.tmp_dir):
+            os.remove(op.join(self.tmp_dir, name))
+        os.rmdir(self.tmp_dir)
+
+    def time_write(self, size, n_step, format):
+        data = self.out['u'].data
+        for step, time in self.ts:
+            data[:] = time
+            self.mesh.write(self.filename, io='auto', out=self.out,
+                            ts=self.ts)
+
+class PointLocation:
+    """
+    Location of random points in a field mesh by
+    :func:`get_ref_coors() <sfepy.discrete.common.global_interp.get_ref_coors>`.
+    """
+    params = ([2, 3], [16, 32], [1000, 10000], ['general', 'convex'])
+    param_names = ['dim', 'size', 'n_point', 'strategy']
+
+    def setup(self, dim, size, n_point, strategy):
+        self.field = create_field(dim, size)
+        self.coors = nm.random.default_rng(0).random((n_point, dim))
+
+    def time_get_ref_coors(self, dim, size, n_point, strategy):
+        from sfepy.discrete.common.global_interp import get_ref_coors
+
+        get_ref_coors(self.field, self.coors, strategy=strategy)
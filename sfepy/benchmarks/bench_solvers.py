@@ -0,0 +1,42 @@
+"""
+Benchmarks of the linear solvers.
+"""
+from sfepy.benchmarks.utils import create_problem
+
+class LinearSolvers:
+    """
+    The solution of a linear system with the Laplace or linear elasticity
+    matrix by the direct and iterative SciPy solvers.
+    """
+    params = ([2, 3], [16, 32, 64], ['dw_laplace', 'dw_lin_elastic'],
+              ['scipy_direct', 'scipy_iterative'])
+    param_names = ['dim', 'size', 'term', 'solver']
+
+    def setup(self, dim, size, term, solver):
+        from sfepy.solvers.ls import ScipyDirect, ScipyIterative
+
+        if (dim == 3) and (size > 32):
+            raise NotImplementedError
+
+        # The SuperLU factorization takes minutes.
+        if (dim == 3) and (size > 16) and (solver == 'scipy_direct'):
+            raise NotImplementedError
+
+        data = create_problem(dim, size, term)
+        pb = data.problem
+        self.mtx = pb.mtx_a.copy()
+        pb.equations.eval_tangent_matrices(data.state, self.mtx)
+        self.rhs = pb.equations.eval_residuals(data.state)
+
+        if solver == 'scipy_direct':
+            self.create_solver = lambda: ScipyDirect({})
+
+        else:
+            self.create_solver = lambda: ScipyIterative({
+                'method' : 'cg', 'i_max' : 10000, 'eps_r' : 1e-10,
+            })
+
+    def time_solve(self, dim, size, term, solver):
+        # A new solver instance, so that the factorization is not reused.
+        ls = self.create_solver()
+        ls(self.rhs, mtx=self.mtx)
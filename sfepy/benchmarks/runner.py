@@ -0,0 +1,318 @@
+"""
+Benchmark runner and history utilities.
+
+The benchmarks are classes defined in the `sfepy.benchmarks.bench_*` modules,
+following the `asv <https://asv.readthedocs.io>`_ conventions:
+
+- `params` is a list of parameter value lists (or a single list, if the
+  benchmark has one parameter) and `param_names` is the list of their names.
+  The benchmarks are run for all combinations of the parameter values.
+- `setup(*params)` prepares the data. It can raise NotImplementedError to
+  skip a parameter combination. `teardown(*params)` is optional.
+- Each `time_*(*params)` method is a benchmark case, whose elapsed time and
+  peak memory are measured.
+
+The peak memory is the maximum memory allocated during a single call as
+traced by the :mod:`tracemalloc` module, i.e. it includes the NumPy arrays,
+but not memory allocated directly in C extension modules.
+
+The results are appended to a history file in the JSON lines format, one
+record per case and parameter combination, labeled by the git commit of the
+sources, so that the results of different commits can be compared.
+"""
+import os.path as op
+import sys
+import platform
+import importlib
+import pkgutil
+import itertools
+import json
+import time
+import tracemalloc
+
+import numpy as nm
+
+from sfepy.base.base import output, Struct, goptions
+from sfepy.base.ioutils import ensure_path
+from sfepy.base.timing import Timer
+
+def get_commit_info():
+    """
+    Return the git commit hash of the sfepy sources and the information
+    about the machine and the Python and NumPy versions.
+    """
+    import subprocess
+    import sfepy
+
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=sfepy.base_dir,
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'unknown'
+
+    info = {
+        'commit' : commit,
+        'version' : sfepy.__version__,
+        'date' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine' : platform.node(),
+        'python' : platform.python_version(),
+        'numpy' : nm.__version__,
+    }
+    return info
+
+def collect_benchmarks(select=None):
+    """
+    Collect the benchmark classes from the `sfepy.benchmarks.bench_*`
+    modules.
+
+    Parameters
+    ----------
+    select : str, optional
+        If given, only the benchmark cases with the full name (e.g.
+        ``'bench_io.MeshReading.time_from_file'``) containing `select` are
+        collected.
+
+    Returns
+    -------
+    cases : list
+        The list of ``(name, cls, method_name)`` tuples.
+    """
+    import sfepy.benchmarks as bench
+
+    cases = []
+    for info in pkgutil.iter_modules(bench.__path__):
+        if not info.name.startswith('bench_'): continue
+
+        module = importlib.import_module('sfepy.benchmarks.' + info.name)
+        for key, cls in sorted(vars(module).items()):
+            if not (isinstance(cls, type)
+                    and (cls.__module__ == module.__name__)
+                    and hasattr(cls, 'params')):
+                continue
+
+            for method_name in sorted(dir(cls)):
+                if not method_name.startswith('time_'): continue
+
+                name = '%s.%s.%s' % (info.name, key, method_name)
+                if (select is None) or (select in name):
+                    cases.append((name, cls, method_name))
+
+    return cases
+
+def _get_params(cls, quick=False):
+    params = cls.params
+    if len(params) and not isinstance(params[0], (list, tuple)):
+        params = [params]
+
+    if quick:
+        params = [vals[:1] for vals in params]
+
+    names = list(cls.param_names)
+    return [dict(zip(names, vals)) for vals in itertools.product(*params)]
+
+def measure(fun, args=(), repeat=3, number=1):
+    """
+    Measure the elapsed time and the peak traced memory of `fun(*args)`.
+
+    Returns
+    -------
+    times : array
+        The mean times of `number` calls in each of `repeat` repeats.
+    peakmem : int
+        The peak memory in bytes allocated during a single call.
+    """
+    timer = Timer()
+    times = []
+    for ir in range(repeat):
+        timer.start()
+        for ii in range(number):
+            fun(*args)
+        times.append(timer.stop() / number)
+
+    is_tracing = tracemalloc.is_tracing()
+    if not is_tracing:
+        tracemalloc.start()
+
+    tracemalloc.clear_traces()
+    mem0 = tracemalloc.get_traced_memory()[0]
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    fun(*args)
+    peakmem = tracemalloc.get_traced_memory()[1] - mem0
+
+    if not is_tracing:
+        tracemalloc.stop()
+
+    return nm.array(times), peakmem
+
+def run_benchmarks(cases, repeat=3, number=1, quick=False, verbose=True):
+    """
+    Run the benchmark `cases` returned by :func:`collect_benchmarks()` for all
+    combinations of their parameters.
+
+    Parameters
+    ----------
+    cases : list
+        The benchmark cases.
+    repeat : int
+        The number of timing repeats.
+    number : int
+        The number of calls in each timing repeat.
+    quick : bool
+        If True, only the first value of each parameter is used.
+    verbose : bool
+        If False, reduce verbosity.
+
+    Returns
+    -------
+    records : list of dicts
+        The benchmark results. The times are in seconds, the peak memory is
+        in bytes.
+    """
+    records = []
+    for name, cls, method_name in cases:
+        for params in _get_params(cls, quick=quick):
+            args = tuple(params.values())
+            obj = cls()
+            # Silence the messages of the benchmarked code.
+            verbose0 = goptions['verbose']
+            goptions['verbose'] = False
+            try:
+                if hasattr(obj, 'setup'):
+                    obj.setup(*args)
+
+            except NotImplementedError:
+                goptions['verbose'] = verbose0
+                output('%s %s: skipped' % (name, params), verbose=verbose)
+                continue
+
+            try:
+                times, peakmem = measure(getattr(obj, method_name), args,
+                                         repeat=repeat, number=number)
+
+            finally:
+                if hasattr(obj, 'teardown'):
+                    obj.teardown(*args)
+                goptions['verbose'] = verbose0
+
+            record = {
+                'name' : name,
+                'params' : params,
+                'time_min' : times.min(),
+                'time_median' : nm.median(times),
+                'peakmem' : peakmem,
+            }
+            output('%s %s: %.6f s, %.3f MB'
+                   % (name, params, record['time_min'], peakmem / 1e6),
+                   verbose=verbose)
+            records.append(record)
+
+    return records
+
+def save_history(filename, records, info=None):
+    """
+    Append the benchmark `records` to the history file `filename` in the JSON
+    lines format. The records are updated by `info`, by default given by
+    :func:`get_commit_info()`.
+    """
+    if info is None:
+        info = get_commit_info()
+
+    ensure_path(filename)
+    with open(filename, 'a') as fd:
+        for record in records:
+            record = dict(record, **info)
+            fd.write(json.dumps(record, default=_to_json) + '\n')
+
+def _to_json(val):
+    if isinstance(val, nm.generic):
+        return val.item()
+
+    raise TypeError('%s is not JSON serializable!' % type(val))
+
+def load_history(filename):
+    """
+    Load the benchmark records from the history file `filename`.
+    """
+    if not op.exists(filename):
+        return []
+
+    with open(filename, 'r') as fd:
+        records = [json.loads(line) for line in fd if line.strip()]
+
+    return records
+
+def _get_key(record):
+    return (record['name'],
+            json.dumps(record['params'], sort_keys=True))
+
+def compare_history(records, commit0, commit1, threshold=0.1, key='time_min'):
+    """
+    Compare the benchmark results of two commits.
+
+    Parameters
+    ----------
+    records : list of dicts
+        The benchmark records, as returned by :func:`load_history()`.
+    commit0, commit1 : str
+        The (prefixes of) hashes of the commits to compare. The latest records
+        of each commit are used.
+    threshold : float
+        The relative change of `key` considered significant.
+    key : str
+        The compared record item, e.g. 'time_min' or 'peakmem'.
+
+    Returns
+    -------
+    rows : list of Struct
+        The comparison rows with the `name`, `params`, `val0`, `val1`,
+        `ratio` and `flag` attributes. The `flag` is '+' for a slowdown (or
+        increased memory), '-' for a speedup and '' otherwise.
+    """
+    def _get_latest(commit):
+        out = {}
+        for record in records:
+            if record['commit'].startswith(commit):
+                out[_get_key(record)] = record
+
+        return out
+
+    rec0 = _get_latest(commit0)
+    rec1 = _get_latest(commit1)
+
+    rows = []
+    for rkey in sorted(set(rec0.keys()) & set(rec1.keys())):
+        val0 = rec0[rkey][key]
+        val1 = rec1[rkey][key]
+        ratio = val1 / val0 if val0 > 0 else nm.inf
+        if ratio > (1.0 + threshold):
+            flag = '+'
+
+        elif ratio < 1.0 / (1.0 + threshold):
+            flag = '-'
+
+        else:
+            flag = ''
+
+        rows.append(Struct(name=rkey[0], params=rec0[rkey]['params'],
+                           val0=val0, val1=val1, ratio=ratio, flag=flag))
+
+    return rows
+
+def report_comparison(rows, fd=None):
+    """
+    Print the comparison `rows` returned by :func:`compare_history()`.
+    """
+    if fd is None:
+        fd = sys.stdout
+
+    fd.write('%1s %12s %12s %8s  %s\n' % ('', 'before', 'after', 'ratio',
+                                          'benchmark'))
+    for row in rows:
+        params = ', '.join('%s=%s' % item for item in row.params.items())
+        fd.write('%1s %12.6g %12.6g %8.3f  %s(%s)\n'
+                 % (row.flag, row.val0, row.val1, row.ratio, row.name,
+                    params))
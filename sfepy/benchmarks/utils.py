@@ -0,0 +1,93 @@
+"""
+Utility functions for creating the benchmark data.
+"""
+import numpy as nm
+
+from sfepy.base.base import Struct
+from sfepy.discrete import (FieldVariable, Material, Integral, Equation,
+                            Equations, Problem)
+from sfepy.discrete.conditions import Conditions, EssentialBC
+from sfepy.discrete.fem import FEDomain, Field
+from sfepy.terms import Term
+from sfepy.mechanics.matcoefs import stiffness_from_lame
+from sfepy.mesh.mesh_generators import gen_block_mesh
+
+def create_block_mesh(dim, size, name='block'):
+    """
+    Create a block mesh with `size` cells along each axis.
+    """
+    shape = [size + 1] * dim
+    mesh = gen_block_mesh(nm.ones(dim), shape, 0.5 * nm.ones(dim), name=name,
+                          verbose=False)
+    return mesh
+
+def create_field(dim, size, n_component=1, approx_order=1):
+    """
+    Create a field on a block mesh with `size` cells along each axis.
+    """
+    mesh = create_block_mesh(dim, size)
+    domain = FEDomain('domain', mesh)
+    omega = domain.create_region('Omega', 'all')
+    field = Field.from_args('fu', nm.float64, n_component, omega,
+                            approx_order=approx_order)
+
+    return field
+
+def create_problem(dim, size, term_name, approx_order=1):
+    """
+    Create a linear problem with a single term on a block mesh with `size`
+    cells along each axis.
+
+    Parameters
+    ----------
+    dim : 2 or 3
+        The space dimension.
+    size : int
+        The number of cells along each axis.
+    term_name : str
+        The name of a Laplace or linear elasticity term, e.g. 'dw_laplace',
+        'de_laplace', 'dw_lin_elastic' or 'de_lin_elastic'.
+    approx_order : int
+        The field approximation order.
+
+    Returns
+    -------
+    data : Struct
+        The problem, its term and state vector.
+    """
+    if 'laplace' in term_name:
+        n_component = 1
+        mat = Material('m', c=1.0)
+        expr = '%s(m.c, v, u)' % term_name
+
+    elif 'lin_elastic' in term_name:
+        n_component = dim
+        mat = Material('m', D=stiffness_from_lame(dim, 1.0, 1.0))
+        expr = '%s(m.D, v, u)' % term_name
+
+    else:
+        raise ValueError('unsupported term! (%s)' % term_name)
+
+    field = create_field(dim, size, n_component=n_component,
+                         approx_order=approx_order)
+    domain = field.domain
+    omega = domain.regions['Omega']
+    gamma = domain.create_region('Gamma', 'vertices in x < 1e-8', 'facet')
+
+    u = FieldVariable('u', 'unknown', field)
+    v = FieldVariable('v', 'test', field, primary_var_name='u')
+
+    integral = Integral('i', order=2 * approx_order)
+    term = Term.new(expr, integral, omega, m=mat, v=v, u=u)
+    eqs = Equations([Equation('eq', term)])
+
+    pb = Problem('benchmark', equations=eqs)
+    pb.set_bcs(ebcs=Conditions([EssentialBC('fix', gamma, {'u.all' : 0.0})]))
+    pb.time_update()
+    pb.update_materials()
+
+    pb.equations.init_state()
+    state = pb.equations.create_vec()
+    state[:] = nm.random.default_rng(0).random(len(state))
+
+    return Struct(problem=pb, term=term, state=state)
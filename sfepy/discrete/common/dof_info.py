@@ -249,6 +249,9 @@ class EquationMap(Struct):
     """
     Map all DOFs to equations for active DOFs.
     """
+    # The maximum number of cached mapping topologies, see
+    # map_equations().
+    cache_size = 4
 
     def __init__(self, name, dof_names, var_di):
         Struct.__init__(self, name=name, dof_names=dof_names, var_di=var_di)
@@ -292,8 +295,30 @@ class EquationMap(Struct):
                                                self.dof_names, self.dof_names)
             self.eq[unused] = -3
 
+    def _get_ebc_fun(self, bc, ts, functions, problem):
+        """
+        Get the EBC value or the function of space coordinates giving the EBC
+        values.
+        """
+        fun = get_condition_value(bc.dofs[1], functions, 'EBC', bc.name)
+        if isinstance(fun, Function):
+            aux = fun
+            fun = lambda coors: aux(ts, coors, bc=bc, problem=problem)
+
+        return fun
+
+    def _eval_ebc(self, bc, field, region, ts, functions, problem,
+                  clean_msg):
+        """
+        Evaluate the EBC values in the `region` DOFs.
+        """
+        fun = self._get_ebc_fun(bc, ts, functions, problem)
+        nods, vv = field.set_dofs(fun, region, len(bc.dofs[0]), clean_msg)
+
+        return fun, nods, vv
+
     def map_equations(self, bcs, field, ts, functions, problem=None,
-                      warn=False):
+                      warn=False, cache=None):
         """
         Create the mapping of active DOFs from/to all DOFs.
 
@@ -313,6 +338,12 @@ class EquationMap(Struct):
             The problem that can be passed to user functions as a context.
         warn : bool, optional
             If True, warn about BC on non-existent nodes.
+        cache : dict, optional
+            If given, the cache of the mapping topology (the EBC and EPBC
+            DOFs and equation numbers) keyed by the set of active boundary
+            conditions. When the set is found in the cache, only the EBC
+            values are evaluated. The EBC functions of fields with DOFs given
+            by values in nodes are evaluated in the cached DOF coordinates.
 
         Returns
         -------
@@ -323,16 +354,14 @@ class EquationMap(Struct):
         -----
         - Periodic bc: master and slave DOFs must belong to the same
           field (variables can differ, though).
+        - The cached topology assumes that the regions and the periodic
+          matching of DOFs do not change.
         """
         if bcs is None:
             self._init_empty(field)
             return set()
 
-        eq_ebc = nm.zeros((self.var_di.n_dof,), dtype=nm.int32)
-        val_ebc = nm.zeros((self.var_di.n_dof,), dtype=field.dtype)
-        master_slave = nm.zeros((self.var_di.n_dof,), dtype=nm.int32)
-        chains = []
-
+        active = []
         active_bcs = set()
         for bc in bcs:
             # Skip conditions that are not active in the current time.
@@ -341,25 +370,48 @@ class EquationMap(Struct):
 
             if isinstance(bc, DGEssentialBC):
                 ntype = "DGEBC"
-                region = bc.region
+                regions = [bc.region]
                 sig = (bc.key, bc.name, tuple(bc.dofs[0]), bc.region.name)
             elif isinstance(bc, DGPeriodicBC):
                 ntype = "DGEPBC"
-                region = bc.regions[0]
+                regions = bc.regions
                 sig = (bc.key, bc.name, tuple(bc.dofs[0]), tuple(bc.dofs[1]),
                        bc.regions[0].name, bc.regions[1].name)
             elif isinstance(bc, EssentialBC):
                 ntype = 'EBC'
-                region = bc.region
+                regions = [bc.region]
                 sig = (bc.key, bc.name, tuple(bc.dofs[0]), bc.region.name)
             elif isinstance(bc, PeriodicBC):
                 ntype = 'EPBC'
-                region = bc.regions[0]
+                regions = bc.regions
                 sig = (bc.key, bc.name, tuple(bc.dofs[0]), tuple(bc.dofs[1]),
                        bc.regions[0].name, bc.regions[1].name)
 
+            active.append((bc, ntype, regions, sig))
             active_bcs.add(sig)
 
+        key = None
+        if (cache is not None) and all(item[1] in ('EBC', 'EPBC')
+                                       for item in active):
+            # Region ids are valid, as the cache keeps the regions.
+            key = (self.var_di.n_dof, tuple(self.dof_names),
+                   tuple((sig, tuple(id(region) for region in regions))
+                         for _, _, regions, sig in active))
+            entry = cache.get(key)
+            if entry is not None:
+                self._map_equations_cached(entry, active, field, ts,
+                                           functions, problem, warn)
+                return active_bcs
+
+        eq_ebc = nm.zeros((self.var_di.n_dof,), dtype=nm.int32)
+        val_ebc = nm.zeros((self.var_di.n_dof,), dtype=field.dtype)
+        master_slave = nm.zeros((self.var_di.n_dof,), dtype=nm.int32)
+        chains = []
+
+        ebc_items = []
+        for ii, (bc, ntype, regions, sig) in enumerate(active):
+            region = regions[0]
+
             if warn:
                 clean_msg = ('warning: ignoring nonexistent %s node (%s) in '
                              % (ntype, self.var_di.var_name))
@@ -372,21 +424,24 @@ class EquationMap(Struct):
                 continue
 
             if ntype == 'EBC': # EBC.
-                dofs, val = bc.dofs
-                ##
                 # Evaluate EBC values.
-                fun = get_condition_value(val, functions, 'EBC', bc.name)
-                if isinstance(fun, Function):
-                    aux = fun
-                    fun = lambda coors: aux(ts, coors,
-                                            bc=bc, problem=problem)
-
-                nods, vv = field.set_dofs(fun, region, len(dofs), clean_msg)
+                fun, nods, vv = self._eval_ebc(bc, field, region, ts,
+                                               functions, problem, clean_msg)
 
-                eq = expand_nodes_to_equations(nods, dofs, self.dof_names)
+                eq = expand_nodes_to_equations(nods, bc.dofs[0],
+                                               self.dof_names)
                 # Duplicates removed here...
                 eq_ebc[eq] = 1
                 if vv is not None: val_ebc[eq] = nm.ravel(vv)
+
+                if not callable(fun):
+                    ebc_items.append((ii, eq, fun, vv, None))
+
+                elif hasattr(field, 'eval_dofs_in_coors'):
+                    ebc_items.append((ii, eq, None, None, nods))
+
+                else:
+                    ebc_items.append((ii, eq, None, None, None))
             elif ntype == "DGEBC":
 
                 dofs, val = bc.dofs
@@ -518,8 +573,75 @@ class EquationMap(Struct):
         self.n_ebc = self.eq_ebc.shape[0]
         self.n_epbc = self.master.shape[0]
 
+        if key is not None:
+            if len(cache) >= self.cache_size:
+                cache.pop(next(iter(cache)))
+
+            cache[key] = Struct(regions=[item[2] for item in active],
+                                ebc_items=ebc_items, ebc_coors={},
+                                coors_version=getattr(field, 'coors_version',
+                                                      None),
+                                propagation=(im0, im1, is0, is1),
+                                eq=self.eq.copy(), eqi=self.eqi,
+                                eq_ebc=self.eq_ebc, master=self.master,
+                                slave=self.slave)
+
         return active_bcs
 
+    def _map_equations_cached(self, entry, active, field, ts, functions,
+                              problem, warn):
+        """
+        Set the mapping from the cached topology `entry` and evaluate the EBC
+        values, see :func:`EquationMap.map_equations()`.
+        """
+        if warn:
+            clean_msg = ('warning: ignoring nonexistent %s node (%s) in '
+                         % ('EBC', self.var_di.var_name))
+        else:
+            clean_msg = None
+
+        coors_version = getattr(field, 'coors_version', None)
+        if coors_version != entry.coors_version:
+            entry.ebc_coors = {}
+            entry.coors_version = coors_version
+
+        val_ebc = nm.zeros((self.var_di.n_dof,), dtype=field.dtype)
+        for ii, eq, val0, vv0, nods in entry.ebc_items:
+            bc = active[ii][0]
+            fun = self._get_ebc_fun(bc, ts, functions, problem)
+            if ((val0 is not None) and (not callable(fun))
+                and nm.array_equal(fun, val0)):
+                vv = vv0
+
+            elif callable(fun) and (nods is not None):
+                coors = entry.ebc_coors.get(ii)
+                if coors is None:
+                    coors = entry.ebc_coors[ii] = field.get_coor(nods)
+
+                vv = field.eval_dofs_in_coors(fun, coors, len(bc.dofs[0]))
+
+            else:
+                _, _, vv = self._eval_ebc(bc, field, bc.region, ts,
+                                          functions, problem, clean_msg)
+
+            if vv is not None: val_ebc[eq] = nm.ravel(vv)
+
+        # Propagate EBCs via PBCs.
+        im0, im1, is0, is1 = entry.propagation
+        val_ebc[im1] = val_ebc[im0]
+        val_ebc[is1] = val_ebc[is0]
+
+        self.eq = entry.eq.copy()
+        self.eqi = entry.eqi
+        self.eq_ebc = entry.eq_ebc
+        self.val_ebc = val_ebc[self.eq_ebc]
+        self.master = entry.master
+        self.slave = entry.slave
+
+        self.n_eq = self.eqi.shape[0]
+        self.n_ebc = self.eq_ebc.shape[0]
+        self.n_epbc = self.master.shape[0]
+
     def get_operator(self):
         """
         Get the matrix operator :math:`R` corresponding to the equation
@@ -2,7 +2,8 @@ from __future__ import print_function
 
 import numpy as nm
 
-from sfepy.base.base import output, assert_, OneTypeList, Struct
+from sfepy.base.base import (output, assert_, OneTypeList, Struct,
+                             new_version)
 from sfepy.base.timing import Timer
 from sfepy.discrete.common.region import (Region, get_dependency_graph,
                                           sort_by_dependency, get_parents)
@@ -171,7 +172,9 @@ class Domain(Struct):
     def __init__(self, name, mesh=None, nurbs=None, bmesh=None, regions=None,
                  verbose=False):
         Struct.__init__(self, name=name, mesh=mesh, nurbs=nurbs, bmesh=bmesh,
-                        regions=regions, verbose=verbose)
+                        regions=regions, verbose=verbose,
+                        coors_version=new_version(),
+                        coors_act_version=new_version())
 
     def get_centroids(self, dim):
         """
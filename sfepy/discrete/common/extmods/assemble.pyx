@@ -4,6 +4,8 @@
 Low level finite element assembling functions.
 """
 cimport cython
+from cython.parallel cimport prange
+from libc.stdlib cimport qsort
 
 import numpy as np
 cimport numpy as np
@@ -187,7 +189,7 @@ def assemble_matrix_complex(complex128[::1] mtx not None,
 cdef inline int32 bsearch(int32 *cols,
                           int32 i0,
                           int32 i1,
-                          int32 ii) nogil:
+                          int32 ii) noexcept nogil:
     cdef int32 im
 
     while i0 <= i1:
@@ -309,3 +311,532 @@ def assemble_matrix_complex_b(complex128[::1] mtx not None,
                 else:
                     msg = 'matrix item (%d, %d) does not exist!' % (irg, icg)
                     raise IndexError(msg)
+
+cdef inline int32 lsearch(int32 *cols,
+                          int32 i0,
+                          int32 i1,
+                          int32 ii) noexcept nogil:
+    cdef int32 ik
+
+    for ik in range(i0, i1):
+        if cols[ik] == ii:
+            return ik
+
+    return -1
+
+cdef void _assemble_vector_rows(float64 *val,
+                                float64 *vec_in_el0,
+                                int32 *piels,
+                                int32 *pcells,
+                                int32 n_cell,
+                                float64 sign,
+                                int32 *pconn0,
+                                int32 n_ep,
+                                int32 cell_size,
+                                int32 ir0,
+                                int32 ir1) noexcept nogil:
+    """
+    Assemble the entries of `vec_in_el0` of the `pcells` cells belonging to
+    the vector rows in [`ir0`, `ir1`).
+    """
+    cdef int32 jj, ii, ir, irg
+    cdef (int32 *) pconn
+    cdef (float64 *) vec_in_el
+
+    for jj in range(0, n_cell):
+        ii = pcells[jj]
+        pconn = pconn0 + piels[ii] * n_ep
+        vec_in_el = vec_in_el0 + ii * cell_size
+
+        for ir in range(0, n_ep):
+            irg = pconn[ir]
+            if (irg < ir0) or (irg >= ir1): continue
+
+            val[irg] += sign * vec_in_el[ir]
+
+cdef int32 _assemble_matrix_rows(float64 *val,
+                                 int32 *_prows,
+                                 int32 *_cols,
+                                 float64 *mtx_in_el0,
+                                 int32 *piels,
+                                 int32 *pcells,
+                                 int32 n_cell,
+                                 float64 sign,
+                                 int32 *prow_conn0,
+                                 int32 *pcol_conn0,
+                                 int32 n_epr,
+                                 int32 n_epc,
+                                 int32 cell_size,
+                                 int32 ir0,
+                                 int32 ir1,
+                                 int32 use_bsearch) noexcept nogil:
+    """
+    Assemble the entries of `mtx_in_el0` of the `pcells` cells belonging to
+    the matrix rows in [`ir0`, `ir1`). Return the number of entries missing
+    in the matrix.
+    """
+    cdef int32 jj, ii, iel, ir, ic, irg, icg, ik, iloc
+    cdef int32 n_missing = 0
+    cdef (int32 *) prow_conn, pcol_conn
+    cdef (float64 *) mtx_in_el
+
+    for jj in range(0, n_cell):
+        ii = pcells[jj]
+        iel = piels[ii]
+
+        prow_conn = prow_conn0 + iel * n_epr
+        pcol_conn = pcol_conn0 + iel * n_epc
+        mtx_in_el = mtx_in_el0 + ii * cell_size
+
+        for ir in range(0, n_epr):
+            irg = prow_conn[ir]
+            if (irg < ir0) or (irg >= ir1): continue
+
+            for ic in range(0, n_epc):
+                icg = pcol_conn[ic]
+                if icg < 0: continue
+
+                iloc = n_epc * ir + ic
+
+                if use_bsearch:
+                    ik = bsearch(_cols, _prows[irg], _prows[irg + 1], icg)
+
+                else:
+                    ik = lsearch(_cols, _prows[irg], _prows[irg + 1], icg)
+
+                if ik >= 0:
+                    val[ik] += sign * mtx_in_el[iloc]
+
+                else:
+                    n_missing += 1
+
+    return n_missing
+
+cdef inline int32 _get_row_thread(int32 *row_bounds,
+                                  int32 n_thread,
+                                  int32 irg) noexcept nogil:
+    """
+    Return the thread owning the row `irg`, or -1 if no thread owns it.
+    """
+    cdef int32 i0 = 0, i1 = n_thread, im
+
+    if (irg < row_bounds[0]) or (irg >= row_bounds[n_thread]):
+        return -1
+
+    while (i1 - i0) > 1:
+        im = (i0 + i1) >> 1
+        if irg < row_bounds[im]:
+            i1 = im
+
+        else:
+            i0 = im
+
+    return i0
+
+@cython.boundscheck(False)
+def get_thread_cells(int32[::1] iels not None,
+                     int32[:, ::1] conn not None,
+                     int32[::1] row_bounds not None):
+    """
+    Get the cells to be assembled by each thread of the thread-parallel
+    assembling functions, i.e. the cells with DOFs in the rows
+    [`row_bounds[it]`, `row_bounds[it + 1]`) owned by the thread `it`.
+
+    Returns
+    -------
+    cell_ptr : array
+        The array of length `len(row_bounds)`, so that the cells of the
+        thread `it` are in `cells[cell_ptr[it]:cell_ptr[it + 1]]`.
+    cells : array
+        The positions of the cells in `iels`, in increasing order for each
+        thread.
+    """
+    cdef int32 ii, ir, it
+    cdef int32 num = iels.shape[0]
+    cdef int32 n_thread = row_bounds.shape[0] - 1
+    cdef int32 n_ep = conn.shape[1]
+    cdef int32 *prb = &row_bounds[0]
+    cdef np.ndarray[int32, ndim=1] cell_ptr = np.zeros(n_thread + 1,
+                                                       dtype=np.int32)
+    cdef np.ndarray[int32, ndim=1] last = np.full(n_thread, -1,
+                                                  dtype=np.int32)
+    cdef np.ndarray[int32, ndim=1] pos, cells
+
+    # Count the cells of each thread.
+    for ii in range(num):
+        for ir in range(n_ep):
+            it = _get_row_thread(prb, n_thread, conn[iels[ii], ir])
+            if (it < 0) or (last[it] == ii): continue
+
+            last[it] = ii
+            cell_ptr[it + 1] += 1
+
+    cell_ptr = np.cumsum(cell_ptr, dtype=np.int32)
+    cells = np.empty(cell_ptr[n_thread], dtype=np.int32)
+    pos = cell_ptr[:n_thread].copy()
+    last[:] = -1
+
+    for ii in range(num):
+        for ir in range(n_ep):
+            it = _get_row_thread(prb, n_thread, conn[iels[ii], ir])
+            if (it < 0) or (last[it] == ii): continue
+
+            last[it] = ii
+            cells[pos[it]] = ii
+            pos[it] += 1
+
+    return cell_ptr, cells
+
+@cython.boundscheck(False)
+def assemble_vector_mt(float64[::1] vec not None,
+                       float64[:, :, :, ::1] vec_in_els not None,
+                       int32[::1] iels not None,
+                       float64 sign,
+                       int32[:, ::1] conn not None,
+                       int32[::1] row_bounds not None,
+                       int32[::1] cell_ptr=None,
+                       int32[::1] cells=None):
+    """
+    Thread-parallel version of :func:`assemble_vector()`.
+
+    Each thread owns the vector rows in [`row_bounds[it]`,
+    `row_bounds[it + 1]`), so that no two threads write to the same location.
+    The number of threads is `len(row_bounds) - 1`. Each thread loops only
+    over its cells given by `cell_ptr` and `cells`, see
+    :func:`get_thread_cells()`. If not given, they are computed.
+    """
+    cdef int32 it
+    cdef int32 num = iels.shape[0]
+    cdef int32 n_thread = row_bounds.shape[0] - 1
+    cdef int32 n_ep = conn.shape[1]
+    cdef int32 cell_size = vec_in_els.shape[2] * vec_in_els.shape[3]
+    cdef int32 *prb = &row_bounds[0]
+
+    assert num == vec_in_els.shape[0]
+    if num == 0: return
+
+    if (cell_ptr is None) or (cells is None):
+        cell_ptr, cells = get_thread_cells(iels, conn, row_bounds)
+
+    assert cell_ptr.shape[0] == n_thread + 1
+    if cells.shape[0] == 0: return
+
+    cdef int32 *pconn0 = &conn[0, 0]
+    cdef int32 *piels = &iels[0]
+    cdef int32 *pcp = &cell_ptr[0]
+    cdef int32 *pcells = &cells[0]
+    cdef float64 *val = &vec[0]
+    cdef float64 *vec_in_el0 = &vec_in_els[0, 0, 0, 0]
+
+    for it in prange(n_thread, nogil=True, num_threads=n_thread,
+                     schedule='static', chunksize=1):
+        _assemble_vector_rows(val, vec_in_el0, piels, pcells + pcp[it],
+                              pcp[it + 1] - pcp[it], sign, pconn0,
+                              n_ep, cell_size, prb[it], prb[it + 1])
+
+@cython.boundscheck(False)
+def assemble_matrix_mt(float64[::1] mtx not None,
+                       int32[::1] prows not None,
+                       int32[::1] cols not None,
+                       float64[:, :, :, ::1] mtx_in_els not None,
+                       int32[::1] iels not None,
+                       float64 sign,
+                       int32[:, ::1] row_conn not None,
+                       int32[:, ::1] col_conn not None,
+                       int32[::1] row_bounds not None,
+                       bint use_bsearch=False,
+                       int32[::1] cell_ptr=None,
+                       int32[::1] cells=None):
+    """
+    Thread-parallel version of :func:`assemble_matrix()` and
+    :func:`assemble_matrix_b()` (if `use_bsearch` is True).
+
+    Each thread owns the matrix rows in [`row_bounds[it]`,
+    `row_bounds[it + 1]`), so that no two threads write to the same CSR
+    data entry. The number of threads is `len(row_bounds) - 1`. Each thread
+    loops only over its cells given by `cell_ptr` and `cells`, see
+    :func:`get_thread_cells()`. If not given, they are computed.
+    """
+    cdef int32 it
+    cdef int32 n_missing = 0
+    cdef int32 num = iels.shape[0]
+    cdef int32 n_thread = row_bounds.shape[0] - 1
+    cdef int32 n_epr = row_conn.shape[1]
+    cdef int32 n_epc = col_conn.shape[1]
+    cdef int32 cell_size = mtx_in_els.shape[2] * mtx_in_els.shape[3]
+    cdef int32 bs = use_bsearch
+    cdef int32 *prb = &row_bounds[0]
+
+    assert num == mtx_in_els.shape[0]
+    if num == 0: return
+
+    if (cell_ptr is None) or (cells is None):
+        cell_ptr, cells = get_thread_cells(iels, row_conn, row_bounds)
+
+    assert cell_ptr.shape[0] == n_thread + 1
+    if cells.shape[0] == 0: return
+
+    cdef int32 *prow_conn0 = &row_conn[0, 0]
+    cdef int32 *pcol_conn0 = &col_conn[0, 0]
+    cdef int32 *piels = &iels[0]
+    cdef int32 *pcp = &cell_ptr[0]
+    cdef int32 *pcells = &cells[0]
+    cdef int32 *_prows = &prows[0]
+    cdef int32 *_cols = &cols[0]
+    cdef float64 *val = &mtx[0]
+    cdef float64 *mtx_in_el0 = &mtx_in_els[0, 0, 0, 0]
+
+    for it in prange(n_thread, nogil=True, num_threads=n_thread,
+                     schedule='static', chunksize=1):
+        n_missing += _assemble_matrix_rows(val, _prows, _cols, mtx_in_el0,
+                                           piels, pcells + pcp[it],
+                                           pcp[it + 1] - pcp[it], sign,
+                                           prow_conn0, pcol_conn0,
+                                           n_epr, n_epc, cell_size,
+                                           prb[it], prb[it + 1], bs)
+
+    if n_missing > 0:
+        msg = '%d matrix items do not exist!' % n_missing
+        raise IndexError(msg)
+
+@cython.boundscheck(False)
+def get_matrix_scatter_index(int32[::1] prows not None,
+                             int32[::1] cols not None,
+                             int32[::1] iels not None,
+                             int32[:, ::1] row_conn not None,
+                             int32[:, ::1] col_conn not None,
+                             bint use_bsearch=False):
+    """
+    Get the positions of the cell matrix entries in the CSR data array.
+
+    Returns
+    -------
+    index : array
+        The flat array of length `len(iels) * n_epr * n_epc` with the CSR data
+        positions of the `(cell, ir, ic)` cell matrix entries. Entries with
+        negative row or column DOFs have the index -1.
+    """
+    cdef int32 ii, iel, ir, ic, irg, icg, ik, iloc
+    cdef int32 num = iels.shape[0]
+    cdef int32 n_epr = row_conn.shape[1]
+    cdef int32 n_epc = col_conn.shape[1]
+    cdef int32 cell_size = n_epr * n_epc
+    cdef np.ndarray[int32, ndim=1] index = np.empty(
+        (<Py_ssize_t> num) * cell_size, dtype=np.int32
+    )
+    cdef (int32 *) prow_conn, pcol_conn, pindex
+    cdef int32 *_prows = &prows[0]
+    cdef int32 *_cols = &cols[0]
+
+    for ii in range(0, num):
+        iel = iels[ii]
+
+        prow_conn = &row_conn[iel, 0]
+        pcol_conn = &col_conn[iel, 0]
+        pindex = &index[(<Py_ssize_t> ii) * cell_size]
+
+        for ir in range(0, n_epr):
+            irg = prow_conn[ir]
+
+            for ic in range(0, n_epc):
+                icg = pcol_conn[ic]
+                iloc = n_epc * ir + ic
+
+                if (irg < 0) or (icg < 0):
+                    pindex[iloc] = -1
+                    continue
+
+                if use_bsearch:
+                    ik = bsearch(_cols, _prows[irg], _prows[irg + 1], icg)
+
+                else:
+                    ik = lsearch(_cols, _prows[irg], _prows[irg + 1], icg)
+
+                if ik >= 0:
+                    pindex[iloc] = ik
+
+                else:
+                    msg = 'matrix item (%d, %d) does not exist!' % (irg, icg)
+                    raise IndexError(msg)
+
+    return index
+
+@cython.boundscheck(False)
+def assemble_matrix_indexed(float64[::1] mtx not None,
+                            int32[::1] index not None,
+                            float64[:, :, :, ::1] mtx_in_els not None,
+                            float64 sign):
+    """
+    Assemble the cell matrices using the CSR data positions computed by
+    :func:`get_matrix_scatter_index()`.
+    """
+    cdef Py_ssize_t ii, num = index.shape[0]
+    cdef int32 ik
+    cdef float64 *val = &mtx[0]
+    cdef int32 *pindex = &index[0]
+    cdef float64 *mtx_in_el0
+
+    assert num == (mtx_in_els.shape[0] * mtx_in_els.shape[1]
+                   * mtx_in_els.shape[2] * mtx_in_els.shape[3])
+    if num == 0: return
+
+    mtx_in_el0 = &mtx_in_els[0, 0, 0, 0]
+    with nogil:
+        for ii in range(0, num):
+            ik = pindex[ii]
+            if ik < 0: continue
+
+            val[ik] += sign * mtx_in_el0[ii]
+
+@cython.boundscheck(False)
+def assemble_matrix_indexed_complex(complex128[::1] mtx not None,
+                                    int32[::1] index not None,
+                                    complex128[:, :, :, ::1]
+                                    mtx_in_els not None,
+                                    complex128 sign):
+    """
+    Assemble the complex cell matrices using the CSR data positions computed
+    by :func:`get_matrix_scatter_index()`.
+    """
+    cdef Py_ssize_t ii, num = index.shape[0]
+    cdef int32 ik
+    cdef complex128 *val = &mtx[0]
+    cdef int32 *pindex = &index[0]
+    cdef complex128 *mtx_in_el0
+
+    assert num == (mtx_in_els.shape[0] * mtx_in_els.shape[1]
+                   * mtx_in_els.shape[2] * mtx_in_els.shape[3])
+    if num == 0: return
+
+    mtx_in_el0 = &mtx_in_els[0, 0, 0, 0]
+    with nogil:
+        for ii in range(0, num):
+            ik = pindex[ii]
+            if ik < 0: continue
+
+            val[ik] += sign * mtx_in_el0[ii]
+
+cdef int _cmp_int32(const void *a, const void *b) noexcept nogil:
+    cdef int32 ia = (<int32 *> a)[0]
+    cdef int32 ib = (<int32 *> b)[0]
+    return (ia > ib) - (ia < ib)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def create_csr_graph(int32[:, ::1] row_conn not None,
+                     int32[:, ::1] col_conn not None,
+                     int32 n_row, int32 n_col):
+    """
+    Create the CSR matrix graph (sparsity pattern) with sorted and unique
+    column indices in each row from the row and column DOF connectivities.
+
+    The graph is created row by row, using the row DOF to cell adjacency, so
+    that the required memory is proportional to the number of nonzeros.
+    Negative DOFs in the connectivities are ignored.
+
+    Returns
+    -------
+    prows : array
+        The CSR row pointers.
+    cols : array
+        The CSR column indices.
+    """
+    cdef Py_ssize_t ii, ik, ic, nnz
+    cdef int32 irg, icg, iel, ir
+    cdef int32 n_cell = row_conn.shape[0]
+    cdef int32 n_epr = row_conn.shape[1]
+    cdef int32 n_epc = col_conn.shape[1]
+    cdef np.ndarray[int32, ndim=1] _rc_ptr, _rc_cells, _marker
+    cdef np.ndarray[int32, ndim=1] _prows, _cols
+    cdef int32 *rc_ptr
+    cdef int32 *rc_cells
+    cdef int32 *marker
+    cdef int32 *prows
+    cdef int32 *cols
+    cdef int32 *pcol_conn
+
+    if col_conn.shape[0] != n_cell:
+        raise ValueError('row and column connectivities do not match!'
+                         ' (%d == %d)' % (n_cell, col_conn.shape[0]))
+
+    # Row DOF -> cells adjacency.
+    _rc_ptr = np.zeros(n_row + 1, dtype=np.int32)
+    rc_ptr = &_rc_ptr[0]
+    for iel in range(n_cell):
+        for ir in range(n_epr):
+            irg = row_conn[iel, ir]
+            if irg >= 0:
+                if irg >= n_row:
+                    raise IndexError('row DOF %d out of range!' % irg)
+                rc_ptr[irg + 1] += 1
+
+    for ir in range(n_row):
+        rc_ptr[ir + 1] += rc_ptr[ir]
+
+    _rc_cells = np.empty(max(rc_ptr[n_row], 1), dtype=np.int32)
+    rc_cells = &_rc_cells[0]
+    _marker = np.empty(max(n_row, n_col, 1), dtype=np.int32)
+    marker = &_marker[0]
+    for ir in range(n_row):
+        marker[ir] = rc_ptr[ir]
+    for iel in range(n_cell):
+        for ir in range(n_epr):
+            irg = row_conn[iel, ir]
+            if irg >= 0:
+                rc_cells[marker[irg]] = iel
+                marker[irg] += 1
+
+    for iel in range(n_cell):
+        for ic in range(n_epc):
+            if col_conn[iel, ic] >= n_col:
+                raise IndexError('column DOF %d out of range!'
+                                 % col_conn[iel, ic])
+
+    # Count unique columns in each row.
+    _prows = np.empty(n_row + 1, dtype=np.int32)
+    prows = &_prows[0]
+    prows[0] = 0
+    nnz = 0
+    with nogil:
+        for ic in range(n_col):
+            marker[ic] = -1
+
+        for ir in range(n_row):
+            for ik in range(rc_ptr[ir], rc_ptr[ir + 1]):
+                pcol_conn = &col_conn[rc_cells[ik], 0]
+                for ic in range(n_epc):
+                    icg = pcol_conn[ic]
+                    if (icg >= 0) and (marker[icg] != ir):
+                        marker[icg] = ir
+                        nnz += 1
+
+            if nnz > 2147483647:
+                break
+
+            prows[ir + 1] = <int32> nnz
+
+    if nnz > 2147483647:
+        raise ValueError('too many nonzeros in the matrix graph!')
+
+    # Fill and sort the column indices.
+    _cols = np.empty(max(nnz, 1), dtype=np.int32)
+    cols = &_cols[0]
+    with nogil:
+        for ic in range(n_col):
+            marker[ic] = -1
+
+        for ir in range(n_row):
+            ii = prows[ir]
+            for ik in range(rc_ptr[ir], rc_ptr[ir + 1]):
+                pcol_conn = &col_conn[rc_cells[ik], 0]
+                for ic in range(n_epc):
+                    icg = pcol_conn[ic]
+                    if (icg >= 0) and (marker[icg] != ir):
+                        marker[icg] = ir
+                        cols[ii] = icg
+                        ii += 1
+
+            qsort(&cols[prows[ir]], prows[ir + 1] - prows[ir], sizeof(int32),
+                  _cmp_int32)
+
+    return _prows, _cols[:nnz]
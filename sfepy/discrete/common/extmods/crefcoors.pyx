@@ -238,3 +238,57 @@ cpdef evaluate_in_rc(float64[:, :, ::1] out,
             _f.fmf_fillC(_out, 0.0)
 
     pyfree(buf)
+
+@cython.boundscheck(False)
+cpdef eval_basis_in_rc(float64[:, :, ::1] out,
+                       float64[:, ::1] ref_coors,
+                       int32[::1] cells,
+                       int32[::1] status,
+                       int32 diff, _ctx):
+    """
+    Evaluate basis functions or gradients of basis functions in the given
+    reference element coordinates using the given interpolation. For
+    gradients, tranform the values to the material coordinates.
+
+    The values are stored in `out` with shape ``(n_point, bdim, n_ep)``, where
+    ``bdim`` is 1 for the basis functions and ``dim`` for the gradients. The
+    values in points with status greater than one are set to zero.
+    """
+    cdef int32 ip, ii
+    cdef int32 n_point = ref_coors.shape[0]
+    cdef int32 dim = ref_coors.shape[1]
+    cdef int32 bdim = out.shape[1]
+    cdef int32 n_ep = out.shape[2]
+    cdef int32 *_cells = &cells[0]
+    cdef int32 *_status = &status[0]
+    cdef CBasisContext __ctx = <CBasisContext> _ctx
+    cdef BasisContext *ctx = <BasisContext *> __ctx.ctx
+    cdef FMField[1] _ref_coors, _out, bf
+    cdef float64 *buf
+
+    if diff:
+        assert bdim == dim
+
+    buf = <float64 *> pyalloc(n_ep * bdim * sizeof(float64))
+
+    _f.fmf_pretend_nc(_out, n_point, 1, bdim, n_ep, &out[0, 0, 0])
+    _f.fmf_pretend_nc(_ref_coors, n_point, 1, 1, dim, &ref_coors[0, 0])
+    _f.fmf_pretend_nc(bf, 1, 1, bdim, n_ep, buf)
+
+    ctx.is_dx = 1
+
+    for ip in range(0, n_point):
+        _f.FMF_SetCell(_out, ip)
+        _f.FMF_SetCell(_ref_coors, ip)
+
+        if _status[ip] <= 1:
+            ctx.iel = _cells[ip]
+            ctx.eval_basis(bf, _ref_coors, diff, <void *> ctx)
+
+            for ii in range(0, n_ep * bdim):
+                _out.val[ii] = bf.val[ii]
+
+        else:
+            _f.fmf_fillC(_out, 0.0)
+
+    pyfree(buf)
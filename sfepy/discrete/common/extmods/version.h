@@ -0,0 +1,10 @@
+/*!
+  @par Revision history:
+  - 12.01.2001, c
+*/
+#ifndef _VERSION_H_
+#define _VERSION_H_
+
+#define VERSION 2025.1+git.113280fbbb42611135adc2f367a0ed592e81f8cb
+
+#endif /* Header */
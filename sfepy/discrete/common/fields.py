@@ -5,6 +5,7 @@ import numpy as nm
 from sfepy.base.base import output, iter_dict_of_lists, Struct, basestr,\
     assert_
 from sfepy.base.timing import Timer
+from sfepy.discrete.common.mappings import mapping_cache
 import six
 from sfepy.mechanics.tensors import get_cauchy_strain
 
@@ -190,6 +191,7 @@ class Field(Struct):
         """
         Clear current reference mappings.
         """
+        mapping_cache.remove_field(self)
         self.mappings = {}
         if clear_all:
             if hasattr(self, 'mappings0'):
@@ -221,7 +223,10 @@ class Field(Struct):
         corresponding to the field approximation.
 
         The mappings are cached in the field instance in `mappings`
-        attribute. The mappings can be saved to `mappings0` using
+        attribute, and registered in the process-wide
+        :class:`MappingCache <sfepy.discrete.common.mappings.MappingCache>`,
+        that shares the mapping data among fields and limits the memory of
+        the cached mappings. The mappings can be saved to `mappings0` using
         `Field.save_mappings`. The saved mapping can be retrieved by
         passing `get_saved=True`. If the required (saved) mapping
         is not in cache, a new one is created.
@@ -248,11 +253,11 @@ class Field(Struct):
                     m.normal[:] = m[4]
                 out = m, i
         else:
-            out = self.mappings.get(key, None)
+            out = mapping_cache.get(self, key)
 
         if out is None:
             out = self.create_mapping(region, integral, integration)
-            self.mappings[key] = out
+            out = mapping_cache.put(self, key, out)
 
         if return_key:
             out = out + (key,)
@@ -344,10 +349,25 @@ class Field(Struct):
         created by `Field.create_mesh()`.
         """
 
+    def create_point_locator(self, coors, strategy='general', close_limit=0.1,
+                             get_cells_fun=None, cache=None, verbose=False):
+        """
+        Create a :class:`PointLocator
+        <sfepy.discrete.common.global_interp.PointLocator>` instance for
+        repeated evaluations of the field in the given coordinates. See
+        :func:`Field.evaluate_at()` for the description of the arguments.
+        """
+        from sfepy.discrete.common.global_interp import PointLocator
+
+        return PointLocator(self, coors, strategy=strategy,
+                            close_limit=close_limit,
+                            get_cells_fun=get_cells_fun, cache=cache,
+                            verbose=verbose)
+
     def evaluate_at(self, coors, source_vals, mode='val', strategy='general',
                     close_limit=0.1, get_cells_fun=None, cache=None,
                     ret_cells=False, ret_status=False, ret_ref_coors=False,
-                    verbose=False):
+                    locator=None, verbose=False):
         """
         Evaluate source DOF values corresponding to the field in the given
         coordinates using the field interpolation.
@@ -389,6 +409,12 @@ class Field(Struct):
             If True, return also the enclosing cell status for each point.
         ret_cells : bool, optional
             If True, return also the cell indices the coordinates are in.
+        locator : PointLocator instance, optional
+            If given, the point location and interpolation data precomputed
+            in the locator coordinates by
+            :func:`Field.create_point_locator()` are used, and `coors`,
+            `strategy`, `close_limit`, `get_cells_fun` and `cache` are ignored.
+            The locator is updated if the field mesh coordinates changed.
         verbose : bool
             If False, reduce verbosity.
 
@@ -417,14 +443,21 @@ class Field(Struct):
         from sfepy.discrete.common.extmods.crefcoors import evaluate_in_rc
         from sfepy.base.base import complex_types
 
+        if locator is not None:
+            coors = locator.coors
+
         output('evaluating in %d points...' % coors.shape[0], verbose=verbose)
 
-        ref_coors, cells, status = get_ref_coors(self, coors,
-                                                 strategy=strategy,
-                                                 close_limit=close_limit,
-                                                 get_cells_fun=get_cells_fun,
-                                                 cache=cache,
-                                                 verbose=verbose)
+        if locator is None:
+            ref_coors, cells, status = get_ref_coors(
+                self, coors, strategy=strategy, close_limit=close_limit,
+                get_cells_fun=get_cells_fun, cache=cache, verbose=verbose
+            )
+
+        else:
+            locator.update()
+            ref_coors, cells, status = (locator.ref_coors, locator.cells,
+                                        locator.status)
 
         timer = Timer(start=True)
 
@@ -440,21 +473,25 @@ class Field(Struct):
             vals = nm.empty((nc, n_comp, dim), dtype=source_dtype)
             cmode = 1
 
-        ctx = self.create_basis_context()
-        econn = self.get_econn(('cell', self.region.tdim), self.region)
-
-        if source_vals.dtype in complex_types:
-            valsi = vals.copy()
-            evaluate_in_rc(vals, ref_coors, cells, status,
-                           nm.ascontiguousarray(source_vals.real),
-                           econn, cmode, ctx)
-            evaluate_in_rc(valsi, ref_coors, cells, status,
-                           nm.ascontiguousarray(source_vals.imag),
-                           econn, cmode, ctx)
-            vals = vals + valsi * 1j
+        if locator is not None:
+            vals = locator.evaluate(source_vals, diff=cmode)
+
         else:
-            evaluate_in_rc(vals, ref_coors, cells, status, source_vals,
-                           econn, cmode, ctx)
+            ctx = self.create_basis_context()
+            econn = self.get_econn(('cell', self.region.tdim), self.region)
+
+            if source_vals.dtype in complex_types:
+                valsi = vals.copy()
+                evaluate_in_rc(vals, ref_coors, cells, status,
+                               nm.ascontiguousarray(source_vals.real),
+                               econn, cmode, ctx)
+                evaluate_in_rc(valsi, ref_coors, cells, status,
+                               nm.ascontiguousarray(source_vals.imag),
+                               econn, cmode, ctx)
+                vals = vals + valsi * 1j
+            else:
+                evaluate_in_rc(vals, ref_coors, cells, status, source_vals,
+                               econn, cmode, ctx)
 
         output('interpolation: %f s' % timer.stop(),verbose=verbose)
 
@@ -1,9 +1,10 @@
 """
 Global interpolation functions.
 """
+
 import numpy as nm
 
-from sfepy.base.base import assert_, output, get_default_attr
+from sfepy.base.base import assert_, output, get_default_attr, Struct
 from sfepy.base.timing import Timer
 from sfepy.discrete.fem.geometry_element import create_geometry_elements
 import sfepy.discrete.common.extmods.crefcoors as crc
@@ -158,36 +159,45 @@ def get_potential_cells(coors, cmesh, centroids=None, extrapolate=True):
     rays = cell_coors - centroids[:, None]
     radii = nm.linalg.norm(rays, ord=nm.inf, axis=2).max(axis=1)
 
-    potential_cells = [[]] * coors.shape[0]
-    for ic, centroid in enumerate(centroids):
-        ips = kdtree.query_ball_point(centroid, radii[ic], p=nm.inf)
-        if len(ips):
-            for ip in ips:
-                if not len(potential_cells[ip]):
-                    potential_cells[ip] = []
-
-                potential_cells[ip].append(ic)
+    # A single bulk query for all cells: ips[ii] are the points potentially
+    # in the cell ics[ii].
+    aux = kdtree.query_ball_point(centroids, radii, p=nm.inf,
+                                  return_sorted=False)
+    n_ips = nm.fromiter((len(ii) for ii in aux), dtype=nm.int32,
+                        count=len(aux))
+    ics = nm.repeat(nm.arange(cmesh.n_el, dtype=nm.int32), n_ips)
+    ips = (nm.concatenate(aux).astype(nm.int32) if n_ips.sum()
+           else nm.empty(0, dtype=nm.int32))
+    del aux
 
-    lens = nm.array([0] + [len(ii) for ii in potential_cells], dtype=nm.int32)
+    n_pt = coors.shape[0]
+    lens = nm.bincount(ips, minlength=n_pt).astype(nm.int32)
 
     if extrapolate:
         # Deal with the points outside of the field domain - insert elements
         # incident to the closest mesh vertex.
-        iin = nm.where(lens[1:] == 0)[0]
+        iin = nm.where(lens == 0)[0]
         if len(iin):
             kdtree = KDTree(cmesh.coors)
-            ics = kdtree.query(coors[iin])[1]
+            ivs = kdtree.query(coors[iin])[1]
             cmesh.setup_connectivity(0, cmesh.tdim)
             conn = cmesh.get_conn(0, cmesh.tdim)
 
             oo = conn.offsets
-            for ii, ip in enumerate(iin):
-                ik = ics[ii]
-                potential_cells[ip] = conn.indices[oo[ik]:oo[ik+1]]
-                lens[ip+1] = len(potential_cells[ip])
+            n_ics = (oo[ivs + 1] - oo[ivs]).astype(nm.int32)
+            ii = (nm.repeat(oo[ivs] - (nm.cumsum(n_ics) - n_ics), n_ics)
+                  + nm.arange(n_ics.sum()))
+
+            ics = nm.r_[ics, conn.indices[ii].astype(nm.int32)]
+            ips = nm.r_[ips, nm.repeat(iin, n_ics).astype(nm.int32)]
+            lens[iin] = n_ics
+
+    # Group the cells by points, keeping the increasing cell order.
+    ii = nm.argsort(ips, kind='stable')
+    potential_cells = ics[ii]
 
-    offsets = nm.cumsum(lens, dtype=nm.int32)
-    potential_cells = nm.concatenate(potential_cells).astype(nm.int32)
+    offsets = nm.zeros(n_pt + 1, dtype=nm.int32)
+    nm.cumsum(lens, out=offsets[1:])
 
     return potential_cells, offsets
 
@@ -357,3 +367,172 @@ def get_ref_coors(field, coors, strategy='general', close_limit=0.1,
 
     else:
         raise ValueError('unsupported strategy! (%s)' % strategy)
+
+class PointLocator(Struct):
+    """
+    Point location and interpolation data of a field in a fixed set of
+    physical coordinates.
+
+    The cells containing the points, the reference element coordinates of the
+    points and the basis function values (or gradients) in the points are
+    computed once, so that a repeated evaluation of the field DOF values in
+    the points reduces to a sparse matrix-vector product. The data are
+    recomputed automatically when the field mesh coordinates change. The
+    changes are detected using the coordinate version counters of the domain
+    and the field, that are increased by :func:`set_mesh_coors()
+    <sfepy.discrete.fem.fields_base.set_mesh_coors>` and
+    :func:`FEField.set_coors()
+    <sfepy.discrete.fem.fields_base.FEField.set_coors>`. After modifying the
+    coordinates in place by other means, call :func:`update()` with
+    `force=True`.
+
+    Parameters
+    ----------
+    field : Field instance
+        The field defining the approximation.
+    coors : array
+        The physical coordinates.
+    strategy : {'general', 'convex'}, optional
+        The strategy for finding the elements that contain the coordinates.
+    close_limit : float, optional
+        The maximum limit distance of a point from the closest
+        element allowed for extrapolation.
+    get_cells_fun : callable, optional
+        See :func:`get_ref_coors()`.
+    cache : Struct, optional
+        The evaluate cache used for the first point location, see
+        :func:`get_ref_coors()`.
+    verbose : bool
+        If False, reduce verbosity.
+    """
+
+    def __init__(self, field, coors, strategy='general', close_limit=0.1,
+                 get_cells_fun=None, cache=None, verbose=False):
+        Struct.__init__(self, name='point_locator', field=field,
+                        coors=nm.array(coors, dtype=nm.float64),
+                        strategy=strategy, close_limit=close_limit,
+                        get_cells_fun=get_cells_fun, verbose=verbose,
+                        coors_version=None)
+        self.update(cache=cache)
+
+    def get_coors_version(self):
+        """
+        Return the version of the field mesh and DOF coordinates.
+        """
+        return (getattr(self.field.domain, 'coors_version', 0),
+                getattr(self.field, 'coors_version', 0))
+
+    def is_valid(self):
+        """
+        Return True, if the field mesh coordinates did not change since the
+        last point location.
+        """
+        return self.coors_version == self.get_coors_version()
+
+    def update(self, cache=None, force=False):
+        """
+        Locate the points in the field mesh, if the mesh coordinates changed
+        or if `force` is True.
+
+        Parameters
+        ----------
+        cache : Struct, optional
+            The evaluate cache, see :func:`get_ref_coors()`. It is not used
+            after the mesh coordinates changed.
+        force : bool
+            If True, locate the points regardless of the mesh coordinates.
+
+        Returns
+        -------
+        updated : bool
+            True, if the points were located.
+        """
+        coors_version = self.get_coors_version()
+        if (not force) and (coors_version == self.coors_version):
+            return False
+
+        if self.coors_version is not None:
+            cache = None
+
+        self.ref_coors, self.cells, self.status = get_ref_coors(
+            self.field, self.coors, strategy=self.strategy,
+            close_limit=self.close_limit, get_cells_fun=self.get_cells_fun,
+            cache=cache, verbose=self.verbose
+        )
+        self.operators = {}
+        self.coors_version = coors_version
+
+        return True
+
+    def get_operator(self, diff=0):
+        """
+        Get the sparse matrix interpolating the field DOF values into the
+        points.
+
+        Parameters
+        ----------
+        diff : 0 or 1
+            If 1, the operator evaluates the gradients, otherwise the values.
+
+        Returns
+        -------
+        operator : scipy.sparse.csr_matrix
+            The operator with shape ``(n_point * bdim, n_nod)``, where
+            ``bdim`` is 1 for the values and ``dim`` for the gradients. The
+            rows corresponding to points with status greater than one are
+            zero.
+        """
+        import scipy.sparse as sps
+
+        operator = self.operators.get(diff)
+        if operator is not None:
+            return operator
+
+        field = self.field
+        n_point, dim = self.coors.shape
+        bdim = dim if diff else 1
+
+        econn = field.get_econn(('cell', field.region.tdim), field.region)
+        n_ep = econn.shape[1]
+
+        bfs = nm.empty((n_point, bdim, n_ep), dtype=nm.float64)
+        ctx = field.create_basis_context()
+        crc.eval_basis_in_rc(bfs, self.ref_coors, self.cells, self.status,
+                             diff, ctx)
+
+        cells = nm.where(self.status <= 1, self.cells, 0)
+        rows = nm.repeat(nm.arange(n_point * bdim, dtype=nm.int32), n_ep)
+        cols = nm.repeat(econn[cells], bdim, axis=0)
+        operator = sps.csr_matrix((bfs.ravel(), (rows, cols.ravel())),
+                                  shape=(n_point * bdim, field.n_nod))
+
+        self.operators[diff] = operator
+
+        return operator
+
+    def evaluate(self, source_vals, diff=0):
+        """
+        Evaluate the source DOF values or their gradients in the points.
+
+        Parameters
+        ----------
+        source_vals : array, shape ``(n_nod, n_components)``
+            The source DOF values corresponding to the field.
+        diff : 0 or 1
+            If 1, evaluate the gradients, otherwise the values.
+
+        Returns
+        -------
+        vals : array
+            The interpolated values with shape ``(n_point, n_components, 1)``
+            or gradients with shape ``(n_point, n_components, dim)``. The
+            values in points with status greater than one are zero.
+        """
+        self.update()
+
+        operator = self.get_operator(diff=diff)
+        n_point = self.coors.shape[0]
+        vals = operator @ source_vals
+        vals = vals.reshape((n_point, -1, source_vals.shape[1]))
+
+        return vals.transpose((0, 2, 1))
@@ -1,9 +1,14 @@
 """
 Reference-physical domain mappings.
 """
+from collections import OrderedDict
+import hashlib
+import threading
+import weakref
+
 import numpy as nm
 
-from sfepy.base.base import Struct
+from sfepy.base.base import Struct, goptions
 from sfepy.discrete.common.extmods.cmapping import CMapping
 
 
@@ -28,6 +33,21 @@ class PyCMapping(Struct):
         self.dim = dim
         self.n_ep = n_ep
 
+    def get_chunk(self, ic0, ic1):
+        """
+        Return a new mapping restricted to the cells (or facets) `ic0` to
+        `ic1 - 1`. The data are views of the original data.
+        """
+        def _slice(arr):
+            if (arr is None) or (arr.shape[0] != self.n_el):
+                return arr
+
+            return arr[ic0:ic1]
+
+        return PyCMapping(_slice(self.bf), _slice(self.det),
+                          _slice(self.volume), _slice(self.bfg),
+                          _slice(self.normal), self.dim)
+
     def integrate(self, out, field, mode=0):
         dim = field.shape[2]
         if mode < 3 or dim == 1:
@@ -40,6 +60,231 @@ class PyCMapping(Struct):
         return 0
 
 
+class MappingCache(Struct):
+    """
+    The process-wide cache of the reference mappings of all fields.
+
+    The mapping data arrays (`bf`, `det`, `volume`, `bfg`, `normal`) with the
+    same contents are shared among all cached mappings, so that the fields
+    defined on the same region and integrated by the same integral share the
+    geometry data (jacobians, volumes, normals). The basis data are shared
+    only if they are equal, for example for fields with the same basis.
+
+    The entries are kept in the least recently used order. If the
+    'mapping_cache_max_mem' global option is set (in MB), the least recently
+    used mappings are removed from the fields until the memory occupied by
+    the cached data fits, but the most recently used mapping is always
+    kept. The removed mappings are recomputed when needed again.
+
+    The public methods are serialized by a lock, so that the cache can be
+    used also by background threads.
+    """
+    names = ('bf', 'det', 'volume', 'bfg', 'normal')
+
+    def __init__(self):
+        Struct.__init__(self, entries=OrderedDict(), arrays={}, shapes={},
+                        finalizers={}, mem=0, n_hit=0, n_miss=0,
+                        n_evicted=0, n_shared=0, lock=threading.RLock())
+
+    @staticmethod
+    def _get_digest(arr):
+        sha1 = hashlib.sha1()
+        sha1.update(str((arr.shape, arr.dtype.str)).encode())
+        sha1.update(nm.ascontiguousarray(arr))
+        return sha1.hexdigest()
+
+    def _add_array(self, arr):
+        """
+        Return an array with the same contents as `arr` already in the cache,
+        or add `arr` to the cache. The array digests are computed only when
+        there is another array of the same shape.
+        """
+        skey = (arr.shape, arr.dtype.str)
+        items = self.shapes.setdefault(skey, [])
+        item = None
+        if len(items):
+            digest = self._get_digest(arr)
+            for ii in items:
+                if ii.digest is None:
+                    ii.digest = self._get_digest(ii.arr)
+
+                if ii.digest == digest:
+                    item = ii
+                    break
+
+        else:
+            digest = None
+
+        if item is None:
+            item = Struct(arr=arr, digest=digest, count=0)
+            items.append(item)
+            self.arrays[id(arr)] = item
+            self.mem += arr.nbytes
+
+        elif item.arr is not arr:
+            self.n_shared += 1
+
+        item.count += 1
+
+        return item.arr
+
+    def _remove_array(self, arr):
+        item = self.arrays[id(arr)]
+        item.count -= 1
+        if item.count == 0:
+            del self.arrays[id(arr)]
+            items = self.shapes[(arr.shape, arr.dtype.str)]
+            items.remove(item)
+            if not len(items):
+                del self.shapes[(arr.shape, arr.dtype.str)]
+            self.mem -= arr.nbytes
+
+    def _share(self, geo):
+        arrays = [getattr(geo, name) for name in self.names]
+        shared = [arr if arr is None else self._add_array(arr)
+                  for arr in arrays]
+
+        if any(arr is not sarr for arr, sarr in zip(arrays, shared)):
+            sgeo = PyCMapping(*(shared + [geo.dim]))
+            for key, val in geo.__dict__.items():
+                if key not in sgeo.__dict__:
+                    setattr(sgeo, key, val)
+            geo = sgeo
+
+        return geo
+
+    def _get_entry_key(self, field, key):
+        return (id(field), key)
+
+    def get(self, field, key):
+        """
+        Return the cached mapping of `field` with `key`, or None.
+        """
+        ekey = self._get_entry_key(field, key)
+        with self.lock:
+            entry = self.entries.get(ekey)
+            if entry is None:
+                self.n_miss += 1
+                return None
+
+            self.n_hit += 1
+            self.entries.move_to_end(ekey)
+
+            return field.mappings.get(key)
+
+    def put(self, field, key, out):
+        """
+        Put the mapping `out` = `(geo, mapping)` of `field` with `key` to the
+        cache, with the mapping data shared with the other cached mappings.
+        Return the, possibly new, `(geo, mapping)` tuple, that is also stored
+        in `field.mappings`.
+        """
+        with self.lock:
+            self.remove(field, key)
+
+            geo, mapping = out
+            if isinstance(geo, PyCMapping):
+                geo = self._share(geo)
+                arrays = [getattr(geo, name) for name in self.names]
+                arrays = [arr for arr in arrays if arr is not None]
+
+            else:
+                arrays = []
+
+            fid = id(field)
+            if fid not in self.finalizers:
+                self.finalizers[fid] = weakref.finalize(field, self._finalize,
+                                                        fid)
+
+            out = (geo, mapping)
+            ekey = self._get_entry_key(field, key)
+            self.entries[ekey] = (weakref.ref(field), arrays)
+            field.mappings[key] = out
+
+            self.shrink()
+
+        return out
+
+    def remove(self, field, key):
+        """
+        Remove the mapping of `field` with `key` from the cache and from
+        `field.mappings`.
+        """
+        with self.lock:
+            entry = self.entries.pop(self._get_entry_key(field, key), None)
+            if entry is not None:
+                self._remove_entry(key, entry)
+
+    def _remove_entry(self, key, entry):
+        fref, arrays = entry
+        for arr in arrays:
+            self._remove_array(arr)
+
+        field = fref()
+        if field is not None:
+            field.mappings.pop(key, None)
+
+    def _remove_field(self, fid):
+        for ekey in [ekey for ekey in self.entries.keys() if ekey[0] == fid]:
+            self._remove_entry(ekey[1], self.entries.pop(ekey))
+
+    def _finalize(self, fid):
+        with self.lock:
+            self.finalizers.pop(fid, None)
+            self._remove_field(fid)
+
+    def remove_field(self, field):
+        """
+        Remove all cached mappings of `field`.
+        """
+        with self.lock:
+            self._remove_field(id(field))
+
+    def shrink(self, max_mem=None):
+        """
+        Remove the least recently used mappings, until the memory occupied by
+        the cached mapping data is less than `max_mem` in MB. If `max_mem` is
+        None, the 'mapping_cache_max_mem' global option is used. The most
+        recently used mapping is always kept.
+        """
+        if max_mem is None:
+            max_mem = goptions['mapping_cache_max_mem']
+            if max_mem is None:
+                return
+
+        max_mem = max_mem * 1024**2
+        with self.lock:
+            while (self.mem > max_mem) and (len(self.entries) > 1):
+                ekey, entry = self.entries.popitem(last=False)
+                self._remove_entry(ekey[1], entry)
+                self.n_evicted += 1
+
+    def clear(self):
+        """
+        Remove all cached mappings and reset the statistics.
+        """
+        with self.lock:
+            for ekey in list(self.entries.keys()):
+                self._remove_entry(ekey[1], self.entries.pop(ekey))
+
+            for finalizer in self.finalizers.values():
+                finalizer.detach()
+            self.finalizers.clear()
+
+            self.n_hit = self.n_miss = self.n_evicted = self.n_shared = 0
+
+    def get_stats(self):
+        """
+        Return the cache statistics: the numbers of cached mappings, hits,
+        misses, evicted mappings and shared arrays, and the memory occupied
+        by the cached mapping data in MB.
+        """
+        return Struct(n_entry=len(self.entries), n_hit=self.n_hit,
+                      n_miss=self.n_miss, n_evicted=self.n_evicted,
+                      n_shared=self.n_shared, mem=self.mem / 1024**2)
+
+mapping_cache = MappingCache()
+
 class PhysicalQPs(Struct):
     """
     Physical quadrature points in a region.
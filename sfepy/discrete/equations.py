@@ -2,18 +2,74 @@
 Classes of equations composed of terms.
 """
 from copy import copy
+import hashlib
+import os
+import os.path as op
+import tempfile
+import zipfile
 
 import numpy as nm
 import scipy.sparse as sp
 
-from sfepy.base.base import output, assert_, get_default, iter_dict_of_lists
+from sfepy.base.base import (output, assert_, get_default, goptions,
+                             iter_dict_of_lists)
 from sfepy.base.base import OneTypeList, Container, Struct
-from sfepy.base.timing import Timer
+from sfepy.base.ioutils import ensure_path
+from sfepy.base.timing import Timer, Profiler
+from sfepy.linalg.sparse import set_matrix_version
 from sfepy.linalg.utils import chunk_arrays, cycle
 from sfepy.discrete import Materials, Variables, create_adof_conns
+from sfepy.discrete.common.extmods.assemble import create_csr_graph
 from sfepy.terms import Terms, Term
 from sfepy.terms.terms_multilinear import ETermBase
 
+# Collects the term evaluation statistics if the global option
+# 'profile_terms' is True.
+term_profiler = Profiler(name='term_profiler',
+                         time_keys=('get_fargs', 'eval', 'assemble'))
+
+def _get_profile_key(equation, term, mode):
+    return '%s: %s [%s]' % (equation.name, term.get_str(), mode)
+
+def _profile_chunks(equation, term, mode, chunks):
+    """
+    Profile the term evaluation generator `chunks`, excluding the time spent
+    outside of the generator.
+    """
+    key = _get_profile_key(equation, term, mode)
+    term_profiler.add(key, n_call=1)
+
+    timer = Timer()
+    term.fargs_time = 0.0
+    timer.start()
+    for val, iels, status in chunks:
+        dt = timer.stop()
+        vals = val if isinstance(val, tuple) else (val,)
+        term_profiler.add(key, get_fargs=term.fargs_time,
+                          eval=dt - term.fargs_time,
+                          n_cell=len(iels) if iels is not None else 0,
+                          nbytes=sum(getattr(ii, 'nbytes', 0)
+                                     for ii in vals))
+        term.fargs_time = 0.0
+        yield val, iels, status
+
+        timer.start()
+
+    term_profiler.add(key, eval=timer.stop())
+
+def _profile_assemble(assemble, mode):
+    """
+    Profile the assembling function `assemble`.
+    """
+    def _assemble(equation, it, term, *args, **kwargs):
+        timer = Timer(start=True)
+        out = assemble(equation, it, term, *args, **kwargs)
+        term_profiler.add(_get_profile_key(equation, term, mode),
+                          assemble=timer.stop())
+        return out
+
+    return _assemble
+
 def parse_definition(equation_def):
     """
     Parse equation definition string to create term description list.
@@ -65,8 +121,22 @@ def create_dof_graph(rdc, cdc, shape, active_only=False):
 
     return graph
 
+def _get_graph_digest(rdcs, cdcs, shape):
+    """
+    Get the SHA1 digest of the DOF connectivities determining the matrix
+    graph.
+    """
+    sha1 = hashlib.sha1()
+    sha1.update(nm.array(shape, dtype=nm.int64).tobytes())
+    for rdc, cdc in zip(rdcs, cdcs):
+        for conn in (rdc, cdc):
+            sha1.update(nm.array(conn.shape, dtype=nm.int64).tobytes())
+            sha1.update(nm.ascontiguousarray(conn, dtype=nm.int32).tobytes())
+
+    return sha1.hexdigest()
+
 def create_matrix_graph(rdcs, cdcs, irs, ics, rdi, cdi, active_only=True,
-                        chunk_size=200000):
+                        chunk_size=200000, method='native', cache_dir=None):
     """
     Created the matrix graph using (active) DOF connectivities.
 
@@ -84,58 +154,143 @@ def create_matrix_graph(rdcs, cdcs, irs, ics, rdi, cdi, active_only=True,
         reduced (active DOFs only) numbering.
     chunk_size : int
         The maximum number of cells added to the graph in one
-        :func:`create_dof_graph()` call.
+        :func:`create_dof_graph()` call, if `method` is 'coo'.
+    method : 'native' or 'coo'
+        If 'native', the graph is created directly in the CSR format by
+        :func:`create_csr_graph()
+        <sfepy.discrete.common.extmods.assemble.create_csr_graph()>`, with
+        memory proportional to the number of nonzeros. If 'coo', the graph
+        is summed from COO matrices created by :func:`create_dof_graph()`.
+    cache_dir : str, optional
+        If given, the graph is loaded from or saved to this directory, in a
+        file named by the digest of the DOF connectivities.
 
     Returns
     -------
     graph : boolean csr_matrix
         The matrix graph.
     """
-    blocks = []
     roffs = [ii.start for ii in rdi.indx.values()]
     coffs = [ii.start for ii in cdi.indx.values()]
     nrs = [ii.stop - ii.start for ii in rdi.indx.values()]
     ncs = [ii.stop - ii.start for ii in cdi.indx.values()]
-
     nbr, nbc = max(irs) + 1, max(ics) + 1
-    blocks = [[0] * nbc for ir in range(nbr)]
-    for ii, rdc in enumerate(rdcs):
-        cdc = cdcs[ii]
+    shape = (sum(nrs[:nbr]), sum(ncs[:nbc]))
+
+    if cache_dir is not None:
+        digest = _get_graph_digest(rdcs, cdcs, shape)
+        filename = op.join(cache_dir, 'graph_%s.npz' % digest)
+        graph = _load_graph(filename, shape)
+        if graph is not None:
+            return graph
+
+    if method == 'native':
+        n_epr = max(rdc.shape[1] for rdc in rdcs)
+        n_epc = max(cdc.shape[1] for cdc in cdcs)
+        # Pad the connectivities to a common width with -1.
+        def _concatenate(conns, n_ep):
+            conns = [nm.pad(conn, ((0, 0), (0, n_ep - conn.shape[1])),
+                            constant_values=-1)
+                     if conn.shape[1] < n_ep else conn
+                     for conn in conns]
+            return nm.ascontiguousarray(nm.concatenate(conns),
+                                        dtype=nm.int32)
+
+        prows, cols = create_csr_graph(_concatenate(rdcs, n_epr),
+                                       _concatenate(cdcs, n_epc),
+                                       shape[0], shape[1])
+        vals = nm.ones(len(cols), dtype=bool)
+        graph = sp.csr_matrix((vals, cols, prows), shape=shape)
+
+    elif method == 'coo':
+        blocks = [[0] * nbc for ir in range(nbr)]
+        for ii, rdc in enumerate(rdcs):
+            cdc = cdcs[ii]
+
+            ir = irs[ii]
+            ic = ics[ii]
+
+            # Offset back row, column connectivities to start from 0 -
+            # sp.bmat() takes care of the offsets then.
+            srdc = rdc - roffs[ir]
+            scdc = cdc - coffs[ic]
+
+            bshape = (nrs[ir], ncs[ic])
+
+            # N - k C >= 0.5 C, k = N // Cmax, compute C.
+            n_cell = srdc.shape[0]
+            cs = int(n_cell / (n_cell // chunk_size + 0.5))
+            for ichunk, (_rdc, _cdc) in enumerate(chunk_arrays((srdc, scdc),
+                                                               cs)):
+                if ichunk == 0:
+                    block = create_dof_graph(_rdc, _cdc, bshape, active_only)
+
+                else:
+                    block += create_dof_graph(_rdc, _cdc, bshape, active_only)
+
+            if isinstance(blocks[ir][ic], int):
+                blocks[ir][ic] = block
 
-        ir = irs[ii]
-        ic = ics[ii]
+            else:
+                blocks[ir][ic] += block
 
-        # Offset back row, column connectivities to start from 0 - sp.bmat()
-        # takes care of the offsets then.
-        srdc = rdc - roffs[ir]
-        scdc = cdc - coffs[ic]
+        for ir, ic in cycle((nbr, nbc)):
+            if isinstance(blocks[ir][ic], int):
+                blocks[ir][ic] = None
 
-        shape = (nrs[ir], ncs[ic])
+        graph = sp.bmat(blocks, format='csr')
 
-        # N - k C >= 0.5 C, k = N // Cmax, compute C.
-        n_cell = srdc.shape[0]
-        cs = int(n_cell / (n_cell // chunk_size + 0.5))
-        for ichunk, (_rdc, _cdc) in enumerate(chunk_arrays((srdc, scdc), cs)):
-            if ichunk == 0:
-                block = create_dof_graph(_rdc, _cdc, shape, active_only)
+    else:
+        raise ValueError('unknown matrix graph method! (%s)' % method)
 
-            else:
-                block += create_dof_graph(_rdc, _cdc, shape, active_only)
+    if cache_dir is not None:
+        _save_graph(filename, graph)
 
-        if isinstance(blocks[ir][ic], int):
-            blocks[ir][ic] = block
+    return graph
 
-        else:
-            blocks[ir][ic] += block
+def _load_graph(filename, shape):
+    """
+    Load the cached matrix graph from `filename`. Return None if the file does
+    not exist, or cannot be read, for example when it is corrupted.
+    """
+    if not op.exists(filename):
+        return None
 
-    for ir, ic in cycle((nbr, nbc)):
-        if isinstance(blocks[ir][ic], int):
-            blocks[ir][ic] = None
+    try:
+        with nm.load(filename) as data:
+            prows, cols = data['prows'], data['cols']
+
+        if len(prows) != (shape[0] + 1):
+            raise ValueError('wrong number of rows!')
+
+        vals = nm.ones(len(cols), dtype=bool)
+        graph = sp.csr_matrix((vals, cols, prows), shape=shape)
 
-    graph = sp.bmat(blocks, format='csr')
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as exc:
+        output('WARNING: cannot load matrix graph from %s! (%s)'
+               % (filename, exc))
+        return None
 
     return graph
 
+def _save_graph(filename, graph):
+    """
+    Save the matrix graph to `filename` atomically, so that concurrent
+    processes never read a partially written file.
+    """
+    ensure_path(filename)
+    fd, tmp_filename = tempfile.mkstemp(suffix='.tmp',
+                                        dir=op.dirname(filename))
+    try:
+        with os.fdopen(fd, 'wb') as fd:
+            nm.savez(fd, prows=graph.indptr, cols=graph.indices)
+        os.replace(tmp_filename, filename)
+
+    except OSError:
+        output('WARNING: cannot save matrix graph to %s!' % filename)
+        if op.exists(tmp_filename):
+            os.remove(tmp_filename)
+
 class Equations(Container):
 
     @staticmethod
@@ -538,7 +693,7 @@ class Equations(Container):
 
     def create_matrix_graph(self, any_dof_conn=False, rdcs=None, cdcs=None,
                             shape=None, active_only=True, chunk_size=200000,
-                            verbose=True):
+                            method='native', cache_dir=None, verbose=True):
         """
         Create tangent matrix graph, i.e. preallocate and initialize the
         sparse storage needed for the tangent matrix. Order of DOF
@@ -562,7 +717,12 @@ class Equations(Container):
             reduced (active DOFs only) numbering.
         chunk_size : int
             The maximum number of cells added to the graph in one
-            :func:`create_dof_graph()` call.
+            :func:`create_dof_graph()` call, if `method` is 'coo'.
+        method : 'native' or 'coo'
+            The graph creation method, see :func:`create_matrix_graph()`.
+        cache_dir : str, optional
+            If given, the directory of the matrix graph cache, see
+            :func:`create_matrix_graph()`.
         verbose : bool
             If False, reduce verbosity.
 
@@ -599,7 +759,8 @@ class Equations(Container):
         cdi = self.variables.adi
         gr = create_matrix_graph(rdcs, cdcs, irs, ics, rdi, cdi,
                                  active_only=active_only,
-                                 chunk_size=chunk_size)
+                                 chunk_size=chunk_size,
+                                 method=method, cache_dir=cache_dir)
         nnz, prow, icol = gr.nnz, gr.indptr, gr.indices
 
         output('...done in %.2f s' % timer.stop(), verbose=verbose)
@@ -898,6 +1059,14 @@ class Equations(Container):
             The assembled matrix. If `by_blocks` is True, a dictionary
             is returned instead, with keys given by `block_name` part
             of the individual equation names.
+
+        Notes
+        -----
+        The `tangent_matrix` is stamped with a new version number, see
+        :func:`set_matrix_version()
+        <sfepy.linalg.sparse.set_matrix_version()>`. So is the returned
+        matrix, if it differs from `tangent_matrix` due to extra matrices of
+        terms with a dynamic connectivity.
         """
         self.set_state(state, force=True)
 
@@ -957,6 +1126,12 @@ class Equations(Container):
                                 select_term=select_term,
                                 assemble=assemble)
 
+        # Allow the linear solvers to detect the changed matrix cheaply.
+        set_matrix_version(tangent_matrix)
+        if not isinstance(out, dict) and (out is not tangent_matrix):
+            # A new matrix with the extra (e.g. contact) matrices added.
+            set_matrix_version(out)
+
         return out
 
 class Equation(Struct):
@@ -1073,27 +1248,45 @@ class Equation(Struct):
             assemble = (lambda name, it, term, *args, **kwargs:
                         term.assemble_to(*args, **kwargs))
 
+        profile = goptions['profile_terms']
+        if profile:
+            assemble = _profile_assemble(assemble, dw_mode)
+            profile_chunks = _profile_chunks
+
+        else:
+            profile_chunks = lambda eq, term, mode, chunks: chunks
+
         if mode in ('eval', 'el_eval', 'el_avg', 'qp'):
             val = 0.0
             for term in terms:
-                aux, status = term.evaluate(mode=mode,
-                                            term_mode=term_mode,
-                                            standalone=False,
-                                            ret_status=True)
-                val += aux
+                def _evaluate():
+                    aux, status = term.evaluate(mode=mode,
+                                                term_mode=term_mode,
+                                                standalone=False,
+                                                ret_status=True)
+                    yield aux, None, status
+
+                for aux, _, status in profile_chunks(self, term, mode,
+                                                     _evaluate()):
+                    val += aux
 
             out = val
 
         elif mode == 'weak':
 
+            chunk_size = goptions['assembly_chunk_size']
+
             if dw_mode == 'vector':
 
                 for it, term in enumerate(terms):
-                    val, iels, status = term.evaluate(mode=mode,
-                                                      term_mode=term_mode,
-                                                      standalone=False,
-                                                      ret_status=True)
-                    assemble(self, it, term, asm_obj, val, iels, mode=dw_mode)
+                    for val, iels, status in profile_chunks(
+                            self, term, dw_mode, term.evaluate_chunks(
+                                chunk_size, term_mode=term_mode,
+                                standalone=False,
+                            )
+                    ):
+                        assemble(self, it, term, asm_obj, val, iels,
+                                 mode=dw_mode)
 
                 out = asm_obj
 
@@ -1104,14 +1297,16 @@ class Equation(Struct):
                     svars = term.get_state_variables(unknown_only=True)
 
                     for svar in svars:
-                        val, iels, status = term.evaluate(mode=mode,
-                                                          term_mode=term_mode,
-                                                          diff_var=svar.name,
-                                                          standalone=False,
-                                                          ret_status=True)
-                        extra = assemble(self, it, term, asm_obj, val, iels,
-                                         mode=dw_mode, diff_var=svar)
-                        if extra is not None: extras.append(extra)
+                        for val, iels, status in profile_chunks(
+                                self, term, dw_mode, term.evaluate_chunks(
+                                    chunk_size, diff_var=svar.name,
+                                    term_mode=term_mode, standalone=False,
+                                )
+                        ):
+                            extra = assemble(self, it, term, asm_obj, val,
+                                             iels, mode=dw_mode,
+                                             diff_var=svar)
+                            if extra is not None: extras.append(extra)
 
                 out = (asm_obj, extras) if len(extras) else asm_obj
 
@@ -6,6 +6,7 @@ import numpy as nm
 from sfepy.base.base import output, get_default, OneTypeList, Struct, basestr
 from sfepy.discrete import Equations, Variables, Region, Integral, Integrals
 from sfepy.discrete.common.fields import setup_extra_data
+from sfepy.linalg.sparse import set_matrix_version
 import six
 
 def apply_ebc_to_matrix(mtx, ebc_rows, epbc_rows=None):
@@ -131,6 +132,7 @@ class Evaluator(Struct):
             mtx_r = mtx_lcbc.T * mtx * mtx_lcbc
             mtx_r = mtx_r.tocsr()
             mtx_r.sort_indices()
+            set_matrix_version(mtx_r)
 
             if self.matrix_hook is not None:
                 mtx_r = self.matrix_hook(mtx_r, self.problem, call_mode='lcbc')
@@ -15,7 +15,7 @@ from __future__ import absolute_import
 import numpy as nm
 
 from sfepy.base.base import output, get_default, assert_
-from sfepy.base.base import Struct
+from sfepy.base.base import Struct, new_version
 from sfepy.base.timing import Timer
 from sfepy.discrete.common.fields import parse_shape, Field
 from sfepy.discrete import PolySpace
@@ -27,6 +27,7 @@ from sfepy.discrete.fem.mappings import FEMapping
 from sfepy.discrete.fem.fe_surface import FESurface, FEPhantomSurface
 from sfepy.discrete.integrals import Integral
 from sfepy.discrete.fem.linearizer import (get_eval_dofs, get_eval_coors,
+                                           create_uniform_output,
                                            create_output)
 
 def _find_geometry(region):
@@ -66,8 +67,10 @@ def set_mesh_coors(domain, fields, coors, update_fields=False, actual=False,
         if not hasattr(domain.mesh, 'coors_act'):
             domain.mesh.coors_act = nm.zeros_like(domain.mesh.coors)
         domain.mesh.coors_act[:] = coors[:domain.mesh.n_nod]
+        domain.coors_act_version = new_version()
     else:
         domain.cmesh.coors[:] = coors[:domain.mesh.n_nod]
+        domain.coors_version = new_version()
 
     if update_fields:
         for field in fields.values():
@@ -465,6 +468,9 @@ class FEField(Field):
                 eval_nodal_coors(self.coors, coors, self.region,
                                  ps, gps, self.econn)
 
+        self.linearizations = {}
+        self.coors_version = new_version()
+
     def setup_coors(self):
         """
         Setup coordinates of field nodes.
@@ -848,6 +854,13 @@ class FEField(Field):
             The DOFs defined in vertices of `mesh`.
         levels : array of ints
             The refinement level used for each element group.
+
+        Notes
+        -----
+        If `min_level` is greater or equal to `max_level`, the refinement is
+        uniform and does not depend on `dofs`. Then the mesh and the sparse
+        matrix evaluating the DOFs in the mesh vertices are computed only
+        once and stored in `self.linearizations`.
         """
         assert_(dofs.ndim == 2)
 
@@ -863,6 +876,23 @@ class FEField(Field):
 
         vertex_conn = self.econn[:, :self.gel.n_vertex]
 
+        if min_level >= max_level:
+            lin = self.linearizations.get(max_level)
+            if lin is None:
+                (coors, conn, mat_ids,
+                 mtx, iout) = create_uniform_output(vertex_coors, vertex_conn,
+                                                    self.econn, self.n_nod,
+                                                    ps, gps, max_level,
+                                                    ori=self.ori)
+                mesh = Mesh.from_data('linearized_mesh', coors, None, [conn],
+                                      [mat_ids], self.domain.mesh.descs)
+                lin = Struct(mesh=mesh, mtx=mtx, iout=iout)
+                self.linearizations[max_level] = lin
+
+            vdofs = (lin.mtx @ dofs)[lin.iout]
+
+            return lin.mesh, vdofs, max_level
+
         eval_dofs = get_eval_dofs(dofs, self.econn, ps, ori=self.ori)
         eval_coors = get_eval_coors(vertex_coors, vertex_conn, gps)
 
@@ -1005,7 +1035,8 @@ class FEField(Field):
         share_geometry : bool
             Set to True to indicate that all the evaluations will work on the
             same region. Certain data are then computed only for the first
-            probe and cached.
+            probe and cached. The cached data are recomputed, if they were
+            computed for a different mesh or for different mesh coordinates.
         verbose : bool
             If False, reduce verbosity.
 
@@ -1025,10 +1056,18 @@ class FEField(Field):
         if cache is None:
             cache = Struct(name='evaluate_cache')
 
+        coors_version = getattr(self.domain, 'coors_version', None)
+        if ((cache.get('cmesh', None) is not self.cmesh)
+            or (cache.get('coors_version', None) != coors_version)):
+            # The shared data belong to a different mesh.
+            cache.cmesh = None
+            cache.kdtree = None
+
         timer = Timer(start=True)
-        if (cache.get('cmesh', None) is None) or not share_geometry:
+        if (cache.cmesh is None) or not share_geometry:
             mesh = self.create_mesh(extra_nodes=False)
             cache.cmesh = cmesh = self.cmesh
+            cache.coors_version = coors_version
 
             gels = create_geometry_elements()
 
@@ -1048,8 +1087,8 @@ class FEField(Field):
         output('cmesh setup: %f s' % timer.stop(), verbose=verbose)
 
         timer.start()
-        if (cache.get('kdtree', None) is None) or not share_geometry:
-            cache.kdtree = KDTree(cmesh.coors)
+        if (cache.kdtree is None) or not share_geometry:
+            cache.kdtree = KDTree(cache.cmesh.coors)
 
         output('kdtree: %f s' % timer.stop(), verbose=verbose)
 
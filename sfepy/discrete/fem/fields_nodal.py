@@ -350,12 +350,7 @@ class H1NodalMixin(H1Mixin, GlobalNodalLikeBasis):
         nods = nm.unique(aux)
 
         if callable(fun):
-            coors = self.get_coor(nods)
-            vals = nm.asarray(fun(coors))
-            if (vals.ndim > 1) and (vals.shape != (len(coors), dpn)):
-                raise ValueError('The projected function return value should be'
-                                 ' (n_point, dpn) == %s, instead of %s!'
-                                 % ((len(coors), dpn), vals.shape))
+            vals = self.eval_dofs_in_coors(fun, self.get_coor(nods), dpn)
 
         elif nm.isscalar(fun):
             vals = nm.repeat([fun], nods.shape[0] * dpn)
@@ -380,6 +375,21 @@ class H1NodalMixin(H1Mixin, GlobalNodalLikeBasis):
 
         return nods, vals
 
+    def eval_dofs_in_coors(self, fun, coors, dpn):
+        """
+        Evaluate the values of DOFs with the coordinates `coors` using a
+        function of space coordinates `fun`, see :func:`set_dofs()`.
+        """
+        vals = nm.asarray(fun(coors))
+        if (vals.ndim > 1) and (vals.shape != (len(coors), dpn)):
+            raise ValueError('The projected function return value should be'
+                             ' (n_point, dpn) == %s, instead of %s!'
+                             % ((len(coors), dpn), vals.shape))
+
+        vals.shape = (len(coors), -1)
+
+        return vals
+
     def create_basis_context(self):
         """
         Create the context required for evaluating the field basis.
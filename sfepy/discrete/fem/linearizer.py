@@ -3,26 +3,53 @@ Linearization of higher order solutions for the purposes of visualization.
 """
 from __future__ import absolute_import
 import numpy as nm
+import scipy.sparse as sp
 
 from sfepy.linalg import dot_sequences
 from sfepy.discrete.fem.refine import refine_reference
 from six.moves import range
 
+# The cache of the refined reference elements, keyed by the geometry name and
+# the refinement level.
+refined_cache = {}
+
+def get_refined_reference(geometry, level):
+    """
+    Return the (cached) result of :func:`refine_reference()
+    <sfepy.discrete.fem.refine.refine_reference>`. The returned arrays must
+    not be modified.
+    """
+    key = (geometry.name, level)
+    out = refined_cache.get(key)
+    if out is None:
+        out = refined_cache[key] = refine_reference(geometry, level)
+
+    return out
+
+def _get_cached_basis(cache, ps, rx):
+    # The points are stored to keep the id(rx) key valid.
+    item = cache.get(id(rx))
+    if item is None:
+        bf = ps.eval_basis(rx, force_axis=True)[..., 0, :]
+        item = cache[id(rx)] = (rx, bf)
+
+    return item[1]
+
 def get_eval_dofs(dofs, dof_conn, ps, ori=None):
     """
     Get default function for evaluating field DOFs given a list of elements and
     reference element coordinates.
     """
+    cache = {}
     def _eval(iels, rx):
         edofs = dofs[dof_conn[iels]]
 
         if ori is not None:
-            eori = ori[iels]
+            bf = ps.eval_basis(rx, ori=ori[iels], force_axis=True)[..., 0, :]
 
         else:
-            eori = None
+            bf = _get_cached_basis(cache, ps, rx)
 
-        bf = ps.eval_basis(rx, ori=eori, force_axis=True)[...,0,:]
         rvals = dot_sequences(bf, edofs)
 
         return rvals
@@ -34,16 +61,83 @@ def get_eval_coors(coors, conn, ps):
     Get default function for evaluating physical coordinates given a list of
     elements and reference element coordinates.
     """
+    cache = {}
     def _eval(iels, rx):
         ecoors = coors[conn[iels]]
-        aux = ecoors.transpose((0, 2, 1))
 
-        bf = ps.eval_basis(rx).squeeze()
-        phys_coors = nm.dot(aux, bf.T).transpose((0, 2, 1))
+        bf = _get_cached_basis(cache, ps, rx)[0]
+        phys_coors = nm.einsum('rv,evd->erd', bf, ecoors)
         return phys_coors
 
     return _eval
 
+def create_uniform_output(coors, conn, dof_conn, n_nod, ps, gps, level,
+                          ori=None):
+    """
+    Create mesh with linear elements obtained by the uniform refinement of the
+    given `level`, and a sparse matrix for evaluating DOFs of a higher order
+    approximation in the mesh vertices.
+
+    The mesh data do not depend on the DOFs, so they can be reused. The DOF
+    values `vdofs` in the mesh vertices are given by
+    ``vdofs = (mtx * dofs)[iout]``.
+
+    Parameters
+    ----------
+    coors : array
+        The coordinates of the vertices of the higher order elements.
+    conn : array
+        The vertex connectivity of the higher order elements.
+    dof_conn : array
+        The DOF connectivity of the higher order elements.
+    n_nod : int
+        The number of DOFs per component.
+    ps : PolySpace instance
+        The polynomial space of the DOFs.
+    gps : PolySpace instance
+        The polynomial space of the element geometry.
+    level : int
+        The refinement level.
+    ori : array, optional
+        The facet orientations of a hierarchical basis.
+
+    Returns
+    -------
+    coors : array
+        The mesh coordinates.
+    conn : array
+        The mesh connectivity.
+    mat_ids : array
+        The mesh cell material ids.
+    mtx : csr_matrix
+        The matrix evaluating the DOFs in the reference points of all
+        elements.
+    iout : array
+        The indices of the mesh vertices in the rows of `mtx`.
+    """
+    rx, rc, _ = get_refined_reference(ps.geometry, level)
+    rc = nm.atleast_2d(rc)
+    n_el, n_ep = dof_conn.shape
+    n_rx = rx.shape[0]
+
+    gbf = gps.eval_basis(rx, force_axis=True)[0, :, 0, :]
+    xes = nm.einsum('rv,evd->erd', gbf, coors[conn])
+
+    # Each (sub-)element has own coordinates - no shared vertices.
+    iout = (nm.arange(n_el)[:, None, None] * n_rx + rc).ravel()
+    mesh_coors = xes.reshape((-1, xes.shape[2]))[iout]
+    mesh_conn = nm.arange(len(iout), dtype=nm.int32).reshape((-1, rc.shape[1]))
+    mat_ids = nm.zeros(mesh_conn.shape[0], dtype=nm.int32)
+
+    bf = ps.eval_basis(rx, ori=ori, force_axis=True)[..., 0, :]
+    vals = nm.broadcast_to(bf, (n_el, n_rx, n_ep))
+    rows = nm.arange(n_el * n_rx).repeat(n_ep)
+    cols = nm.broadcast_to(dof_conn[:, None, :], (n_el, n_rx, n_ep))
+    mtx = sp.csr_matrix((vals.ravel(), (rows, cols.ravel())),
+                        shape=(n_el * n_rx, n_nod))
+
+    return mesh_coors, mesh_conn, mat_ids, mtx, iout
+
 def create_output(eval_dofs, eval_coors, n_el, ps, min_level=0, max_level=2,
                   eps=1e-4):
     """
@@ -74,7 +168,7 @@ def create_output(eval_dofs, eval_coors, n_el, ps, min_level=0, max_level=2,
     rx0 = ps.geometry.coors
 
     rc0 = ps.geometry.conn[None, :]
-    rx, rc, ree = refine_reference(ps.geometry, 1)
+    rx, rc, ree = get_refined_reference(ps.geometry, 1)
 
     factor = rc.shape[0] / rc0.shape[0]
 
@@ -114,20 +208,8 @@ def create_output(eval_dofs, eval_coors, n_el, ps, min_level=0, max_level=2,
             xes = eval_coors(iels[uie], rx0)
             des = eval_dofs(iels[uie], rx0)
 
-            # Vectorize (how??) or use cython?
-            cc = []
-            vd = []
-            for ii, iie in enumerate(iies):
-                ce = rc0[ir[ii]]
-
-                xe = xes[iie]
-                cc.append(xe[ce])
-
-                de = des[iie]
-                vd.append(de[ce])
-
-            cc = nm.vstack(cc)
-            vd = nm.vstack(vd)
+            cc = xes[iies[:, None], rc0[ir]].reshape((-1, xes.shape[2]))
+            vd = des[iies[:, None], rc0[ir]].reshape((-1, des.shape[2]))
 
             nc = cc.shape[0]
             np = rc0.shape[1]
@@ -152,7 +234,7 @@ def create_output(eval_dofs, eval_coors, n_el, ps, min_level=0, max_level=2,
 
             rc0 = rc
             rx0 = rx
-            rx, rc, ree = refine_reference(ps.geometry, level + 2)
+            rx, rc, ree = get_refined_reference(ps.geometry, level + 2)
 
             msd, rng = _get_msd(iels, rx, ree)
             eps_r = rng * eps
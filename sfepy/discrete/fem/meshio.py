@@ -1,4 +1,5 @@
 import sys
+import atexit
 from copy import copy
 from io import StringIO
 from packaging import version
@@ -55,6 +56,7 @@ _supported_formats = {
     'ansys': ('ansys_cdb', '.cdb', 'r'),
     'hdf5': ('hdf5', '.h5', 'rwcv'),
     'hdf5-xdmf': ('hdf5-xdmf', '.h5x', 'rwcv'),
+    'hdf5-ts': ('hdf5-ts', '.h5ts', 'rwcv'),
     'xyz': ('xyz', '.xyz', 'rw'),
     'comsol': ('comsol', '.txt', 'r'),
     'hmascii': ('hmascii', '.hmascii', 'r'),
@@ -1082,6 +1084,33 @@ class HDF5MeshIO(MeshIO):
         with open(xdmf_filename, 'w') as f:
             f.write(out[(out.find('\n') + 1):])
 
+    def _write_header(self, fd, mesh, ts, step, xdmf=False):
+        """
+        Write the mesh, the time stepper and the file statistics to a newly
+        created file `fd`.
+        """
+        from time import asctime
+
+        mesh_group = fd.create_group('/', 'mesh', 'mesh')
+        self.write_mesh_to_hdf5(fd, mesh_group, mesh, force_3d=xdmf)
+
+        if ts is not None:
+            ts_group = fd.create_group('/', 'ts', 'time stepper')
+            fd.create_array(ts_group, 't0', ts.t0, 'initial time')
+            fd.create_array(ts_group, 't1', ts.t1, 'final time')
+            fd.create_array(ts_group, 'dt', ts.dt, 'time step')
+            fd.create_array(ts_group, 'n_step', ts.n_step, 'n_step')
+
+        tstat_group = fd.create_group('/', 'tstat', 'global time statistics')
+        fd.create_array(tstat_group, 'created', enc(asctime()),
+                        'file creation time')
+        fd.create_array(tstat_group, 'finished', enc('.' * 24),
+                        'file closing time')
+
+        fd.create_array(fd.root, 'last_step',
+                        nm.array([step], dtype=nm.int32),
+                        'last saved step')
+
     def write(self, filename, mesh, out=None, ts=None, cache=None,
               xdmf=False, **kwargs):
         def expand_data_3d(data):
@@ -1110,26 +1139,7 @@ class HDF5MeshIO(MeshIO):
             # A new file.
             with pt.open_file(filename, mode="w",
                               title="SfePy output file") as fd:
-                mesh_group = fd.create_group('/', 'mesh', 'mesh')
-                self.write_mesh_to_hdf5(fd, mesh_group, mesh, force_3d=xdmf)
-
-                if ts is not None:
-                    ts_group = fd.create_group('/', 'ts', 'time stepper')
-                    fd.create_array(ts_group, 't0', ts.t0, 'initial time')
-                    fd.create_array(ts_group, 't1', ts.t1, 'final time')
-                    fd.create_array(ts_group, 'dt', ts.dt, 'time step')
-                    fd.create_array(ts_group, 'n_step', ts.n_step, 'n_step')
-
-                tstat_group = fd.create_group('/', 'tstat',
-                                              'global time statistics')
-                fd.create_array(tstat_group, 'created', enc(asctime()),
-                                'file creation time')
-                fd.create_array(tstat_group, 'finished', enc('.' * 24),
-                                'file closing time')
-
-                fd.create_array(fd.root, 'last_step',
-                                nm.array([step], dtype=nm.int32),
-                                'last saved step')
+                self._write_header(fd, mesh, ts, step, xdmf=xdmf)
 
         if out is not None:
             if ts is None:
@@ -1286,7 +1296,7 @@ class HDF5MeshIO(MeshIO):
 
         return fd, step_group
 
-    def read_data(self, step, filename=None, cache=None):
+    def read_data(self, step, filename=None, cache=None, only_names=None):
         fd, step_group = self._get_step_group(step, filename=filename)
         if fd is None:
             return None
@@ -1299,6 +1309,9 @@ class HDF5MeshIO(MeshIO):
             except pt.exceptions.NoSuchNodeError:
                 continue
 
+            if (only_names is not None) and (key not in only_names):
+                continue
+
             mode = dec(data_group.mode.read())
             if mode == 'custom':
                 out[key] = read_from_hdf5(fd, data_group.data, cache=cache)
@@ -1402,6 +1415,317 @@ class HDF5XdmfMeshIO(HDF5MeshIO):
                          xdmf=True, **kwargs)
 
 
+class HDF5TimeSeriesMeshIO(HDF5MeshIO):
+    """
+    HDF5 output of time-dependent results optimized for many time steps.
+
+    Contrary to :class:`HDF5MeshIO`, which stores each time step in a new
+    group, the data of each output key are stored in a single chunked and
+    compressed extendable array with the time step as the first axis. The
+    file handle is kept open between the time steps, so that saving a step
+    costs an append to each array regardless of the number of steps already
+    saved, and a time history of a value is read by a single slice.
+
+    The file is closed by :func:`HDF5TimeSeriesMeshIO.close()`, when it is
+    read from, or at the interpreter exit. Only the extendable arrays are
+    written in each time step, the file metadata (the last saved step and
+    the closing time) are written once on closing.
+    """
+    format = "hdf5-ts"
+    complevel = 4
+    complib = 'zlib'
+
+    # Open files by absolute file names.
+    _files = {}
+
+    @staticmethod
+    def close(filename=None):
+        """
+        Close the open file `filename`, or all open files if `filename` is
+        None.
+        """
+        files = HDF5TimeSeriesMeshIO._files
+        if filename is None:
+            keys = list(files.keys())
+
+        else:
+            keys = [op.abspath(filename)]
+
+        for key in keys:
+            fd = files.pop(key, None)
+            if (fd is not None) and fd.isopen:
+                HDF5TimeSeriesMeshIO._write_metadata(fd)
+                fd.close()
+
+    @staticmethod
+    def _write_metadata(fd):
+        """
+        Write the last saved step and the file closing time.
+        """
+        from time import asctime
+
+        steps = fd.root.steps.step
+        if steps.nrows:
+            fd.root.last_step[0] = steps[-1]
+
+        fd.remove_node(fd.root.tstat.finished)
+        fd.create_array(fd.root.tstat, 'finished', enc(asctime()),
+                        'file closing time')
+
+    def _get_file(self, filename, mesh, ts, step):
+        key = op.abspath(filename)
+        fd = self._files.get(key)
+        if (fd is not None) and not fd.isopen:
+            fd = None
+
+        if (step == 0) or not op.exists(filename):
+            # A new file.
+            if fd is not None:
+                fd.close()
+
+            fd = pt.open_file(filename, mode='w', title='SfePy output file')
+            self._write_header(fd, mesh, ts, step)
+
+            steps_group = fd.create_group('/', 'steps', 'time steps')
+            fd.create_earray(steps_group, 'step', pt.Int32Atom(), (0,),
+                             'step')
+            fd.create_earray(steps_group, 't', pt.Float64Atom(), (0,),
+                             'time')
+            fd.create_earray(steps_group, 'nt', pt.Float64Atom(), (0,),
+                             'normalized time')
+            fd.create_group('/', 'data', 'time series data')
+            fd.flush()
+
+        elif fd is None:
+            fd = pt.open_file(filename, mode='r+')
+
+        self._files[key] = fd
+
+        return fd
+
+    def _create_data_group(self, fd, key, val, data):
+        group_name = '__' + key.translate(self._tr)
+        data_group = fd.create_group(fd.root.data, group_name,
+                                     '%s data' % key)
+        fd.create_array(data_group, 'dname', enc(key), 'data name')
+        fd.create_array(data_group, 'mode', enc(val.mode), 'mode')
+        name = val.get('name', 'output_data')
+        fd.create_array(data_group, 'name', enc(name), 'object name')
+
+        shape = val.get('shape', data.shape)
+        dofs = val.get('dofs', None)
+        if dofs is None:
+            dofs = [''] * nm.squeeze(shape)[-1]
+        var_name = val.get('var_name', '')
+
+        fd.create_array(data_group, 'dofs', [enc(ic) for ic in dofs], 'dofs')
+        fd.create_array(data_group, 'shape', shape, 'shape')
+        fd.create_array(data_group, 'var_name',
+                        enc(var_name), 'object parent name')
+        if val.mode == 'full':
+            fd.create_array(data_group, 'field_name',
+                            enc(val.field_name), 'field name')
+
+        reg_name = val.get('region_name', '')
+        fd.create_array(data_group, 'region_name',
+                        enc(reg_name), 'region name')
+
+        filters = pt.Filters(complevel=self.complevel, complib=self.complib,
+                             shuffle=True)
+        fd.create_earray(data_group, 'steps', pt.Int32Atom(), (0,),
+                         'time steps of data')
+        fd.create_earray(data_group, 'data', pt.Atom.from_dtype(data.dtype),
+                         (0,) + data.shape, 'data',
+                         filters=filters, chunkshape=(1,) + data.shape)
+
+        return data_group
+
+    def write(self, filename, mesh, out=None, ts=None, cache=None, **kwargs):
+        if pt is None:
+            raise ValueError('pytables not imported!')
+
+        step = get_default_attr(ts, 'step', 0)
+        fd = self._get_file(filename, mesh, ts, step)
+
+        if out is not None:
+            if ts is None:
+                step, time, nt = 0, 0.0, 0.0
+            else:
+                step, time, nt = ts.step, ts.time, ts.nt
+
+            steps = fd.root.steps
+            if steps.step.nrows and (step <= steps.step[-1]):
+                raise ValueError('step %d is already saved in "%s" file!'
+                                 ' Possible help: remove the old file or'
+                                 ' start saving from the initial time.'
+                                 % (step, filename))
+
+            steps.step.append([step])
+            steps.t.append([time])
+            steps.nt.append([nt])
+
+            for key, val in six.iteritems(out):
+                if val.mode == 'custom':
+                    raise ValueError('custom data (%s) cannot be saved'
+                                     ' in "%s" format!' % (key, self.format))
+
+                data = nm.asarray(val.data)
+                group_name = '__' + key.translate(self._tr)
+                if group_name in fd.root.data:
+                    data_group = fd.root.data._f_get_child(group_name)
+
+                else:
+                    data_group = self._create_data_group(fd, key, val, data)
+
+                if data_group.data.shape[1:] != data.shape:
+                    raise ValueError('shape of %s data changed! (%s -> %s)'
+                                     % (key, data_group.data.shape[1:],
+                                        data.shape))
+
+                data_group.steps.append([step])
+                data_group.data.append(data[None, ...])
+
+        fd.flush()
+
+    def read(self, mesh=None, **kwargs):
+        self.close(self.filename)
+        return HDF5MeshIO.read(self, mesh=mesh, **kwargs)
+
+    def read_dimension(self, ret_fd=False):
+        self.close(self.filename)
+        return HDF5MeshIO.read_dimension(self, ret_fd=ret_fd)
+
+    def read_bounding_box(self, ret_fd=False, ret_dim=False):
+        self.close(self.filename)
+        return HDF5MeshIO.read_bounding_box(self, ret_fd=ret_fd,
+                                            ret_dim=ret_dim)
+
+    def read_last_step(self, filename=None):
+        filename = get_default(filename, self.filename)
+        self.close(filename)
+        return HDF5MeshIO.read_last_step(self, filename=filename)
+
+    def read_time_stepper(self, filename=None):
+        filename = get_default(filename, self.filename)
+        self.close(filename)
+        return HDF5MeshIO.read_time_stepper(self, filename=filename)
+
+    def _open_file(self, filename=None):
+        filename = get_default(filename, self.filename)
+        self.close(filename)
+        return pt.open_file(filename, mode='r')
+
+    def read_times(self, filename=None):
+        """
+        Read true time step data from the time steps arrays.
+
+        Returns
+        -------
+        steps : array
+            The time steps.
+        times : array
+            The times of the time steps.
+        nts : array
+            The normalized times of the time steps, in [0, 1].
+        """
+        with self._open_file(filename) as fd:
+            steps = fd.root.steps.step.read().astype(nm.int32)
+            times = fd.root.steps.t.read().astype(nm.float64)
+            nts = fd.root.steps.nt.read().astype(nm.float64)
+
+        return steps, times, nts
+
+    def _get_step_index(self, data_group, step):
+        steps = data_group.steps.read()
+        ii = nm.searchsorted(steps, step)
+        if (ii < len(steps)) and (steps[ii] == step):
+            return ii
+
+        return None
+
+    def read_data(self, step, filename=None, cache=None, only_names=None):
+        with self._open_file(filename) as fd:
+            if step is None:
+                if not fd.root.steps.step.nrows:
+                    return None
+                step = fd.root.steps.step[0]
+
+            out = {}
+            for data_group in fd.root.data:
+                key = dec(data_group.dname.read())
+                if (only_names is not None) and (key not in only_names):
+                    continue
+
+                ii = self._get_step_index(data_group, step)
+                if ii is None:
+                    continue
+
+                mode = dec(data_group.mode.read())
+                name = dec(data_group.name.read())
+                data = data_group.data[ii]
+                dofs = tuple([dec(ic) for ic in data_group.dofs.read()])
+                shape = tuple(int(ii) for ii in data_group.shape.read())
+
+                if mode == 'full':
+                    field_name = dec(data_group.field_name.read())
+
+                else:
+                    field_name = None
+
+                out[key] = Struct(name=name, mode=mode, data=data,
+                                  dofs=dofs, shape=shape,
+                                  field_name=field_name)
+
+                if out[key].dofs == (-1,):
+                    out[key].dofs = None
+
+        if not len(out):
+            output('step %d data not found - premature end of file?' % step)
+            return None
+
+        return out
+
+    def read_data_header(self, dname, step=None, filename=None):
+        with self._open_file(filename) as fd:
+            for name, data_group in six.iteritems(fd.root.data._v_groups):
+                if dec(data_group.dname.read()) == dname:
+                    return dec(data_group.mode.read()), name
+
+        raise KeyError('non-existent data: %s' % dname)
+
+    def read_time_history(self, node_name, indx, filename=None):
+        uindx, iindx = nm.unique(indx, return_inverse=True)
+        with self._open_file(filename) as fd:
+            data_group = fd.root.data._f_get_child(node_name)
+            # A single hyperslab read of all steps.
+            data = data_group.data[:, uindx.tolist()]
+
+        if data.ndim == 5: # cell data.
+            data = data[:, :, 0, :, 0]
+
+        th = {}
+        for ii, ik in zip(indx, iindx.ravel()):
+            th[ii] = data[:, ik]
+
+        return th
+
+    def read_variables_time_history(self, var_names, ts, filename=None):
+        with self._open_file(filename) as fd:
+            assert_((fd.root.last_step[0] + 1) == ts.n_step)
+
+            groups = {dec(group.dname.read()) : group
+                      for group in fd.root.data}
+            ths = {}
+            for var_name in var_names:
+                data = groups[var_name].data.read()
+                ths[var_name] = list(data[:ts.n_step])
+
+        return ths
+
+
+atexit.register(HDF5TimeSeriesMeshIO.close)
+
+
 class Mesh3DMeshIO(MeshIO):
     format = "mesh3d"
 
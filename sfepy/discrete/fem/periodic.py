@@ -1,9 +1,15 @@
 from __future__ import print_function
-import numpy as nm
+import hashlib
 
-from sfepy.discrete.fem.mesh import find_map
+import numpy as nm
+from scipy.spatial import cKDTree
 
+# The cache of the computed matchings, keyed by the content hashes of the
+# matched coordinates. It can be replaced by a dict-like object shared among
+# processes, see HomogenizationApp.
 periodic_cache = {}
+# The maximum number of cached matchings.
+periodic_cache_size = 100
 
 ##
 # c: 05.05.2008, r: 05.05.2008
@@ -11,6 +17,52 @@ eps = 1e-9
 def set_accuracy(eps):
     globals()['eps'] = eps
 
+def set_cache_size(size):
+    """
+    Set the maximum number of cached matchings. Use zero to disable the
+    caching.
+    """
+    globals()['periodic_cache_size'] = size
+    _shrink_cache(size)
+
+def clear_cache():
+    """
+    Remove all cached matchings.
+    """
+    periodic_cache.clear()
+
+def _get_cache_key(coors1, coors2, *args):
+    sha1 = hashlib.sha1()
+    for coors in (coors1, coors2):
+        coors = nm.ascontiguousarray(coors, dtype=nm.float64)
+        sha1.update(str(coors.shape).encode())
+        sha1.update(coors)
+
+    sha1.update(repr(args + (eps,)).encode())
+
+    return sha1.hexdigest()
+
+def _shrink_cache(size):
+    # The oldest items are first in both the dict and the shared dict.
+    keys = list(periodic_cache.keys())
+    for key in keys[:max(len(keys) - size, 0)]:
+        periodic_cache.pop(key, None)
+
+def _get_cached(key):
+    out = periodic_cache.pop(key, None)
+    if out is not None:
+        # Move the item to the end, to be evicted last.
+        periodic_cache[key] = out
+
+    return out
+
+def _set_cached(key, val):
+    if periodic_cache_size <= 0:
+        return
+
+    _shrink_cache(periodic_cache_size - 1)
+    periodic_cache[key] = val
+
 ##
 # c: 18.10.2006, r: 05.05.2008
 def match_grid_line(coors1, coors2, which, get_saved=True):
@@ -21,9 +73,11 @@ def match_grid_line(coors1, coors2, which, get_saved=True):
         raise ValueError('incompatible shapes: %s == %s'\
               % (coors1.shape, coors2.shape))
 
-    key = coors1.shape + ('line', which)
-    if key in periodic_cache and get_saved:
-        return periodic_cache[key]
+    key = _get_cache_key(coors1, coors2, 'line', which)
+    out = _get_cached(key) if get_saved else None
+    if out is not None:
+        return out
+
     else:
         c1 = coors1[:,which]
         c2 = coors2[:,which]
@@ -36,7 +90,7 @@ def match_grid_line(coors1, coors2, which, get_saved=True):
             print(nm.abs(c1[i1] - c2[i2]).max())
             raise ValueError('cannot match nodes!')
 
-        periodic_cache[key] = (i1, i2)
+        _set_cached(key, (i1, i2))
 
         return i1, i2
 
@@ -54,15 +108,21 @@ def match_z_line(coors1, coors2, get_saved=True):
 def match_plane_by_dir(coors1, coors2, direction, get_saved=True):
     """
     Match coordinates `coors1` with `coors2` in a given direction.
+
+    The coordinates `coors2` are shifted in the direction to coincide with
+    `coors1`, and the closest shifted point is found for each point of
+    `coors1` using a k-d tree.
     """
     if coors1.shape != coors2.shape:
         raise ValueError('incompatible shapes: %s == %s'\
                          % (coors1.shape, coors2.shape))
 
     key_dir = None if direction is None else tuple(direction)
-    key = coors1.shape + ('dir', key_dir)
-    if key in periodic_cache and get_saved:
-        return periodic_cache[key]
+    key = _get_cache_key(coors1, coors2, 'dir', key_dir)
+    out = _get_cached(key) if get_saved else None
+    if out is not None:
+        return out
+
     else:
         aux = coors2.copy()
         if direction is not None:
@@ -80,19 +140,20 @@ def match_plane_by_dir(coors1, coors2, direction, get_saved=True):
 
             aux += coors1[0] - coors2[idx[0]]
 
-        i1, i2 = find_map(coors1, aux, join=False)
+        kdtree = cKDTree(aux)
+        dist, i2 = kdtree.query(coors1, k=1, distance_upper_bound=eps)
+        i1 = nm.arange(coors1.shape[0])
 
-        if i1.shape[0] != coors1.shape[0]:
+        ok = nm.isfinite(dist)
+        if not (ok.all() and (len(nm.unique(i2)) == len(i2))):
             print(direction)
-            print(coors1[i1])
-            print(coors2[i2])
-            print(nm.abs(coors1[i1] - coors2[i2]).max(0))
-            ii = nm.setdiff1d(nm.arange(coors1.shape[0]), i1)
+            ii = nm.where(~ok)[0]
             print(coors1[ii])
+            ii = nm.setdiff1d(nm.arange(coors2.shape[0]), i2[ok])
             print(coors2[ii])
             raise ValueError('cannot match nodes!')
 
-        periodic_cache[key] = (i1, i2)
+        _set_cached(key, (i1, i2))
 
         return i1, i2
 
@@ -108,4 +169,4 @@ def match_z_plane(coors1, coors2, get_saved=True):
 def match_grid_plane(coors1, coors2, idim, get_saved=True):
     return match_plane_by_dir(coors1, coors2, get_grid_plane(idim), get_saved)
 def match_coors(coors1, coors2, get_saved=True):
-    return match_plane_by_dir(coors1, coors2, None, get_saved)
\ No newline at end of file
+    return match_plane_by_dir(coors1, coors2, None, get_saved)
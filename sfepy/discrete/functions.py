@@ -22,11 +22,19 @@ class Functions(Container):
 
 
 class Function(Struct):
-    """Base class for user-defined functions."""
+    """
+    Base class for user-defined functions.
+
+    The optional `dependencies` declare what the function values depend on,
+    when used as a material function - a sequence of 'coors', 'time' and
+    'state', see :class:`Material <sfepy.discrete.materials.Material>`. None
+    means unknown dependencies.
+    """
 
-    def __init__(self, name, function, is_constant=False, extra_args=None):
+    def __init__(self, name, function, is_constant=False, extra_args=None,
+                 dependencies=None):
         Struct.__init__(self, name = name, function = function,
-                        is_constant = is_constant)
+                        is_constant = is_constant, dependencies = dependencies)
         if extra_args is None:
             extra_args = {}
         self.extra_args = extra_args
@@ -99,7 +107,8 @@ class ConstantFunction(Function):
     def __init__(self, values, no_tile=False):
         """Make a function out of a dictionary of constant values. When
         called with coors argument, the values are repeated for each
-        coordinate. Not repeated if `no_tile` is True."""
+        coordinate using read-only broadcast views. Not repeated if `no_tile`
+        is True."""
 
         name = '_'.join(['get_constants'] + list(values.keys()))
 
@@ -117,8 +126,10 @@ class ConstantFunction(Function):
 
                     dtype = nm.float64 if nm.isrealobj(val) else nm.complex128
                     val = nm.array(val, dtype=dtype, ndmin=3)
-                    nc = 1 if no_tile else coors.shape[0]
-                    out[key] = nm.tile(val, (nc, 1, 1))
+                    if not no_tile:
+                        val = nm.broadcast_to(val, (coors.shape[0],)
+                                              + val.shape[1:])
+                    out[key] = val
 
             elif (mode == 'special_constant') or (mode is None):
                 for key, val in six.iteritems(values):
@@ -131,7 +142,7 @@ class ConstantFunction(Function):
             return out
 
         Function.__init__(self, name = name, function = get_constants,
-                          is_constant = True)
+                          is_constant = True, dependencies = ())
 
 class ConstantFunctionByRegion(Function):
     """
@@ -142,7 +153,9 @@ class ConstantFunctionByRegion(Function):
         """
         Make a function out of a dictionary of constant values per region. When
         called with coors argument, the values are repeated for each
-        coordinate in each of the given regions.
+        coordinate in each of the given regions. If the term region is
+        contained in a single region, a single value is returned, that is
+        broadcast to all coordinates.
         """
 
         name = '_'.join(['get_constants_by_region'] + list(values.keys()))
@@ -154,25 +167,40 @@ class ConstantFunctionByRegion(Function):
                 qps = term.get_physical_qps()
                 assert_(qps.num == coors.shape[0])
 
+                tcells = term.region.get_cells(true_cells_only=False)
                 for key, val in six.iteritems(values):
                     if '.' in key: continue
                     rval = nm.array(val[list(val.keys())[0]], ndmin=3)
                     s0 = rval.shape[1:]
                     dtype = nm.float64 if nm.isrealobj(rval) else nm.complex128
-                    matdata = nm.zeros(qps.shape[:2] + s0, dtype=dtype)
+                    matdata = None
 
                     for rkey, rval in six.iteritems(val):
                         region = problem.domain.regions[rkey]
                         rval = nm.array(rval, dtype=dtype, ndmin=3)
 
                         cells = region.get_cells(true_cells_only=False)
-                        tcells = term.region.get_cells(true_cells_only=False)
                         ii = nm.isin(tcells, cells)
-                        matdata[ii] = rval
+                        if ii.all():
+                            # The term region is in this region only.
+                            matdata = rval
+
+                        elif ii.any():
+                            if (matdata is None) or (len(matdata) == 1):
+                                aux = nm.zeros(qps.shape[:2] + s0,
+                                               dtype=dtype)
+                                if matdata is not None:
+                                    aux[:] = matdata
+                                matdata = aux
+
+                            matdata[ii] = rval
+
+                    if matdata is None:
+                        matdata = nm.zeros((1,) + s0, dtype=dtype)
 
                     out[key] = matdata.reshape((-1,) + s0)
 
             return out
 
         Function.__init__(self, name=name, function=get_constants,
-                          is_constant=True)
+                          is_constant=True, dependencies=())
@@ -108,6 +108,12 @@ cdef extern from 'nurbs.h':
                                FMField *cs,
                                int32 *conn, int32 n_el, int32 n_ep,
                                int32 has_bernstein, int32 is_dx)
+    cdef int32 _eval_mapping_data_tp \
+         'eval_mapping_data_tp'(float64 *R, float64 *dR_dx, float64 *det,
+                                float64 *dR_dxi,
+                                float64 **N, float64 **dN_dxi,
+                                float64 *ew, float64 *ecps,
+                                uint32 *n_efuns, int32 dim, uint32 n_qp)
 
 cdef class CNURBSContext:
 
@@ -277,12 +283,18 @@ def eval_mapping_data_in_qp(float64[:, ::1] qps not None,
                             int32[::1] degrees not None,
                             cs not None,
                             int32[:, ::1] conn not None,
-                            uint32[::1] cells=None):
+                            uint32[::1] cells=None,
+                            extraction=None):
     """
     Evaluate data required for the isogeometric domain reference mapping in the
     given quadrature points. The quadrature points are the same for all Bezier
     elements and should correspond to the Bernstein basis degree.
 
+    The 1D Bernstein basis is evaluated only once in the quadrature point
+    coordinates, and the 1D B-spline basis only once for each unique element
+    extraction operator, see
+    :func:`get_unique_extraction() <sfepy.discrete.iga.iga.get_unique_extraction>`.
+
     Parameters
     ----------
     qps : array
@@ -300,6 +312,10 @@ def eval_mapping_data_in_qp(float64[:, ::1] qps not None,
         The connectivity of the global NURBS basis.
     cells : array, optional
         If given, use only the given Bezier elements.
+    extraction : tuple, optional
+        If given, the output of
+        :func:`get_unique_extraction() <sfepy.discrete.iga.iga.get_unique_extraction>`
+        called with `cs`.
 
     Returns
     -------
@@ -313,27 +329,50 @@ def eval_mapping_data_in_qp(float64[:, ::1] qps not None,
         The Jacobians of the mapping to the unit reference element in the
         physical quadrature points of all elements.
     """
-    cdef uint32 ii, ie, n_qp, n_efun, nf
-    cdef int32 n_el, n_ep, dim, aux
-    cdef uint32 *_cells
-    cdef (int32 *) _degrees, _conn
-    cdef FMField[1] _bf, _bfg, _det
-    cdef FMField[1] _bfg_dxi, _dx_dxi, _dxi_dx
-    cdef FMField[1] _qp, _control_points, _weights
-    cdef FMField _cs[3]
-    cdef FMField[3] _B, _dB_dxi, _N, _dN_dxi
+    from sfepy.discrete.iga.iga import (get_unique_extraction,
+                                        tabulate_bernstein_basis)
+
+    cdef uint32 ii, ic, iseq, ie, ia, n_qp, n_efun, n_el, dim
+    cdef uint32 n_efuns[3]
+    cdef uint32 n_els[3]
+    cdef uint32 iis[3]
+    cdef float64 *_uNs[3]
+    cdef float64 *_udNs[3]
+    cdef float64 *_Ns[3]
+    cdef float64 *_dNs[3]
+    cdef int32 *_uindices[3]
+    cdef float64 *_ew = NULL
+    cdef int32 *_ec
+    cdef float64[::1] ew, ecps, dR_dxi
     cdef np.ndarray[float64, mode='c', ndim=4] bfs, bfgs, dets
 
     if cells is None:
         cells = np.arange(conn.shape[0], dtype=np.uint32)
 
-    degrees = np.asarray(degrees, dtype=np.int32)
+    if extraction is None:
+        extraction = get_unique_extraction(cs)
+    ucs, uindices = extraction
 
     n_el = len(cells)
     n_qp = qps.shape[0]
     dim = control_points.shape[1]
-    n_efuns = np.asarray(degrees) + 1
-    n_efun = np.prod(n_efuns)
+    n_efun = 1
+    for ii in range(dim):
+        n_efuns[ii] = degrees[ii] + 1
+        n_efun *= n_efuns[ii]
+        n_els[ii] = len(cs[ii])
+
+    # 1D B-spline basis N = CB, dN/dxi = C dB/dxi for unique C.
+    aux = []
+    for ii in range(dim):
+        B, dB_dxi = tabulate_bernstein_basis(qps[:, ii], degrees[ii])
+        uN = np.ascontiguousarray(np.einsum('cij,qj->cqi', ucs[ii], B))
+        udN = np.ascontiguousarray(np.einsum('cij,qj->cqi', ucs[ii], dB_dxi))
+        uind = np.ascontiguousarray(uindices[ii], dtype=np.int32)
+        aux.append((uN, udN, uind))
+        _uNs[ii] = <float64 *> np.PyArray_DATA(uN)
+        _udNs[ii] = <float64 *> np.PyArray_DATA(udN)
+        _uindices[ii] = <int32 *> np.PyArray_DATA(uind)
 
     # Output Jacobians.
     dets = np.empty((n_el, n_qp, 1, 1), dtype=np.float64)
@@ -344,119 +383,33 @@ def eval_mapping_data_in_qp(float64[:, ::1] qps not None,
     # Output gradients of shape functions.
     bfgs = np.empty((n_el, n_qp, dim, n_efun), dtype=np.float64)
 
-    # Setup C termporary arrays.
-    bfg_dxi = np.empty((1, 1, dim, n_efun), dtype=np.float64)
-    dx_dxi = np.empty((1, 1, dim, dim), dtype=np.float64)
-    dxi_dx = np.empty((1, 1, dim, dim), dtype=np.float64)
-
-    for ii in range(0, <uint32>dim):
-        fmf_alloc(_B + ii, n_qp, 1, n_efuns[ii], 1)
-        fmf_alloc(_dB_dxi + ii, n_qp, 1, n_efuns[ii], 1)
-        fmf_alloc(_N + ii, 1, 1, n_efuns[ii], 1)
-        fmf_alloc(_dN_dxi + ii, 1, 1, n_efuns[ii], 1)
-
-    # Assign to C structures.
-    array2fmfield4(_bfg_dxi, bfg_dxi)
-    array2fmfield4(_dx_dxi, dx_dxi)
-    array2fmfield4(_dxi_dx, dxi_dx)
-    array2fmfield2(_control_points, control_points)
-    array2fmfield1(_weights, weights)
-    for ii in range(<uint32>dim):
-        array2fmfield4(_cs + ii, cs[ii])
-
-    array2pint1(&_degrees, &dim, degrees)
-    array2pint2(&_conn, &aux, &n_ep, conn)
-
-    _bf.offset = _bfg.offset = _det.offset = _qp.offset = -1
-    _bf.nAlloc = _bfg.nAlloc = _det.nAlloc = _qp.nAlloc = -1
-    _bf.nCell = _bfg.nCell = _det.nCell = _qp.nCell = 1
-    _bf.nLev = _bfg.nLev = _det.nLev = _qp.nLev = 1
-    _bf.nRow = _det.nRow = _qp.nRow = 1
-    _bfg.nRow = dim
-    _bf.nCol = _bfg.nCol = n_efun
-    _det.nCol = 1
-    _qp.nCol = dim
-
-    _bf.val = _bf.val0 = &bfs[0, 0, 0, 0]
-    _bfg.val = _bfg.val0 = &bfgs[0, 0, 0, 0]
-    _det.val = _det.val0 = &dets[0, 0, 0, 0]
-    _qp.val = _qp.val0 = &qps[0, 0]
-
-    # Pre-compute 1D Bernstein basis B, dB/dxi.
-    for iqp in range(0, n_qp):
-        for ii in range(0, <uint32>dim):
-            nf = n_efuns[ii]
-            _eval_bernstein_basis(_B + ii, _dB_dxi + ii,
-                                  _qp.val[ii], _degrees[ii])
-            (_B + ii).val += nf
-            (_dB_dxi + ii).val += nf
-        _qp.val += dim
-
+    # Element weights and control points, work array.
+    ew = np.empty(n_efun, dtype=np.float64)
+    ecps = np.empty(n_efun * dim, dtype=np.float64)
+    dR_dxi = np.empty(dim * n_efun, dtype=np.float64)
     if is_nurbs(weights):
-        # Loop over elements.
-        _cells = &cells[0]
-        for iseq in range(0, n_el):
-            ie = _cells[iseq]
-
-            _qp.val = _qp.val0
-            for ii in range(0, <uint32>dim):
-                (_B + ii).val = (_B + ii).val0
-                (_dB_dxi + ii).val = (_dB_dxi + ii).val0
-
-            # Loop over quadrature points.
-            for iqp in range(0, n_qp):
-                _eval_nurbs_basis_tp(_bf, _bfg, _det,
-                                     _bfg_dxi,
-                                     _dx_dxi, _dxi_dx,
-                                     _B, _dB_dxi, _N, _dN_dxi,
-                                     _qp, ie,
-                                     _control_points, _weights,
-                                     _degrees, dim, _cs, _conn, n_el, n_ep,
-                                     1, 1)
-                _bf.val += n_efun
-                _bfg.val += dim * n_efun
-                _det.val += 1
-                _qp.val += dim
-                for ii in range(0, <uint32>dim):
-                    nf = n_efuns[ii]
-                    (_B + ii).val += nf
-                    (_dB_dxi + ii).val += nf
-
-    else:
-        # Loop over elements.
-        _cells = &cells[0]
-        for iseq in range(0, n_el):
-            ie = _cells[iseq]
-
-            _qp.val = _qp.val0
-            for ii in range(0, <uint32>dim):
-                (_B + ii).val = (_B + ii).val0
-                (_dB_dxi + ii).val = (_dB_dxi + ii).val0
-
-            # Loop over quadrature points.
-            for iqp in range(0, n_qp):
-                _eval_bspline_basis_tp(_bf, _bfg, _det,
-                                       _bfg_dxi,
-                                       _dx_dxi, _dxi_dx,
-                                       _B, _dB_dxi, _N, _dN_dxi,
-                                       _qp, ie,
-                                       _control_points,
-                                       _degrees, dim, _cs, _conn, n_el, n_ep,
-                                       1, 1)
-                _bf.val += n_efun
-                _bfg.val += dim * n_efun
-                _det.val += 1
-                _qp.val += dim
-                for ii in range(0, <uint32>dim):
-                    nf = n_efuns[ii]
-                    (_B + ii).val += nf
-                    (_dB_dxi + ii).val += nf
-
-    for ii in range(0, <uint32>dim):
-        fmf_free(_B + ii)
-        fmf_free(_dB_dxi + ii)
-        fmf_free(_N + ii)
-        fmf_free(_dN_dxi + ii)
+        _ew = &ew[0]
+
+    # Loop over elements.
+    for iseq in range(n_el):
+        ie = cells[iseq]
+
+        _unravel_index(iis, ie, n_els, dim)
+        for ii in range(dim):
+            ic = _uindices[ii][iis[ii]]
+            _Ns[ii] = _uNs[ii] + ic * n_qp * n_efuns[ii]
+            _dNs[ii] = _udNs[ii] + ic * n_qp * n_efuns[ii]
+
+        _ec = &conn[ie, 0]
+        for ia in range(n_efun):
+            ew[ia] = weights[_ec[ia]]
+            for ii in range(dim):
+                ecps[dim * ia + ii] = control_points[_ec[ia], ii]
+
+        _eval_mapping_data_tp(&bfs[iseq, 0, 0, 0], &bfgs[iseq, 0, 0, 0],
+                              &dets[iseq, 0, 0, 0], &dR_dxi[0],
+                              _Ns, _dNs, _ew, &ecps[0],
+                              n_efuns, dim, n_qp)
 
     return bfs, bfgs, dets
 
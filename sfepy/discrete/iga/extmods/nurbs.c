@@ -645,3 +645,170 @@ int32 eval_nurbs_basis_tp(FMField *R, FMField *dR_dx, FMField *det,
  end_label:
   return(ret);
 }
+
+#undef __FUNC__
+#define __FUNC__ "eval_mapping_data_tp"
+/*
+  Evaluate the tensor-product NURBS (ew != NULL) or B-spline (ew == NULL)
+  basis R, its derivatives dR_dx w.r.t. the physical coordinates and the
+  mapping Jacobians det in n_qp quadrature points of a single Bezier element.
+
+  N[ii], dN_dxi[ii] are the 1D B-spline basis values and derivatives with
+  shapes (n_qp, n_efuns[ii]), ew are the element weights with shape (n_ep,)
+  and ecps the element control points with shape (n_ep, dim).
+
+  R has shape (n_qp, n_ep), dR_dx (n_qp, dim, n_ep) and det (n_qp,).
+  dR_dxi is a work array with shape (dim, n_ep).
+*/
+int32 eval_mapping_data_tp(float64 *R, float64 *dR_dx, float64 *det,
+                           float64 *dR_dxi,
+                           float64 **N, float64 **dN_dxi,
+                           float64 *ew, float64 *ecps,
+                           uint32 *n_efuns, int32 dim, uint32 n_qp)
+{
+  int32 ret = RET_OK;
+  uint32 iqp, ii, jj, a, i0, i1, i2;
+  uint32 n_ep = 1;
+  float64 *N0, *N1, *N2, *dN0, *dN1, *dN2, *D0, *D1, *D2, *Rq;
+  float64 n01, d0, d1, w, iw, val;
+  float64 dw_dxi[3];
+  float64 J[9], iJ[9];
+
+  for (ii = 0; ii < (uint32)dim; ii++) {
+    n_ep *= n_efuns[ii];
+  }
+
+  D0 = dR_dxi;
+  D1 = (dim > 1) ? dR_dxi + n_ep : 0;
+  D2 = (dim > 2) ? dR_dxi + 2 * n_ep : 0;
+
+  for (iqp = 0; iqp < n_qp; iqp++) {
+    Rq = R + n_ep * iqp;
+
+    // Tensor-product B-spline basis and its derivatives.
+    N0 = N[0] + n_efuns[0] * iqp;
+    dN0 = dN_dxi[0] + n_efuns[0] * iqp;
+    a = 0;
+    if (dim == 3) {
+      N1 = N[1] + n_efuns[1] * iqp;
+      dN1 = dN_dxi[1] + n_efuns[1] * iqp;
+      N2 = N[2] + n_efuns[2] * iqp;
+      dN2 = dN_dxi[2] + n_efuns[2] * iqp;
+      for (i0 = 0; i0 < n_efuns[0]; i0++) {
+        for (i1 = 0; i1 < n_efuns[1]; i1++) {
+          n01 = N0[i0] * N1[i1];
+          d0 = dN0[i0] * N1[i1];
+          d1 = N0[i0] * dN1[i1];
+          for (i2 = 0; i2 < n_efuns[2]; i2++) {
+            Rq[a] = n01 * N2[i2];
+            D0[a] = d0 * N2[i2];
+            D1[a] = d1 * N2[i2];
+            D2[a] = n01 * dN2[i2];
+            a += 1;
+          }
+        }
+      }
+    } else if (dim == 2) {
+      N1 = N[1] + n_efuns[1] * iqp;
+      dN1 = dN_dxi[1] + n_efuns[1] * iqp;
+      for (i0 = 0; i0 < n_efuns[0]; i0++) {
+        for (i1 = 0; i1 < n_efuns[1]; i1++) {
+          Rq[a] = N0[i0] * N1[i1];
+          D0[a] = dN0[i0] * N1[i1];
+          D1[a] = N0[i0] * dN1[i1];
+          a += 1;
+        }
+      }
+    } else {
+      for (i0 = 0; i0 < n_efuns[0]; i0++) {
+        Rq[i0] = N0[i0];
+        D0[i0] = dN0[i0];
+      }
+    }
+
+    if (ew) {
+      // R = W N / w_b, dR/dxi = (W dN/dxi - R dw_b/dxi) / w_b.
+      w = 0.0;
+      for (ii = 0; ii < (uint32)dim; ii++) {
+        dw_dxi[ii] = 0.0;
+      }
+      for (a = 0; a < n_ep; a++) {
+        Rq[a] *= ew[a];
+        w += Rq[a];
+        for (ii = 0; ii < (uint32)dim; ii++) {
+          dR_dxi[n_ep*ii+a] *= ew[a];
+          dw_dxi[ii] += dR_dxi[n_ep*ii+a];
+        }
+      }
+
+      iw = 1.0 / w;
+      for (ii = 0; ii < (uint32)dim; ii++) {
+        dw_dxi[ii] *= iw;
+      }
+      for (a = 0; a < n_ep; a++) {
+        Rq[a] *= iw;
+        for (ii = 0; ii < (uint32)dim; ii++) {
+          dR_dxi[n_ep*ii+a] = (dR_dxi[n_ep*ii+a] * iw
+                               - Rq[a] * dw_dxi[ii]);
+        }
+      }
+    }
+
+    // Mapping reference -> physical domain dxi/dx.
+    // x = sum P_a R_a, dx/dxi = sum P_a dR_a/dxi, invert.
+    for (ii = 0; ii < (uint32)(dim * dim); ii++) {
+      J[ii] = 0.0;
+    }
+    for (a = 0; a < n_ep; a++) {
+      for (ii = 0; ii < (uint32)dim; ii++) {
+        val = ecps[dim*a+ii];
+        for (jj = 0; jj < (uint32)dim; jj++) {
+          J[dim*ii+jj] += val * dR_dxi[n_ep*jj+a];
+        }
+      }
+    }
+
+    if (dim == 3) {
+      det[iqp] = J[0] * (J[4] * J[8] - J[7] * J[5])
+        - J[1] * (J[3] * J[8] - J[6] * J[5])
+        + J[2] * (J[3] * J[7] - J[6] * J[4]);
+      val = 1.0 / det[iqp];
+      iJ[0] = (J[4] * J[8] - J[7] * J[5]) * val;
+      iJ[1] = -(J[1] * J[8] - J[7] * J[2]) * val;
+      iJ[2] = (J[1] * J[5] - J[4] * J[2]) * val;
+      iJ[3] = -(J[3] * J[8] - J[6] * J[5]) * val;
+      iJ[4] = (J[0] * J[8] - J[6] * J[2]) * val;
+      iJ[5] = -(J[0] * J[5] - J[3] * J[2]) * val;
+      iJ[6] = (J[3] * J[7] - J[6] * J[4]) * val;
+      iJ[7] = -(J[0] * J[7] - J[6] * J[1]) * val;
+      iJ[8] = (J[0] * J[4] - J[3] * J[1]) * val;
+    } else if (dim == 2) {
+      det[iqp] = J[0] * J[3] - J[1] * J[2];
+      val = 1.0 / det[iqp];
+      iJ[0] = J[3] * val;
+      iJ[1] = -J[1] * val;
+      iJ[2] = -J[2] * val;
+      iJ[3] = J[0] * val;
+    } else {
+      det[iqp] = J[0];
+      iJ[0] = 1.0 / J[0];
+    }
+
+    // dR/dx = (dxi/dx)^T dR/dxi.
+    Rq = dR_dx + dim * n_ep * iqp;
+    for (ii = 0; ii < (uint32)dim; ii++) {
+      val = iJ[ii];
+      for (a = 0; a < n_ep; a++) {
+        Rq[n_ep*ii+a] = val * dR_dxi[a];
+      }
+      for (jj = 1; jj < (uint32)dim; jj++) {
+        val = iJ[dim*jj+ii];
+        for (a = 0; a < n_ep; a++) {
+          Rq[n_ep*ii+a] += val * dR_dxi[n_ep*jj+a];
+        }
+      }
+    }
+  }
+
+  return(ret);
+}
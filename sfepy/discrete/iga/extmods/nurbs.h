@@ -92,5 +92,10 @@ int32 eval_nurbs_basis_tp(FMField *R, FMField *dR_dx, FMField *det,
                           FMField *cs,
                           int32 *conn, int32 n_el, int32 n_ep,
                           int32 has_bernstein, int32 is_dx);
+int32 eval_mapping_data_tp(float64 *R, float64 *dR_dx, float64 *det,
+                           float64 *dR_dxi,
+                           float64 **N, float64 **dN_dxi,
+                           float64 *ew, float64 *ecps,
+                           uint32 *n_efuns, int32 dim, uint32 n_qp);
 
 #endif /* !NURBS_H */
@@ -15,6 +15,7 @@ from __future__ import absolute_import
 import numpy as nm
 
 from sfepy.base.base import assert_
+from sfepy.linalg.utils import dets_fast, invs_fast
 from six.moves import range
 
 def _get_knots_tuple(knots):
@@ -727,6 +728,91 @@ def eval_bernstein_basis(x, degree):
 
     return funs, ders
 
+def tabulate_bernstein_basis(xs, degree):
+    """
+    Evaluate the Bernstein polynomial basis of the given `degree`, and its
+    derivatives, in all points `xs` in [0, 1] at once.
+
+    Parameters
+    ----------
+    xs : array
+        The points in [0, 1].
+    degree : int
+        The basis degree.
+
+    Returns
+    -------
+    funs : array
+        The values of the Bernstein polynomial basis, shape
+        `(len(xs), degree + 1)`.
+    ders : array
+        The values of the Bernstein polynomial basis derivatives, shape
+        `(len(xs), degree + 1)`.
+    """
+    xs = nm.asarray(xs, dtype=nm.float64)
+    n_fun = degree + 1
+
+    funs = nm.zeros((len(xs), n_fun), dtype=nm.float64)
+    ders = nm.zeros((len(xs), n_fun), dtype=nm.float64)
+
+    funs[:, 0] = 1.0
+
+    if degree == 0: return funs, ders
+
+    for ip in range(1, n_fun - 1):
+        prev = 0.0
+        for ifun in range(ip + 1):
+            tmp = xs * funs[:, ifun]
+            funs[:, ifun] = (1.0 - xs) * funs[:, ifun] + prev
+            prev = tmp
+
+    for ifun in range(n_fun):
+        ders[:, ifun] = degree * (funs[:, ifun - 1] - funs[:, ifun])
+
+    prev = 0.0
+    for ifun in range(n_fun):
+        tmp = xs * funs[:, ifun]
+        funs[:, ifun] = (1.0 - xs) * funs[:, ifun] + prev
+        prev = tmp
+
+    return funs, ders
+
+def get_unique_extraction(cs, decimals=12):
+    """
+    Get the unique element extraction operators in each parametric dimension.
+    For uniform knot vectors, most of the operators are identical.
+
+    Parameters
+    ----------
+    cs : list of lists of 2D arrays
+        The element extraction operators in each parametric dimension.
+    decimals : int
+        The number of decimals the operators have to agree in to be considered
+        identical.
+
+    Returns
+    -------
+    ucs : list of 3D arrays
+        The unique element extraction operators in each parametric dimension.
+    indices : list of 1D arrays
+        The indices into `ucs` of the operators of each element in each
+        parametric dimension.
+    """
+    ucs = []
+    indices = []
+    for cs1d in cs:
+        cs1d = nm.asarray(cs1d, dtype=nm.float64)
+        n_efun = cs1d.shape[-1]
+        cs1d = cs1d.reshape((len(cs1d), n_efun, n_efun))
+        # Ignore round-off differences due to knot values.
+        aux = nm.round(cs1d.reshape((len(cs1d), -1)), decimals)
+        _, iu, ii = nm.unique(aux, axis=0, return_index=True,
+                              return_inverse=True)
+        ucs.append(cs1d[iu])
+        indices.append(ii.ravel())
+
+    return ucs, indices
+
 def eval_nurbs_basis_tp(qp, ie, control_points, weights, degrees, cs, conn):
     """
     Evaluate the tensor-product NURBS shape functions in a quadrature point for
@@ -863,13 +949,38 @@ def eval_nurbs_basis_tp(qp, ie, control_points, weights, degrees, cs, conn):
 
     return R, dR_dx, det
 
+def _outer_product(factors, out=None):
+    """
+    Outer product of the last axes of `factors`, raveled in the C order. If
+    given, the result is stored in `out`.
+    """
+    aux = factors[0]
+    for factor in factors[1:-1]:
+        aux = aux[..., None] * factor[..., None, :]
+        aux = aux.reshape(aux.shape[:-2] + (-1,))
+
+    shape = aux.shape + (factors[-1].shape[-1],)
+    if out is None:
+        out = nm.empty(shape[:-2] + (-1,), dtype=aux.dtype)
+
+    nm.multiply(aux[..., None], factors[-1][..., None, :],
+                out=out.reshape(shape))
+
+    return out
+
 def eval_mapping_data_in_qp(qps, control_points, weights, degrees, cs, conn,
-                            cells=None):
+                            cells=None, extraction=None, n_cell_max=16):
     """
     Evaluate data required for the isogeometric domain reference mapping in the
     given quadrature points. The quadrature points are the same for all Bezier
     elements and should correspond to the Bernstein basis degree.
 
+    All elements are evaluated at once, in chunks of at most `n_cell_max`
+    elements: The 1D Bernstein basis is evaluated only once in the quadrature
+    point coordinates, and the 1D B-spline basis only once for each unique
+    element extraction operator. The tensor-product basis of each element is
+    then assembled from the 1D factors.
+
     Parameters
     ----------
     qps : array
@@ -887,6 +998,11 @@ def eval_mapping_data_in_qp(qps, control_points, weights, degrees, cs, conn,
         The connectivity of the global NURBS basis.
     cells : array, optional
         If given, use only the given Bezier elements.
+    extraction : tuple, optional
+        If given, the output of :func:`get_unique_extraction()` called with
+        `cs`.
+    n_cell_max : int
+        The maximum number of elements evaluated at once.
 
     Returns
     -------
@@ -900,14 +1016,31 @@ def eval_mapping_data_in_qp(qps, control_points, weights, degrees, cs, conn,
         The Jacobians of the mapping to the unit reference element in the
         physical quadrature points of all elements.
     """
+    if isinstance(degrees, int): degrees = [degrees]
+    degrees = nm.asarray(degrees)
+
     if cells is None:
         cells = nm.arange(conn.shape[0])
 
+    if extraction is None:
+        extraction = get_unique_extraction(cs)
+    ucs, uindices = extraction
+
     n_el = len(cells)
     n_qp = qps.shape[0]
     dim = control_points.shape[1]
     n_efuns = degrees + 1
     n_efun = nm.prod(n_efuns)
+    n_els = [len(ii) for ii in cs]
+    is_nurbs = nm.any(weights != 1.0)
+
+    # 1D B-spline basis N = CB, dN/dxi = C dB/dxi for unique C.
+    uNs = []
+    udNs = []
+    for ii in range(dim):
+        B, dB_dxi = tabulate_bernstein_basis(qps[:, ii], degrees[ii])
+        uNs.append(nm.einsum('cij,qj->cqi', ucs[ii], B))
+        udNs.append(nm.einsum('cij,qj->cqi', ucs[ii], dB_dxi))
 
     # Output Jacobians.
     dets = nm.empty((n_el, n_qp, 1, 1), dtype=nm.float64)
@@ -918,16 +1051,52 @@ def eval_mapping_data_in_qp(qps, control_points, weights, degrees, cs, conn,
     # Output gradients of shape functions.
     bfgs = nm.empty((n_el, n_qp, dim, n_efun), dtype=nm.float64)
 
-    # Loop over elements.
-    for iseq, ie in enumerate(cells):
-        # Loop over quadrature points.
-        for iqp, qp in enumerate(qps):
-            bf, bfg, det = eval_nurbs_basis_tp(qp, ie,
-                                               control_points, weights,
-                                               degrees, cs, conn)
-            bfs[iseq, iqp] = bf
-            bfgs[iseq, iqp] = bfg.T
-            dets[iseq, iqp] = det
+    for ic in range(0, n_el, n_cell_max):
+        ccells = cells[ic:ic + n_cell_max]
+        ecs = get_unraveled_indices(ccells, n_els)
+        ec = conn[ccells]
+
+        Ns = []
+        dNs = []
+        for ii in range(dim):
+            ie = uindices[ii][ecs[ii]]
+            Ns.append(uNs[ii][ie])
+            dNs.append(udNs[ii][ie])
+
+        # Tensor-product basis R, dR/dxi.
+        R = bfs[ic:ic + n_cell_max, :, 0]
+        _outer_product(Ns, out=R)
+        dR_dxi = nm.empty((len(ccells), n_qp, dim, n_efun), dtype=nm.float64)
+        for ii in range(dim):
+            _outer_product(Ns[:ii] + [dNs[ii]] + Ns[ii+1:],
+                           out=dR_dxi[:, :, ii])
+
+        if is_nurbs:
+            # R = W N / w_b, dR/dxi = (W dN/dxi - R dw_b/dxi) / w_b.
+            We = weights[ec][..., None]
+            iw = 1.0 / (R @ We)
+            dw_dxi = (dR_dxi @ We[:, None])[..., 0] * iw
+
+            W = We[:, None, :, 0]
+            R *= W
+            R *= iw
+
+            dR_dxi *= W[:, :, None, :]
+            dR_dxi *= iw[..., None]
+            dR_dxi -= R[:, :, None, :] * dw_dxi[..., None]
+
+        # Mapping reference -> physical domain dxi/dx.
+        # x = sum P_a R_a, dx/dxi = sum P_a dR_a/dxi, invert.
+        P = control_points[ec][:, None, ...]
+        dx_dxi_t = dR_dxi @ P
+
+        det = dets_fast(dx_dxi_t)
+        dxi_dx_t = invs_fast(dx_dxi_t, det)
+
+        dets[ic:ic + n_cell_max, :, 0, 0] = det
+
+        # dR/dx.
+        nm.matmul(dxi_dx_t, dR_dxi, out=bfgs[ic:ic + n_cell_max])
 
     return bfs, bfgs, dets
 
@@ -71,7 +71,25 @@ class Material(Struct):
 
     Material parameters are passed to terms using the dot notation,
     i.e. 'm.E' in our example case.
+
+    Time-dependent materials given by a function may declare what the
+    function values depend on using the 'dependencies' key - a sequence of:
+
+    - 'coors' : the mesh coordinates;
+    - 'time' : the time step and time;
+    - 'state' : the state variables.
+
+    The values are then reevaluated only when any of the dependencies
+    changes. The changes are detected using the version numbers of the
+    coordinates and of the state vector, that are updated by
+    :func:`Problem.set_mesh_coors()
+    <sfepy.discrete.problem.Problem.set_mesh_coors()>` and the state setting
+    methods of :class:`Variables <sfepy.discrete.variables.Variables>`.
+    In-place modifications of the coordinate or state arrays are not
+    detected. Constant materials have no dependencies.
     """
+    valid_dependencies = ('coors', 'time', 'state')
+
     @staticmethod
     def from_conf(conf, functions):
         """
@@ -79,6 +97,7 @@ class Material(Struct):
         """
         kind = conf.get('kind', 'time-dependent')
         flags = conf.get('flags', {})
+        dependencies = conf.get('dependencies', None)
 
         function = conf.get('function', None)
         values = conf.get('values', None)
@@ -86,12 +105,14 @@ class Material(Struct):
         if isinstance(function, basestr):
             function = functions[function]
 
-        obj = Material(conf.name, kind, function, values, flags)
+        obj = Material(conf.name, kind, function, values, flags,
+                       dependencies=dependencies)
 
         return obj
 
     def __init__(self, name, kind='time-dependent',
-                 function=None, values=None, flags=None, **kwargs):
+                 function=None, values=None, flags=None, dependencies=None,
+                 **kwargs):
         """
         A material is defined either by a function, or by a set of constant
         values, potentially distinct per region. Therefore, either `function`
@@ -121,6 +142,11 @@ class Material(Struct):
             Constant material values.
         flags : dict, optional
             Special flags.
+        dependencies : sequence of 'coors', 'time', 'state', optional
+            The dependencies of the material function values. If not given,
+            the dependencies declared by `function` are used, if any,
+            otherwise the dependencies are unknown and the values of
+            time-dependent materials are reevaluated in every time step.
         **kwargs : keyword arguments, optional
             Constant material values passed by their names.
         """
@@ -175,6 +201,19 @@ class Material(Struct):
                     'be specified by region, or none at all.'
                 )
 
+        if dependencies is None:
+            dependencies = getattr(self.function, 'dependencies', None)
+
+        if dependencies is not None:
+            dependencies = tuple(dependencies)
+            for dep in dependencies:
+                if dep not in self.valid_dependencies:
+                    raise ValueError(
+                        f'material {self.name}: unknown dependency "{dep}"!'
+                        f' (valid: {self.valid_dependencies})'
+                    )
+        self.dependencies = dependencies
+
         self.reset()
 
     def iter_terms(self, equations, only_new=True):
@@ -218,6 +257,10 @@ class Material(Struct):
                     raise ValueError('material parameter array must have'
                                      " three dimensions! ('%s' has %d)"
                                      % (dkey, val.ndim))
+                if (val.shape[0] > 1) and (val.strides[0] == 0):
+                    # A broadcast constant value -> store it only once.
+                    val = val[:1]
+
                 qps_shape = qps.get_shape(val.shape)
                 if qps_shape[0] == 0:
                     new_data[dkey] = nm.tile(val, (1, qps_shape[1], 1, 1))
@@ -296,6 +339,50 @@ class Material(Struct):
         self.datas['special_constant'] = datas
         self.constant_names.update(list(datas.keys()))
 
+    def get_dependency_stamps(self, ts, equations, problem=None):
+        """
+        Get the stamps of the current values of the material dependencies.
+
+        Parameters
+        ----------
+        ts : TimeStepper instance
+            The time stepper.
+        equations : Equations instance
+            The equations using the materials.
+        problem : Problem instance, optional
+            The problem with the domain, used for the 'coors' dependency.
+
+        Returns
+        -------
+        stamps : dict or None
+            The stamps, or None for unknown dependencies.
+        """
+        if self.dependencies is None:
+            return None
+
+        stamps = {}
+        for dep in self.dependencies:
+            # Unknown value -> always changed.
+            stamp = object()
+            if dep == 'time':
+                if ts is not None:
+                    stamp = (ts.step, ts.time)
+
+            elif dep == 'coors':
+                if problem is not None:
+                    domain = problem.domain
+                    fields = get_default(problem.fields, {})
+                    stamp = ((domain.coors_version, domain.coors_act_version)
+                             + tuple(getattr(field, 'coors_version', None)
+                                     for field in fields.values()))
+
+            elif equations is not None:
+                stamp = equations.variables.state_version
+
+            stamps[dep] = stamp
+
+        return stamps
+
     def time_update(self, ts, equations, mode='normal', problem=None):
         """
         Evaluate material parameters in physical quadrature points.
@@ -315,11 +402,13 @@ class Material(Struct):
             ``self.datas`` is not empty. For time-dependent materials
             (``self.kind == 'time-dependent'``, the default) that are not
             constant, i.e., are given by a user function, 'normal' mode behaves
-            like 'force' mode. For constant materials it behaves like 'update'
+            like 'force' mode, unless the material dependencies are known and
+            did not change. For constant materials it behaves like 'update'
             mode - existing data are reused.
         problem : Problem instance, optional
             The problem that can be passed to user functions as a context.
         """
+        stamps = self.get_dependency_stamps(ts, equations, problem=problem)
         if mode == 'force':
             self.datas = {}
 
@@ -329,7 +418,10 @@ class Material(Struct):
                     return
 
                 elif not self.is_constant:
-                    self.datas = {}
+                    if (stamps is None) or (stamps != self.stamps):
+                        self.datas = {}
+
+        self.stamps = stamps
 
         for key, term in self.iter_terms(equations):
             self.update_data(key, ts, equations, term, problem=problem)
@@ -376,6 +468,7 @@ class Material(Struct):
         """
         self.mode = None
         self.datas = {}
+        self.stamps = None
         self.special_names = set()
         self.constant_names = set()
         self.extra_args = {}
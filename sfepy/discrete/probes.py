@@ -1,6 +1,7 @@
 """Classes for probing values of Variables, for example, along a line."""
 from __future__ import absolute_import
 import hashlib
+import os.path as op
 
 from ast import literal_eval
 
@@ -11,6 +12,14 @@ from sfepy.base.base import assert_, basestr, Struct
 from sfepy.linalg import make_axis_rotation_matrix, norm_l2_along_axis
 import six
 
+def is_hdf5_filename(filename):
+    """
+    Return True, if `filename` is a name of a HDF5 probe results file, based
+    on its extension.
+    """
+    return (isinstance(filename, basestr)
+            and op.splitext(filename)[1].lower() in ('.h5', '.hdf5'))
+
 def write_results(filename, probe, results):
     """
     Write probing results into a file.
@@ -18,13 +27,19 @@ def write_results(filename, probe, results):
     Parameters
     ----------
     filename : str or file object
-        The output file name.
+        The output file name. If it has the '.h5' or '.hdf5' extension, the
+        results are written using :func:`write_results_hdf5()`, in the time
+        step 0.
     probe : Probe subclass instance
         The probe used to obtain the results.
     results : dict
         The dictionary of probing results. Keys are data names, values are
         the probed values.
     """
+    if is_hdf5_filename(filename):
+        write_results_hdf5(filename, probe, results)
+        return
+
     fd = open(filename, 'w') if isinstance(filename, basestr) else filename
 
     fd.write('\n'.join(probe.report()) + '\n')
@@ -40,7 +55,7 @@ def write_results(filename, probe, results):
     if isinstance(filename, basestr):
         fd.close()
 
-def read_results(filename, only_names=None):
+def read_results(filename, only_names=None, step=None):
     """
     Read probing results from a file.
 
@@ -48,6 +63,11 @@ def read_results(filename, only_names=None):
     ----------
     filename : str or file object
         The probe results file name.
+    only_names : list of str, optional
+        If given, read only the results with the given names.
+    step : int, optional
+        The time step to read from a HDF5 probe results file. If None, the
+        last step is read. Ignored for text files.
 
     Returns
     -------
@@ -59,6 +79,20 @@ def read_results(filename, only_names=None):
     """
     from sfepy.base.ioutils import read_array
 
+    if is_hdf5_filename(filename):
+        header, hresults = read_results_hdf5(filename, only_names=only_names)
+        if step is None:
+            step = header.steps[-1]
+
+        results = {}
+        for name, (steps, pars, vals) in six.iteritems(hresults):
+            ii = nm.searchsorted(steps, step)
+            if (ii == len(steps)) or (steps[ii] != step):
+                continue
+            results[name] = nm.c_[pars, vals[ii]]
+
+        return header, results
+
     is_only_names = only_names is not None
 
     fd = open(filename, 'r') if isinstance(filename, basestr) else filename
@@ -73,6 +107,134 @@ def read_results(filename, only_names=None):
 
     return header, results
 
+def write_results_hdf5(filename, probe, results, steps=0, times=None):
+    """
+    Write or append probing results into a HDF5 file.
+
+    The results of each data name are stored in an extendable array with
+    the time step as the first axis, so that the results of a time step can
+    be appended without rewriting the file. A new file is created if it does
+    not exist, or if the results of the time step 0 are written.
+
+    Parameters
+    ----------
+    filename : str or tables.File instance
+        The output file name.
+    probe : Probe subclass instance
+        The probe used to obtain the results.
+    results : dict
+        The dictionary of probing results. Keys are data names, values are
+        tuples ``(pars, vals)``. If `steps` is a sequence, `vals` have the
+        time step as the first axis.
+    steps : int or sequence of ints
+        The time step(s) of the results.
+    times : float or sequence of floats, optional
+        The time(s) of the time step(s). If not given, the steps are used.
+    """
+    from sfepy.base.ioutils import pt, enc, HDF5ContextManager
+
+    if pt is None:
+        raise ValueError('pytables not imported!')
+
+    is_single = nm.isscalar(steps)
+    steps = nm.array(steps, dtype=nm.int32, ndmin=1)
+    times = (steps.astype(nm.float64) if times is None
+             else nm.array(times, dtype=nm.float64, ndmin=1))
+    n_step = len(steps)
+
+    mode = 'a'
+    if isinstance(filename, basestr):
+        if (steps[0] == 0) or not op.exists(filename):
+            mode = 'w'
+
+    with HDF5ContextManager(filename, mode=mode,
+                            title='SfePy probe results file') as fd:
+        if 'probe' not in fd.root:
+            fd.create_array('/', 'probe',
+                            [enc(line) for line in probe.report()],
+                            'probe report')
+            gr = fd.create_group('/', 'steps', 'time steps')
+            fd.create_earray(gr, 'step', pt.Int32Atom(), (0,), 'step')
+            fd.create_earray(gr, 't', pt.Float64Atom(), (0,), 'time')
+            fd.create_group('/', 'data', 'probed data')
+
+        gr = fd.root.steps
+        if gr.step.nrows and (steps[0] <= gr.step[-1]):
+            raise ValueError('step %d is already saved in "%s" file!'
+                             % (steps[0], fd.filename))
+        gr.step.append(steps)
+        gr.t.append(times)
+
+        for key, (pars, vals) in six.iteritems(results):
+            pars = nm.asarray(pars)
+            vals = nm.asarray(vals)
+            if is_single:
+                vals = vals[None, ...]
+            if vals.shape[:2] != (n_step, pars.shape[0]):
+                raise ValueError('wrong shape of %s probe data! (%s, %d steps'
+                                 ' and %d points)'
+                                 % (key, vals.shape, n_step, pars.shape[0]))
+            vals = vals.reshape((n_step, pars.shape[0], -1))
+
+            if key in fd.root.data:
+                dgr = fd.root.data._f_get_child(key)
+                if dgr.vals.shape[1:] != vals.shape[1:]:
+                    raise ValueError('shape of %s probe data changed!'
+                                     ' (%s -> %s)' % (key, dgr.vals.shape[1:],
+                                                      vals.shape[1:]))
+
+            else:
+                dgr = fd.create_group(fd.root.data, key, '%s data' % key)
+                fd.create_array(dgr, 'pars', pars, 'probe parametrization')
+                fd.create_earray(dgr, 'steps', pt.Int32Atom(), (0,),
+                                 'time steps of data')
+                fd.create_earray(dgr, 'vals', pt.Atom.from_dtype(vals.dtype),
+                                 (0,) + vals.shape[1:], 'probed values',
+                                 chunkshape=(1,) + vals.shape[1:])
+
+            dgr.steps.append(steps)
+            dgr.vals.append(vals)
+
+def read_results_hdf5(filename, only_names=None):
+    """
+    Read probing results of all time steps from a HDF5 file.
+
+    Parameters
+    ----------
+    filename : str or tables.File instance
+        The probe results file name.
+    only_names : list of str, optional
+        If given, read only the results with the given names.
+
+    Returns
+    -------
+    header : Struct instance
+        The probe data header, with the time steps and times of the file in
+        `steps` and `times` attributes.
+    results : dict
+        The dictionary of probing results. Keys are data names, values are
+        tuples ``(steps, pars, vals)``, where `vals` have the shape
+        ``(n_step, n_point, n_component)``.
+    """
+    from io import StringIO
+    from sfepy.base.ioutils import dec, HDF5ContextManager
+
+    with HDF5ContextManager(filename, mode='r') as fd:
+        report = '\n'.join(dec(line) for line in fd.root.probe.read())
+        header = read_header(StringIO(report + '\n'))
+        header.steps = fd.root.steps.step.read()
+        header.times = fd.root.steps.t.read()
+
+        results = {}
+        for name, dgr in six.iteritems(fd.root.data._v_groups):
+            if (only_names is not None) and (name not in only_names):
+                continue
+
+            results[name] = (dgr.steps.read(), dgr.pars.read(),
+                             dgr.vals.read())
+
+    return header, results
+
 def read_header(fd):
     """
     Read the probe data header from file descriptor fd.
@@ -189,9 +351,16 @@ class Probe(Struct):
         Return the actual evaluate cache, which is a combination of the
         (mesh-based) evaluate cache and probe-specific data, like the reference
         element coordinates. The reference element coordinates are reused, if
-        the sha1 hash of the probe parameter vector does not change.
+        the mesh-based data and the sha1 hash of the probe parameter vector do
+        not change.
         """
-        self.acache += cache
+        if self.acache.get('kdtree', None) is not cache.kdtree:
+            # A different mesh -> invalidate the probe-specific data.
+            self.acache.pars_digest = ''
+
+        for key, val in cache.to_dict().items():
+            if key != 'name':
+                setattr(self.acache, key, val)
 
         def _gen_array_chunks(arr):
             ii = 0
@@ -209,6 +378,7 @@ class Probe(Struct):
             self.acache.ref_coors = None
             self.acache.cells = None
             self.acache.status = None
+            self.acache.locator = None
 
         return self.acache
 
@@ -321,9 +491,16 @@ class Probe(Struct):
 
             acache = self.get_actual_cache(pars, cache)
 
+            locator = acache.get('locator', None)
+            if (locator is None) or (locator.field is not field):
+                locator = field.create_point_locator(
+                    points, strategy='general',
+                    close_limit=self.options.close_limit, cache=acache
+                )
+                acache.locator = locator
+
             vals, ref_coors, cells, status = ev(
-                points, mode=mode, strategy='general',
-                close_limit=self.options.close_limit, cache=acache,
+                points, mode=mode, locator=locator,
                 ret_ref_coors=True, ret_status=True, ret_cells=True)
 
             acache.ref_coors = ref_coors
@@ -742,3 +919,119 @@ class IntegralProbe(Struct):
 
     def __call__(self, ip, state=None, **kwargs):
         return self.problem.evaluate(self.expressions[ip], state, **kwargs)
+
+def probe_time_history(filename, probes, variables, steps=None, mode='val',
+                       n_step_chunk=100, verbose=True):
+    """
+    Probe data stored in many time steps of a results file in a single pass.
+
+    The probe points are refined and located only once, using the data of
+    the first time step. In each chunk of time steps only the required data
+    are loaded, and the values in all the steps of the chunk are obtained by
+    a single sparse matrix product per probe and data name, see
+    :class:`PointLocator <sfepy.discrete.common.global_interp.PointLocator>`.
+
+    Parameters
+    ----------
+    filename : str
+        The results file name. The file format needs to support reading the
+        stored time steps, as the HDF5 formats, for which only the data of the
+        `variables` are read.
+    probes : list of Probe subclass instances
+        The probes.
+    variables : dict
+        The data names as keys and the field variables corresponding to the
+        data as values.
+    steps : sequence of ints, optional
+        The time steps to probe. If None, all stored steps are probed.
+    mode : {'val', 'grad'}, optional
+        The evaluation mode: the variable value (default) or the variable
+        value gradient.
+    n_step_chunk : int
+        The maximum number of time steps loaded at once.
+    verbose : bool
+        If False, reduce verbosity.
+
+    Returns
+    -------
+    steps : array
+        The probed time steps.
+    times : array
+        The times of the probed time steps.
+    results : list of dicts
+        The probing results for each probe. Keys are data names, values are
+        tuples ``(pars, vals)``, where `vals` have the time step as the first
+        axis.
+    """
+    from sfepy.base.base import output
+    from sfepy.discrete.fem.meshio import MeshIO, HDF5MeshIO
+
+    io = MeshIO.any_from_filename(filename)
+    all_steps, all_times, _ = io.read_times()
+    if steps is None:
+        steps = all_steps
+    steps = nm.asarray(steps, dtype=nm.int32)
+    times = all_times[nm.searchsorted(all_steps, steps)]
+
+    names = list(variables.keys())
+    def _read_data(step):
+        if isinstance(io, HDF5MeshIO):
+            data = io.read_data(step, only_names=names)
+
+        else:
+            data = io.read_data(step)
+
+        if data is None:
+            raise ValueError('step %d data not found in "%s"!'
+                             % (step, filename))
+
+        return data
+
+    diff = {'val' : 0, 'grad' : 1}[mode]
+
+    data = _read_data(steps[0])
+    locators = []
+    results = []
+    for probe in probes:
+        plocators = {}
+        presults = {}
+        for name, var in six.iteritems(variables):
+            var.set_data(data[name].data)
+            pars = probe(var)[0]
+            plocators[name] = probe.acache.locator
+            presults[name] = (pars, [])
+        locators.append(plocators)
+        results.append(presults)
+
+    for ic in range(0, len(steps), n_step_chunk):
+        csteps = steps[ic:ic + n_step_chunk]
+        output('probing steps %d to %d...' % (csteps[0], csteps[-1]),
+               verbose=verbose)
+
+        source_vals = {name : [] for name in names}
+        for step in csteps:
+            data = _read_data(step)
+            for name, var in six.iteritems(variables):
+                var.set_data(data[name].data)
+                source_vals[name].append(var().reshape((var.n_nod, -1)))
+
+        for name, var in six.iteritems(variables):
+            # Steps in columns -> a single product for all steps.
+            svals = nm.concatenate(source_vals[name], axis=1)
+            for ip, probe in enumerate(probes):
+                locator = locators[ip][name]
+                vals = locator.evaluate(svals, diff=diff)
+                vals = vals.reshape((vals.shape[0], len(csteps),
+                                     var.n_components, -1))
+                vals = vals.transpose((1, 0, 2, 3))
+                vals[:, locator.status > 1] = nm.nan
+                if mode == 'val':
+                    vals = vals[..., 0]
+
+                results[ip][name][1].append(vals)
+
+    for presults in results:
+        for name, (pars, vals) in six.iteritems(presults):
+            presults[name] = (pars, nm.concatenate(vals, axis=0))
+
+    return steps, times, results
@@ -7,7 +7,7 @@ import numpy as nm
 
 from sfepy.base.base import (
     dict_from_keys_init, select_by_names, is_string, is_integer, is_sequence,
-    output, get_default, Struct, IndexedStruct)
+    output, get_default, Struct, IndexedStruct, goptions)
 import sfepy.base.ioutils as io
 from sfepy.base.conf import ProblemConf, get_standard_keywords
 from sfepy.base.conf import transform_variables, transform_materials
@@ -19,7 +19,7 @@ from sfepy.discrete.fem.fields_base import set_mesh_coors
 from sfepy.discrete.common.fields import fields_from_conf
 from .variables import Variables, Variable
 from .materials import Materials, Material
-from .equations import Equations
+from .equations import Equations, term_profiler
 from .integrals import Integrals
 from sfepy.discrete.conditions import Conditions
 from sfepy.discrete.evaluate import create_evaluable, eval_equations
@@ -296,6 +296,7 @@ class Problem(Struct):
         self.clear_equations()
 
         self._restart_filenames = []
+        self.output_writer = None
 
     def setup_hooks(self, options=None):
         """
@@ -424,7 +425,7 @@ class Problem(Struct):
         """
         self.output_modes = {'vtk' : 'sequence',
                              'h5' : 'single', 'h5x' : 'single',
-                             'msh' : 'sequence'}
+                             'h5ts' : 'single', 'msh' : 'sequence'}
 
         self.ofn_trunk = get_default(output_filename_trunk,
                                      op.basename(self.domain.name))
@@ -440,7 +441,7 @@ class Problem(Struct):
         self.split_results_by = get_default(split_results_by, None)
         self.linearization = get_default(linearization, Struct(kind='strip'))
 
-        if ((self.output_format == 'h5') and
+        if ((self.output_format in ('h5', 'h5ts')) and
             (self.linearization.kind == 'adaptive')):
             self.linearization.kind = None
 
@@ -662,6 +663,8 @@ class Problem(Struct):
                 any_dof_conn=any_dof_conn,
                 active_only=self.active_only,
                 chunk_size=chunk_size,
+                method=self.conf.options.get('graph_method', 'native'),
+                cache_dir=self.conf.options.get('graph_cache_dir', None),
             )
             ## import sfepy.base.plotutils as plu
             ## plu.spy(self.mtx_a)
@@ -774,7 +777,16 @@ class Problem(Struct):
         actual : bool
             If True, update the actual configuration coordinates,
             otherwise the undeformed configuration ones.
+
+        Notes
+        -----
+        If the results are being saved in a background thread, see
+        :func:`Problem.save_state_async()`, the pending output is written
+        before the coordinates are changed.
         """
+        if self.output_writer is not None:
+            self.output_writer.flush()
+
         set_mesh_coors(self.domain, self.fields, coors,
                        update_fields=update_fields, actual=actual,
                        clear_all=clear_all, extra_dofs=extra_dofs)
@@ -834,12 +846,49 @@ class Problem(Struct):
 
         return meshes
 
+    def _get_output_options(self, linearization, split_results_by):
+        linearization = get_default(linearization, self.linearization)
+        if linearization.kind != 'adaptive':
+            split_results_by = get_default(split_results_by,
+                                           self.split_results_by)
+
+        else:
+            split_results_by = 'variable'
+
+        return linearization, split_results_by
+
+    def create_state_output(self, state, vec=None, fill_value=None,
+                            post_process_hook=None, linearization=None,
+                            split_results_by=None):
+        """
+        Create the output dictionary of `state` for
+        :func:`Problem.save_state()`. For the parameters see
+        :func:`Problem.save_state()`.
+        """
+        linearization, split_results_by = self._get_output_options(
+            linearization, split_results_by
+        )
+
+        extend = split_results_by not in ['variable', 'region']
+        out = state.create_output(vec=vec, fill_value=fill_value,
+                                  extend=extend,
+                                  linearization=linearization)
+
+        if post_process_hook is not None:
+            out = post_process_hook(out, self, state, extend=extend)
+
+        return out
+
     def save_state(self, filename, state=None, out=None,
                    fill_value=None, post_process_hook=None,
-                   linearization=None, split_results_by=None, **kwargs):
+                   linearization=None, split_results_by=None, vec=None,
+                   **kwargs):
         """
         Parameters
         ----------
+        vec : array, optional
+            If given, the state vector used instead of the current vector of
+            `state` to create the output.
         split_results_by : None, 'region', 'variable'
             If 'region' or 'variable', data of each region/variable are
             stored in a separate file.
@@ -849,22 +898,17 @@ class Problem(Struct):
             approximations. If its kind is 'adaptive', `split_results_by` is
             assumed 'variable'.
         """
-        linearization = get_default(linearization, self.linearization)
-        if linearization.kind != 'adaptive':
-            split_results_by = get_default(split_results_by,
-                                           self.split_results_by)
-
-        else:
-            split_results_by = 'variable'
+        linearization, split_results_by = self._get_output_options(
+            linearization, split_results_by
+        )
 
         if (out is None) and (state is not None):
-            extend = split_results_by not in ['variable', 'region']
-            out = state.create_output(fill_value=fill_value,
-                                      extend=extend,
-                                      linearization=linearization)
-
-            if post_process_hook is not None:
-                out = post_process_hook(out, self, state, extend=extend)
+            out = self.create_state_output(
+                state, vec=vec, fill_value=fill_value,
+                post_process_hook=post_process_hook,
+                linearization=linearization,
+                split_results_by=split_results_by,
+            )
 
         if linearization.kind == 'adaptive':
             for key, val in out.items():
@@ -923,6 +967,55 @@ class Problem(Struct):
             mesh.write(filename, io='auto', out=out,
                        float_format=self.float_format, **kwargs)
 
+    def save_state_async(self, filename, state, post_process_hook=None,
+                         **kwargs):
+        """
+        Save the state using :func:`Problem.save_state()` called by
+        `self.output_writer` in a background thread, see
+        :class:`BackgroundWriter <sfepy.base.ioutils.BackgroundWriter>`.
+
+        The state vector and the time stepper passed in `kwargs` are copied,
+        so that the solution can continue while the output is being created
+        and written. If `post_process_hook` is given, or the linearization is
+        adaptive, the output is created immediately, and only written in the
+        background. The background thread thus does not evaluate any terms
+        and does not use the mapping cache nor `field.linearizations`.
+
+        The mesh is not copied. Its coordinates have to be changed only by
+        :func:`Problem.set_mesh_coors()`, that waits for the pending output,
+        so that the output of a moving mesh is effectively synchronous.
+        """
+        ts = kwargs.get('ts')
+        if ts is not None:
+            kwargs['ts'] = ts.copy()
+
+        linearization = get_default(kwargs.get('linearization'),
+                                    self.linearization)
+        if (post_process_hook is not None) or (linearization.kind
+                                               == 'adaptive'):
+            out = self.create_state_output(
+                state, post_process_hook=post_process_hook,
+                fill_value=kwargs.get('fill_value'),
+                linearization=linearization,
+                split_results_by=kwargs.get('split_results_by'),
+            )
+            self.output_writer.write(self.save_state, filename, out=out,
+                                     **kwargs)
+
+        else:
+            self.output_writer.write(self.save_state, filename, state,
+                                     vec=state.vec.copy(), **kwargs)
+
+    def close_output_writer(self, raise_error=True):
+        """
+        Wait until `self.output_writer` finishes saving the results and stop
+        it. If `raise_error` is True, re-raise an exception raised while
+        saving the results.
+        """
+        if self.output_writer is not None:
+            writer, self.output_writer = self.output_writer, None
+            writer.close(raise_error=raise_error)
+
     def save_ebc(self, filename, ebcs=None, epbcs=None,
                  force=True, default=0.0):
         """
@@ -1370,11 +1463,17 @@ class Problem(Struct):
                     suffix = None
 
                 filename = self.get_output_name(suffix=suffix)
-                self.save_state(filename, variables,
-                                post_process_hook=post_process_hook,
-                                split_results_by=None,
-                                ts=ts,
-                                file_format=self.file_format)
+                if self.output_writer is not None:
+                    save_state = self.save_state_async
+
+                else:
+                    save_state = self.save_state
+
+                save_state(filename, variables,
+                           post_process_hook=post_process_hook,
+                           split_results_by=None,
+                           ts=ts,
+                           file_format=self.file_format)
 
             self.advance(ts)
             return vec
@@ -1496,96 +1595,149 @@ class Problem(Struct):
         -------
         variables : Variables
             The variables with the final time step state.
+
+        Notes
+        -----
+        If the 'profile_terms' option is set, the times spent in the
+        individual terms are stored in ``status['term_stats']`` and reported,
+        see :class:`Profiler <sfepy.base.timing.Profiler>`.
+
+        If the 'async_output' option is set, the results are saved in a
+        background thread, see :func:`Problem.save_state_async()`. An
+        exception raised while saving the results is re-raised at the latest
+        after the time-stepping solver finishes.
         """
         if status is None:
             status = IndexedStruct()
 
-        if self.solver is None:
-            self.init_solvers(status=status)
+        profile_terms = self.conf.options.get('profile_terms', False)
+        if profile_terms:
+            term_profiler.reset()
+            profile_terms0 = goptions['profile_terms']
+            goptions['profile_terms'] = True
 
-        tss = self.get_solver()
+        try:
+            if self.solver is None:
+                self.init_solvers(status=status)
 
-        self.equations.set_data(var_data, ignore_unknown=True)
+            tss = self.get_solver()
 
-        report_nls_status = getattr(
-            self.conf.options, 'report_nls_status', report_nls_status)
-        log_nls_status = getattr(
-            self.conf.options, 'log_nls_status', log_nls_status)
+            self.equations.set_data(var_data, ignore_unknown=True)
 
-        if self.conf.options.get('block_solve', False):
-            variables = self.block_solve(state0, status=status,
-                                         save_results=save_results,
-                                         step_hook=step_hook,
-                                         post_process_hook=post_process_hook,
-                                         report_nls_status=report_nls_status,
-                                         log_nls_status=log_nls_status,
-                                         verbose=verbose)
+            report_nls_status = getattr(
+                self.conf.options, 'report_nls_status', report_nls_status)
+            log_nls_status = getattr(
+                self.conf.options, 'log_nls_status', log_nls_status)
 
-        else:
-            if state0 is not None:
-                variables = self.set_default_state(vec=state0)
+            if self.conf.options.get('block_solve', False):
+                variables = self.block_solve(
+                    state0, status=status, save_results=save_results,
+                    step_hook=step_hook, post_process_hook=post_process_hook,
+                    report_nls_status=report_nls_status,
+                    log_nls_status=log_nls_status, verbose=verbose,
+                )
 
             else:
-                variables = self.get_initial_state()
-
-            self.time_update(tss.ts)
-
-            variables.apply_ebc(force_values=force_values)
-
-            if self.is_linear():
-                mtx = prepare_matrix(self, variables) # Updates materials.
-                self.try_presolve(mtx)
-
-            init_fun, prestep_fun, poststep_fun = self.get_tss_functions(
-                update_bcs=update_bcs, update_materials=update_materials,
-                save_results=save_results,
-                step_hook=step_hook, post_process_hook=post_process_hook)
-
-            tss.set_dof_info(variables.adi)
-            vec = tss(variables.get_state(self.active_only, force=True),
-                      init_fun=init_fun,
-                      prestep_fun=prestep_fun,
-                      poststep_fun=poststep_fun,
-                      status=status,
-                      log_nls_status=log_nls_status)
-
-            time_stats = status.get('time_stats')
-            if time_stats is not None:
-                output('====== time stats ======')
-                for key in time_stats.keys():
-                    output('%12s: %.8f [s]' % ('nls ' + key, time_stats[key]))
-
-            if report_nls_status:
-                step_stats = status.get('step_stats')
-                if step_stats is not None:
-                    output('====== step stats ======')
-                    output.prefix, aux = '', output.prefix
-                    # output('  step, time,      cond,  nit, ls_nit,      err0,'
-                    output('  step,         time, cond,  nit, ls_nit,      err0,'
-                           '       err, elapsed [s]')  # 78 chars long
-                    if len(step_stats) > 1 and step_stats[0].get("step") > 0:
-                        s0 = IndexedStruct(step=0, step_time=0.0, condition=0,
-                                           n_iter=0, ls_n_iter=0,
-                                           err=0, err0=0, time=0)
-                        step_stats = [s0] + step_stats
-
-                    for step in step_stats:
-                        msg = f'{step.get("step") + 1:6}, '
-                        msg += f'{step.get("step_time"):.6e}, '
-                        msg += f'{step.get("condition"):4}, '
-                        msg += f'{step.get("n_iter"):4}, '
-                        msg += f'{step.get("ls_n_iter"):6}, '
-                        msg += f'{step.get("err0"):.3e}, '
-                        msg += f'{step.get("err"):.3e}, '
-                        msg += f'{step.get("time"):.4f}'
-
-                        output(msg)
-                    output.prefix, aux = aux, output.prefix
-
-            output('solved in %d steps in %.2f seconds'
-                   % (status['n_step'], status['time']), verbose=verbose)
-
-            variables.set_state(vec, self.active_only)
+                if state0 is not None:
+                    variables = self.set_default_state(vec=state0)
+
+                else:
+                    variables = self.get_initial_state()
+
+                self.time_update(tss.ts)
+
+                variables.apply_ebc(force_values=force_values)
+
+                if self.is_linear():
+                    mtx = prepare_matrix(self, variables) # Updates materials.
+                    self.try_presolve(mtx)
+
+                init_fun, prestep_fun, poststep_fun = self.get_tss_functions(
+                    update_bcs=update_bcs, update_materials=update_materials,
+                    save_results=save_results,
+                    step_hook=step_hook, post_process_hook=post_process_hook)
+
+                async_output = self.conf.options.get('async_output', False)
+                if save_results and async_output:
+                    queue_size = (2 if async_output is True
+                                  else int(async_output))
+                    self.output_writer = io.BackgroundWriter(
+                        queue_size=queue_size, name='output_writer',
+                    )
+
+                tss.set_dof_info(variables.adi)
+                try:
+                    vec0 = variables.get_state(self.active_only, force=True)
+                    vec = tss(vec0,
+                              init_fun=init_fun,
+                              prestep_fun=prestep_fun,
+                              poststep_fun=poststep_fun,
+                              status=status,
+                              log_nls_status=log_nls_status)
+
+                except BaseException:
+                    self.close_output_writer(raise_error=False)
+                    raise
+
+                self.close_output_writer()
+
+                time_stats = status.get('time_stats')
+                if time_stats is not None:
+                    output('====== time stats ======')
+                    for key in time_stats.keys():
+                        output('%12s: %.8f [s]'
+                               % ('nls ' + key, time_stats[key]))
+
+                if report_nls_status:
+                    step_stats = status.get('step_stats')
+                    if step_stats is not None:
+                        output('====== step stats ======')
+                        output.prefix, aux = '', output.prefix
+                        output('  step,         time, cond,  nit, ls_nit,'
+                               '      err0,       err, elapsed [s]')
+                        if ((len(step_stats) > 1)
+                            and (step_stats[0].get("step") > 0)):
+                            s0 = IndexedStruct(step=0, step_time=0.0,
+                                               condition=0, n_iter=0,
+                                               ls_n_iter=0, err=0, err0=0,
+                                               time=0)
+                            step_stats = [s0] + step_stats
+
+                        for step in step_stats:
+                            msg = f'{step.get("step") + 1:6}, '
+                            msg += f'{step.get("step_time"):.6e}, '
+                            msg += f'{step.get("condition"):4}, '
+                            msg += f'{step.get("n_iter"):4}, '
+                            msg += f'{step.get("ls_n_iter"):6}, '
+                            msg += f'{step.get("err0"):.3e}, '
+                            msg += f'{step.get("err"):.3e}, '
+                            msg += f'{step.get("time"):.4f}'
+
+                            output(msg)
+                        output.prefix, aux = aux, output.prefix
+
+                output('solved in %d steps in %.2f seconds'
+                       % (status['n_step'], status['time']), verbose=verbose)
+
+                variables.set_state(vec, self.active_only)
+
+        finally:
+            if profile_terms:
+                goptions['profile_terms'] = profile_terms0
+
+        if profile_terms:
+            status['term_stats'] = term_profiler.get_stats()
+            output('====== term stats ======', verbose=verbose)
+            for line in term_profiler.report().splitlines():
+                output(line, verbose=verbose)
+
+            if profile_terms == 'json':
+                filename = op.join(self.output_dir,
+                                   self.ofn_trunk + '_term_stats.json')
+                io.ensure_path(filename)
+                with open(filename, 'w') as fd:
+                    fd.write(term_profiler.report(fmt='json'))
+                output('term stats saved to:', filename, verbose=verbose)
 
         if post_process_hook_final is not None: # User postprocessing.
             post_process_hook_final(self, variables)
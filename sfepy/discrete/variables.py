@@ -8,7 +8,7 @@ import numpy as nm
 
 from sfepy.base.base import (real_types, complex_types, assert_, get_default,
                              output, OneTypeList, Container, Struct,
-                             iter_dict_of_lists)
+                             iter_dict_of_lists, new_version)
 from sfepy.base.timing import Timer
 import sfepy.linalg as la
 from sfepy.discrete.functions import Function
@@ -181,6 +181,7 @@ class Variables(Container):
         Container.__init__(self, OneTypeList(Variable),
                            vec=None,
                            r_vec=None,
+                           state_version=new_version(),
                            state=set(),
                            virtual=set(),
                            parameter=set(),
@@ -642,6 +643,7 @@ class Variables(Container):
             var.locked = True
 
         self.vec = vec
+        self.state_version = new_version()
 
     def fill_state(self, value):
         """
@@ -651,6 +653,7 @@ class Variables(Container):
             self.r_vec.fill(value)
 
         self.vec.fill(value)
+        self.state_version = new_version()
         self.invalidate_evaluate_caches(step=0)
 
     def apply_ebc(self, vec=None, force_values=None):
@@ -660,6 +663,7 @@ class Variables(Container):
         """
         if vec is None:
             vec = self.vec
+            self.state_version = new_version()
             self.invalidate_evaluate_caches(step=0)
 
         for var in self.iter_state():
@@ -672,6 +676,7 @@ class Variables(Container):
         """
         if vec is None:
             vec = self.vec
+            self.state_version = new_version()
             self.invalidate_evaluate_caches(step=0)
 
         for var in self.iter_state():
@@ -750,6 +755,7 @@ class Variables(Container):
             If True, do not invalidate evaluate caches of variables.
         """
         self.vec[:] = self.make_full_vec(r_vec)
+        self.state_version = new_version()
 
         if self.has_lcbc:
             self.r_vec = r_vec
@@ -794,6 +800,7 @@ class Variables(Container):
                 self.r_vec = None
 
         self.vec[:] = vec
+        self.state_version = new_version()
         if not preserve_caches:
             self.invalidate_evaluate_caches(step=0)
 
@@ -851,6 +858,7 @@ class Variables(Container):
 
         if vec is None:
             vec = self.vec
+            self.state_version = new_version()
             self.invalidate_evaluate_caches(step=0)
 
         else:
@@ -956,6 +964,8 @@ class Variables(Container):
         for var in self.iter_state():
             var.advance(ts)
 
+        self.state_version = new_version()
+
 class Variable(Struct):
 
     @staticmethod
@@ -1372,6 +1382,7 @@ class FieldVariable(Variable):
         self.is_surface = field.is_surface
 
         self.field = field
+        self.eq_map_cache = {}
         self._setup_dofs(field.n_nod, field.n_components, field.val_shape)
 
         self.flags.add(is_field)
@@ -1555,7 +1566,8 @@ class FieldVariable(Variable):
             bcs.sort()
 
         active_bcs = self.eq_map.map_equations(bcs, self.field, ts, functions,
-                                               problem=problem, warn=warn)
+                                               problem=problem, warn=warn,
+                                               cache=self.eq_map_cache)
         self.n_adof = self.eq_map.n_eq
 
         return active_bcs
@@ -2031,7 +2043,8 @@ class FieldVariable(Variable):
     def evaluate_at(self, coors, mode='val', strategy='general',
                     close_limit=0.1, get_cells_fun=None,
                     cache=None, ret_cells=False,
-                    ret_status=False, ret_ref_coors=False, verbose=False):
+                    ret_status=False, ret_ref_coors=False, locator=None,
+                    verbose=False):
         """
         Evaluate the variable in the given physical coordinates. Convenience
         wrapper around :func:`Field.evaluate_at()
@@ -2048,6 +2061,7 @@ class FieldVariable(Variable):
                                      ret_cells=ret_cells,
                                      ret_status=ret_status,
                                      ret_ref_coors=ret_ref_coors,
+                                     locator=locator,
                                      verbose=verbose)
 
         return out
@@ -105,7 +105,8 @@ def define(filename_mesh=None,
         "tss": ('ts.tvd_runge_kutta_3',
                 {"t0"     : t0,
                  "t1"     : t1,
-                 'limiters': {"f": MomentLimiter1D} if limit else {}
+                 'limiters': {"f": MomentLimiter1D} if limit else {},
+                 'cell_mass_inverse' : True,
                  }),
         'nls': ('nls.newton', {}),
         'ls' : ('ls.scipy_direct', {})
@@ -81,6 +81,11 @@ options = {
 
 evp_options = {
     'eigensolver' : 'eig.sgscipy',
+    # Alternatively, compute only the given number of the smallest eigenpairs
+    # by the default sparse eigensolver, see SimpleEVP. Remove 'eigensolver'
+    # above, as it computes all eigenpairs. 'n_eigs' has to be greater than
+    # the end of 'eig_range' below.
+    # 'n_eigs' : 100,
     'save_eig_vectors' : (12, 0),
     'scale_epsilon' : 1.0,
     'elasticity_contrast' : 1.0,
@@ -104,6 +109,10 @@ band_gaps_options = {
 
     'log_save_name' : 'band_gaps.log',
     'raw_log_save_name' : 'raw_eigensolution.npz',
+    # Trace the logged frequencies in parallel and start the zero finding
+    # from the logged frequencies, see BandGaps.
+    # 'n_workers' : 4,
+    # 'warm_start' : True,
 }
 
 conf = BandGapsConf(filename, 1, region_selects, mat_pars, options,
@@ -5,6 +5,8 @@ from collections.abc import Iterable
 
 from sfepy.base.base import assert_, get_default, Struct
 from sfepy.discrete.evaluate import eval_equations
+from sfepy.solvers.ls import ScipyDirect, MultiProblem
+from sfepy.solvers.ts_solvers import StationarySolver
 from .utils import iter_sym, iter_nonsym, create_pis, create_scalar_pis,\
     rm_multi
 
@@ -154,6 +156,7 @@ class CorrMiniApp(MiniAppBase):
         MiniAppBase.__init__(self, name, problem, kwargs)
         self.output_dir = self.problem.output_dir
         self.set_default('save_name', None)
+        self.set_default('batch_solve', False)
 
         if self.save_name is not None:
             self.save_name = os.path.normpath(os.path.join(self.output_dir,
@@ -166,6 +169,79 @@ class CorrMiniApp(MiniAppBase):
         self.set_default('post_process_hook', post_process_hook)
         self.set_default('split_results_by', split_results_by)
 
+    def can_batch_solve(self, problem):
+        """
+        Check whether the corrector problems can be solved by
+        :func:`CorrMiniApp.solve_batch()`, i.e. whether the batch solve is
+        requested, the problem is linear and stationary, has no LCBCs and is
+        solved by the direct solver.
+        """
+        return (self.batch_solve and self.is_linear
+                and isinstance(problem.get_solver(), StationarySolver)
+                and isinstance(problem.get_ls(), ScipyDirect)
+                and not isinstance(problem.get_ls(), MultiProblem)
+                and not problem.equations.variables.has_lcbc
+                and not problem.conf.options.get('block_solve', False))
+
+    def solve_batch(self, problem, set_variables, ids):
+        """
+        Solve the linear corrector problems for all `ids` with a single
+        system matrix assembly and factorization. The right-hand sides are
+        solved in one linear solver call.
+
+        The system matrix must not depend on the values set by
+        `set_variables()`, nor on `problem.homogen_corr_id`.
+
+        Parameters
+        ----------
+        problem : Problem instance
+            The corrector problem with equations, boundary conditions and
+            solvers set.
+        set_variables : callable
+            The function ``set_variables(variables, id)`` setting the
+            variables that determine the right-hand side for a given `id`.
+        ids : list
+            The corrector ids.
+
+        Returns
+        -------
+        states : list
+            The state parts of the solutions for each id.
+        """
+        tss = problem.get_solver()
+        ev = problem.get_evaluator()
+
+        variables = problem.get_initial_state()
+        problem.time_update(tss.ts)
+
+        mtx = None
+        vec0s = []
+        rhss = []
+        for cid in ids:
+            set_variables(variables, cid)
+            problem.homogen_corr_id = (self.name, cid)
+
+            problem.get_initial_state()
+            variables.apply_ebc()
+            vec0 = variables.get_state(problem.active_only, force=True).copy()
+            if mtx is None:
+                mtx = ev.eval_tangent_matrix(vec0.copy())
+
+            vec0s.append(vec0)
+            rhss.append(ev.eval_residual(vec0.copy()))
+
+        ls = problem.get_ls()
+        dxs = ls.solve_many(nm.array(rhss).T, mtx=mtx)
+        dxs = dxs.reshape((-1, len(ids)))
+
+        states = []
+        for ii, cid in enumerate(ids):
+            variables.set_state(vec0s[ii] - dxs[:, ii], problem.active_only)
+            assert_(variables.has_ebc())
+            states.append(variables.get_state_parts(variables().copy()))
+
+        return states
+
     def get_save_name_base(self):
         return self.save_name
 
@@ -348,7 +424,12 @@ class CorrNN(CorrMiniApp):
              'epbcs' : [],
              'equations' : {},
              'set_variables' : None,
+             'batch_solve' : False,
         },
+
+    If 'batch_solve' is True and the problem is linear, all the corrector
+    problems are solved using a single matrix factorization, see
+    :func:`CorrMiniApp.solve_batch()`.
     """
 
     def set_variables_default(variables, ir, ic, set_var, data):
@@ -378,21 +459,37 @@ class CorrNN(CorrMiniApp):
 
         states = nm.zeros((self.dim, self.dim), dtype=object)
         clist = []
-        for ir in range(self.dim):
-            for ic in range(self.dim):
+        if self.can_batch_solve(problem):
+            def set_variables(variables, cid):
                 if isinstance(self.set_variables, list):
-                    self.set_variables_default(variables, ir, ic,
+                    self.set_variables_default(variables, cid[0], cid[1],
                                                self.set_variables, data)
                 else:
-                    self.set_variables(variables, ir, ic, **data)
+                    self.set_variables(variables, cid[0], cid[1], **data)
 
-                problem.homogen_corr_id = (self.name, (ir, ic))
-                state = problem.solve(update_materials=False,
-                                      save_results=False)
-                assert_(state.has_ebc())
-                states[ir,ic] = state.get_state_parts()
+            clist = [(ir, ic)
+                     for ir in range(self.dim) for ic in range(self.dim)]
+            for cid, state in zip(clist, self.solve_batch(problem,
+                                                          set_variables,
+                                                          clist)):
+                states[cid] = state
 
-                clist.append((ir, ic))
+        else:
+            for ir in range(self.dim):
+                for ic in range(self.dim):
+                    if isinstance(self.set_variables, list):
+                        self.set_variables_default(variables, ir, ic,
+                                                   self.set_variables, data)
+                    else:
+                        self.set_variables(variables, ir, ic, **data)
+
+                    problem.homogen_corr_id = (self.name, (ir, ic))
+                    state = problem.solve(update_materials=False,
+                                          save_results=False)
+                    assert_(state.has_ebc())
+                    states[ir,ic] = state.get_state_parts()
+
+                    clist.append((ir, ic))
 
         corr_sol = CorrSolution(name=self.name,
                                 states=states,
@@ -431,20 +528,32 @@ class CorrN(CorrMiniApp):
 
         states = nm.zeros((self.dim,), dtype=object)
         clist = []
-        for ir in range(self.dim):
-            if isinstance(self.set_variables, list):
-                self.set_variables_default(variables, ir,
-                                           self.set_variables, data)
-            else:
-                self.set_variables(variables, ir, **data)
+        if self.can_batch_solve(problem):
+            def set_variables(variables, cid):
+                if isinstance(self.set_variables, list):
+                    self.set_variables_default(variables, cid[0],
+                                               self.set_variables, data)
+                else:
+                    self.set_variables(variables, cid[0], **data)
 
-            problem.homogen_corr_id = (self.name, (ir,))
-            state = problem.solve(update_materials=False,
-                                  save_results=False)
-            assert_(state.has_ebc())
-            states[ir] = state.get_state_parts()
+            clist = [(ir,) for ir in range(self.dim)]
+            states[:] = self.solve_batch(problem, set_variables, clist)
 
-            clist.append((ir,))
+        else:
+            for ir in range(self.dim):
+                if isinstance(self.set_variables, list):
+                    self.set_variables_default(variables, ir,
+                                               self.set_variables, data)
+                else:
+                    self.set_variables(variables, ir, **data)
+
+                problem.homogen_corr_id = (self.name, (ir,))
+                state = problem.solve(update_materials=False,
+                                      save_results=False)
+                assert_(state.has_ebc())
+                states[ir] = state.get_state_parts()
+
+                clist.append((ir,))
 
         corr_sol = CorrSolution(name=self.name,
                                 states=states,
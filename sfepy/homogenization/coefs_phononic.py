@@ -149,6 +149,10 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
     corresponding eigenmomenta are above a given threshold) are taken into
     account.
 
+    The eigenvalues at the logged frequencies are traced in parallel, if
+    `opts.n_workers` > 1. If `opts.warm_start` is True, the zero finding
+    starts from the subinterval bracketing the zero in the traced log.
+
     Notes
     -----
     - make freq_eps relative to ]f0, f1[ size?
@@ -160,13 +164,40 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
     output('freq. range with margins: [%8.3f, %8.3f]'
            % (min_freq, max_freq))
 
-    df = opts.freq_step * (max_freq - min_freq)
-
     fz_callback = get_callback(mass.evaluate, opts.eigensolver,
                                mtx_b=mtx_b, mode='find_zero')
     trace_callback = get_callback(mass.evaluate, opts.eigensolver,
                                   mtx_b=mtx_b, mode='trace')
 
+    n_workers = opts.get('n_workers', 1)
+    warm_start = opts.get('warm_start', False)
+
+    pool = None
+    if n_workers > 1:
+        import sfepy.base.multiproc_proc as multi
+
+        if multi.use_multiprocessing:
+            # The callback is inherited by the forked pool processes.
+            _band_gaps_global_dict['trace_callback'] = trace_callback
+            pool = multi.Pool(processes=n_workers)
+
+    try:
+        out = _detect_band_gaps(freq_info, opts, fz_callback, trace_callback,
+                                pool, warm_start, gap_kind, mtx_b)
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+            _band_gaps_global_dict.clear()
+
+    return out
+
+def _detect_band_gaps(freq_info, opts, fz_callback, trace_callback, pool,
+                      warm_start, gap_kind, mtx_b):
+    fm = freq_info.freq_range_margins
+    df = opts.freq_step * (fm[-1] - fm[0])
+
     n_col = 1 + (mtx_b is not None)
     logs = [[] for ii in range(n_col + 1)]
     gaps = []
@@ -180,10 +211,7 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
 
         output('n_logged: %d' % log_freqs.shape[0])
 
-        log_mevp = [[] for ii in range(n_col)]
-        for f in log_freqs:
-            for ii, data in enumerate(trace_callback(f)):
-                log_mevp[ii].append(data)
+        log_mevp = trace_freqs(trace_callback, log_freqs, pool=pool)
 
         # Get log for the first and last f in log_freqs.
         lf0 = log_freqs[0]
@@ -233,8 +261,11 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
 
                 # Insert fmin, fmax into log.
                 output('finding zero of the largest eig...')
+                bracket = (get_zero_bracket(log_freqs, log_mevp[0], 1)
+                           if warm_start else None)
                 smax, fmax, vmax = find_zero(lf0, lf1, fz_callback,
-                                             opts.freq_eps, opts.zero_eps, 1)
+                                             opts.freq_eps, opts.zero_eps, 1,
+                                             bracket=bracket)
                 im = nm.searchsorted(log_freqs, fmax)
                 llog_freqs.insert(im, fmax)
                 for ii, data in enumerate(trace_callback(fmax)):
@@ -245,8 +276,11 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
                     output('finding zero of the smallest eig...')
                     # having fmax instead of f0 does not work if freq_eps is
                     # large.
+                    bracket = (get_zero_bracket(llog_freqs, log_mevp[0], 0)
+                               if warm_start else None)
                     smin, fmin, vmin = find_zero(lf0, lf1, fz_callback,
-                                                 opts.freq_eps, opts.zero_eps, 0)
+                                                 opts.freq_eps, opts.zero_eps,
+                                                 0, bracket=bracket)
                     im = nm.searchsorted(log_freqs, fmin)
                     # +1 due to fmax already inserted before.
                     llog_freqs.insert(im+1, fmin)
@@ -301,22 +335,24 @@ def get_callback(mass, solver_kind, mtx_b=None, mode='trace'):
     otherwise it is
       omega^2 M w = \eta B w"""
 
+    # The solver instance is reused in all calls.
+    solver = Solver.any_from_conf(Struct(name='aux', kind=solver_kind))
+
     def find_zero_callback(f):
-        meigs = eig(mass(f), eigenvectors=False, solver_kind=solver_kind)
+        meigs = solver(mass(f), eigenvectors=False)
         return meigs
 
     def find_zero_full_callback(f):
-        meigs = eig((f**2) * mass(f), mtx_b=mtx_b,
-                    eigenvectors=False, solver_kind=solver_kind)
+        meigs = solver((f**2) * mass(f), mtx_b=mtx_b, eigenvectors=False)
         return meigs
 
     def trace_callback(f):
-        meigs = eig(mass(f), eigenvectors=False, solver_kind=solver_kind)
+        meigs = solver(mass(f), eigenvectors=False)
         return meigs,
 
     def trace_full_callback(f):
-        meigs, mvecs = eig((f**2) * mass(f), mtx_b=mtx_b,
-                           eigenvectors=True, solver_kind=solver_kind)
+        meigs, mvecs = solver((f**2) * mass(f), mtx_b=mtx_b,
+                              eigenvectors=True)
 
         return meigs, mvecs
 
@@ -325,12 +361,15 @@ def get_callback(mass, solver_kind, mtx_b=None, mode='trace'):
 
     return eval(mode + '_callback')
 
-def find_zero(f0, f1, callback, freq_eps, zero_eps, mode):
+def find_zero(f0, f1, callback, freq_eps, zero_eps, mode, bracket=None):
     """
     For f \in ]f0, f1[ find frequency f for which either the smallest (`mode` =
     0) or the largest (`mode` = 1) eigenvalue of problem P given by `callback`
     is zero.
 
+    If given, the bisection starts from the `bracket` = (fm, fp) subinterval
+    of ]f0, f1[ instead of the whole interval, see :func:`get_zero_bracket()`.
+
     Returns
     -------
     flag : 0, 1, or 2
@@ -354,7 +393,7 @@ def find_zero(f0, f1, callback, freq_eps, zero_eps, mode):
     1       2       f -> f0, largest eigenvalue > 0
     =====  ======  ========
     """
-    fm, fp = f0, f1
+    fm, fp = get_default(bracket, (f0, f1))
     ieig = {0 : 0, 1 : -1}[mode]
     while 1:
         f = 0.5 * (fm + fp)
@@ -388,6 +427,54 @@ def find_zero(f0, f1, callback, freq_eps, zero_eps, mode):
         else:
             fm = f
 
+def get_zero_bracket(log_freqs, log_eigs, mode):
+    """
+    Get the two neighboring logged frequencies between which either the
+    smallest (`mode` = 0) or the largest (`mode` = 1) eigenvalue of problem P
+    changes its sign from negative to positive.
+
+    Returns
+    -------
+    bracket : (float, float) or None
+        The bracketing frequencies or None, if the sign change was not logged.
+    """
+    ieig = {0 : 0, 1 : -1}[mode]
+    vals = nm.array([meigs[ieig] for meigs in log_eigs])
+
+    ip = nm.where(vals > 0.0)[0]
+    if len(ip) and (ip[0] > 0):
+        return log_freqs[ip[0] - 1], log_freqs[ip[0]]
+
+    else:
+        return None
+
+_band_gaps_global_dict = {}
+
+def _trace_freq(f):
+    return _band_gaps_global_dict['trace_callback'](f)
+
+def trace_freqs(trace_callback, log_freqs, pool=None):
+    """
+    Call `trace_callback` for all frequencies in `log_freqs`. If `pool` is
+    given, the frequencies are traced in parallel in chunks distributed among
+    the pool processes. In that case, `trace_callback` has to be stored in the
+    global dict before the pool creation, see :func:`detect_band_gaps()`.
+
+    Returns
+    -------
+    log_mevp : list of lists
+        The lists of `trace_callback()` outputs, one for each of its return
+        values.
+    """
+    if pool is None:
+        out = [trace_callback(f) for f in log_freqs]
+
+    else:
+        out = pool.map(_trace_freq, log_freqs)
+
+    log_mevp = [list(data) for data in zip(*out)]
+    return log_mevp
+
 def describe_gaps(gaps):
     kinds = []
     for ii, gap in enumerate(gaps):
@@ -520,12 +607,40 @@ def compute_cat_dim_dim(coef, iw_dir):
 class SimpleEVP(CorrMiniApp):
     """
     Simple eigenvalue problem.
+
+    By default, all eigenpairs are computed by a dense eigensolver. If the
+    'n_eigs' option is given, only the `n_eigs` eigenpairs are computed by
+    a sparse eigensolver, without converting the matrices to dense arrays.
+    The default sparse eigensolver is the shift-invert Lanczos method of
+    :func:`scipy.sparse.linalg.eigsh()` with the zero shift, i.e. the
+    smallest eigenvalues are computed and the shifted matrix is factorized
+    only once. The 'eigensolver' option can be either the eigensolver kind,
+    or a dictionary with the eigensolver configuration, for example::
+
+        'eigensolver' : {'kind' : 'eig.scipy', 'method' : 'eigsh',
+                         'which' : 'LM', 'sigma' : 1e8},
+
+    Note that an explicitly given dense eigensolver, e.g. 'eig.sgscipy',
+    computes all eigenpairs even if 'n_eigs' is given. The partial spectrum
+    has to cover the eigenvalue or frequency range of :class:`BandGaps`,
+    which raises an error otherwise.
     """
 
     def process_options(self):
         get = self.options.get
 
-        return Struct(eigensolver=get('eigensolver', 'eig.sgscipy'),
+        n_eigs = get('n_eigs', None)
+        if n_eigs is None:
+            eigensolver = get('eigensolver', 'eig.sgscipy')
+
+        else:
+            eigensolver = get('eigensolver', {'kind' : 'eig.scipy',
+                                              'method' : 'eigsh',
+                                              'which' : 'LM',
+                                              'sigma' : 0.0})
+
+        return Struct(eigensolver=eigensolver,
+                      n_eigs=n_eigs,
                       elasticity_contrast=get('elasticity_contrast', 1.0),
                       scale_epsilon=get('scale_epsilon', 1.0),
                       save_eig_vectors=get('save_eig_vectors', (0, 0)))
@@ -547,13 +662,27 @@ class SimpleEVP(CorrMiniApp):
         output('computing resonance frequencies...')
         tt = [0]
 
-        if isinstance(mtx_a, sc.sparse.spmatrix):
-            mtx_a = mtx_a.toarray()
-        if isinstance(mtx_m, sc.sparse.spmatrix):
-            mtx_m = mtx_m.toarray()
+        if isinstance(opts.eigensolver, dict):
+            solver_conf = opts.eigensolver.copy()
+            solver_kind = solver_conf.pop('kind')
 
-        eigs, mtx_s_phi = eig(mtx_a, mtx_m, return_time=tt,
-                              solver_kind=opts.eigensolver)
+        else:
+            solver_conf = {}
+            solver_kind = opts.eigensolver
+
+        # The sparse eigensolvers require n_eigs < n_dof - 1.
+        n_eigs = opts.n_eigs
+        if (n_eigs is not None) and (n_eigs >= (mtx_a.shape[0] - 1)):
+            n_eigs = None
+
+        if n_eigs is None:
+            if sc.sparse.issparse(mtx_a):
+                mtx_a = mtx_a.toarray()
+            if sc.sparse.issparse(mtx_m):
+                mtx_m = mtx_m.toarray()
+
+        eigs, mtx_s_phi = eig(mtx_a, mtx_m, n_eigs=n_eigs, return_time=tt,
+                              solver_kind=solver_kind, **solver_conf)
         eigs[eigs<0.0] = 0.0
         output('...done in %.2f s' % tt[0])
         output('original eigenfrequencies:')
@@ -576,7 +705,8 @@ class SimpleEVP(CorrMiniApp):
         self.save(eigs, mtx_phi, problem)
 
         evp = Struct(name='evp', eigs=eigs, eigs_rescaled=eigs_rescaled,
-                     eig_vectors=eig_vectors)
+                     eig_vectors=eig_vectors,
+                     is_partial=n_eigs is not None)
 
         return evp
 
@@ -629,24 +759,56 @@ class SimpleEVP(CorrMiniApp):
 class SchurEVP(SimpleEVP):
     """
     Schur complement eigenvalue problem.
+
+    The equations have to define the blocks 'K', 'B', 'D' and 'M', see
+    :func:`Equations.eval_tangent_matrices()
+    <sfepy.discrete.equations.Equations.eval_tangent_matrices()>`. The
+    'schur' option is a dictionary with the 'primary_var' and
+    'eliminated_var' keys.
     """
 
+    def process_options(self):
+        options = SimpleEVP.process_options(self)
+        get = dict_to_struct(self.options).get
+
+        return options + Struct(schur=get('schur', None,
+                                          'missing "schur" in options!'))
+
     def prepare_matrices(self, problem):
         """
         A = K + B^T D^{-1} B
         """
         equations = problem.equations
-        mtx = equations.eval_tangent_matrices(None, problem.mtx_a,
+        variables = problem.set_default_state()
+        mtx = equations.eval_tangent_matrices(variables(), problem.mtx_a,
                                               by_blocks=True)
 
         ls = Solver.any_from_conf(problem.ls_conf
                                   + Struct(use_presolve=True), mtx=mtx['D'])
 
-        mtx_b, mtx_m = mtx['B'], mtx['M']
-        mtx_dib = nm.empty(mtx_b.shape, dtype=mtx_b.dtype)
-        for ic in range(mtx_b.shape[1]):
-            mtx_dib[:,ic] = ls(mtx_b[:,ic].toarray().squeeze())
-        mtx_a = mtx['K'] + mtx_b.T * mtx_dib
+        mtx_b, mtx_m = mtx['B'].tocsc(), mtx['M']
+
+        # Solve only for the nonzero columns of B. The columns of D^{-1} B
+        # are dense in general, so D^{-1} B has at most n_row * n_c nonzeros
+        # and A has a dense n_c x n_c block, where n_c is the number of the
+        # nonzero columns of B, i.e. the number of the primary DOFs coupled
+        # with the eliminated ones. Exact zeros are dropped.
+        icols = nm.where(nm.diff(mtx_b.indptr) > 0)[0]
+        n_row = mtx_b.shape[0]
+        aux = nm.empty((n_row, len(icols)), dtype=mtx_b.dtype)
+        for ii, ic in enumerate(icols):
+            aux[:, ii] = ls(mtx_b[:, ic].toarray().squeeze())
+
+        counts = nm.zeros(mtx_b.shape[1], dtype=nm.int32)
+        counts[icols] = n_row
+        mtx_dib = sc.sparse.csc_matrix(
+            (aux.ravel('F'), nm.tile(nm.arange(n_row), len(icols)),
+             nm.r_[0, nm.cumsum(counts)]),
+            shape=mtx_b.shape,
+        )
+        mtx_dib.eliminate_zeros()
+        mtx_a = (mtx['K'] + mtx_b.T @ mtx_dib).tocsr()
+        mtx_a.eliminate_zeros()
 
         return mtx_a, mtx_m, mtx_dib
 
@@ -665,7 +827,7 @@ class SchurEVP(SimpleEVP):
         primary_var = schur['primary_var']
         eliminated_var = schur['eliminated_var']
 
-        mtx_s_phi_schur = - sc.dot(mtx_dib, mtx_s_phi)
+        mtx_s_phi_schur = - (mtx_dib @ mtx_s_phi)
         aux = nm.empty((variables.adi.n_dof_total,), dtype=nm.float64)
         setv = variables.set_vec_part
         for ii in range(n_eigs):
@@ -837,27 +999,31 @@ class AcousticMassTensor(MiniAppBase):
 
         self.eigs = evp.eigs[ema.valid]
         self.eigenmomenta = ema.eigenmomenta[ema.valid, :]
+        self.init_products(self.eigenmomenta, self.eigenmomenta)
 
         return self
 
+    def init_products(self, ema0, ema1):
+        """
+        Cache the frequency-independent products of eigenmomenta components
+        summed in :func:`evaluate()`.
+        """
+        n_c = ema0.shape[1]
+        self.ema_products = (ema0[:, :, None] * ema1[:, None, :]).reshape(
+            (-1, n_c * n_c)
+        )
+
     def evaluate(self, freq):
         ema = self.eigenmomenta
 
         n_c = ema.shape[1]
-        fmass = nm.zeros((n_c, n_c), dtype=nm.float64)
 
         num, denom = self.get_coefs(freq)
         de = 1.0 / denom
         if not nm.isfinite(de).all():
             raise ValueError('frequency %e too close to resonance!' % freq)
 
-        for ir in range(n_c):
-            for ic in range(n_c):
-                if ir <= ic:
-                    val = nm.sum(num * de * (ema[:, ir] * ema[:, ic]))
-                    fmass[ir, ic] += val
-                else:
-                    fmass[ir, ic] = fmass[ic, ir]
+        fmass = nm.dot(num * de, self.ema_products).reshape((n_c, n_c))
 
         eye = nm.eye(n_c, n_c, dtype=nm.float64)
         mtx_mass = (eye * self.dv_info.average_density) \
@@ -910,24 +1076,21 @@ class AppliedLoadTensor(AcousticMassTensor):
         self.eigs = evp.eigs[ema.valid]
         self.eigenmomenta = ema.eigenmomenta[ema.valid, :]
         self.ueigenmomenta = uema.eigenmomenta[uema.valid, :]
+        self.init_products(self.eigenmomenta, self.ueigenmomenta)
 
         return self
 
     def evaluate(self, freq):
-        ema, uema = self.eigenmomenta, self.ueigenmomenta
+        ema = self.eigenmomenta
 
         n_c = ema.shape[1]
-        fload = nm.zeros((n_c, n_c), dtype=nm.float64)
 
         num, denom = self.get_coefs(freq)
         de = 1.0 / denom
         if not nm.isfinite(de).all():
             raise ValueError('frequency %e too close to resonance!' % freq)
 
-        for ir in range(n_c):
-            for ic in range(n_c):
-                val = nm.sum(num * de * (ema[:, ir] * uema[:, ic]))
-                fload[ir, ic] += val
+        fload = nm.dot(num * de, self.ema_products).reshape((n_c, n_c))
 
         eye = nm.eye(n_c, n_c, dtype=nm.float64)
 
@@ -964,6 +1127,12 @@ class BandGaps(MiniAppBase):
         If not None, the band gaps log is to be saved under the given name.
     raw_log_save_name : str
         If not None, the raw band gaps log is to be saved under the given name.
+    n_workers : int
+        The number of processes for tracing the eigenvalues at the logged
+        frequencies.
+    warm_start : bool
+        If True, the zero finding starts from the logged frequencies
+        bracketing the zero instead of the whole frequency interval.
     """
 
     def process_options(self):
@@ -986,7 +1155,9 @@ class BandGaps(MiniAppBase):
                       zero_eps=get('zero_eps', 1e-8),
                       detect_fun=get('detect_fun', detect_band_gaps),
                       log_save_name=get('log_save_name', None),
-                      raw_log_save_name=get('raw_log_save_name', None))
+                      raw_log_save_name=get('raw_log_save_name', None),
+                      n_workers=get('n_workers', 1),
+                      warm_start=get('warm_start', False))
 
     def __call__(self, volume=None, problem=None, data=None):
         problem = get_default(problem, self.problem)
@@ -1000,8 +1171,9 @@ class BandGaps(MiniAppBase):
             mtx_b = None
 
         eigs = evp.eigs
+        is_partial = evp.get('is_partial', False)
 
-        self.fix_eig_range(eigs.shape[0])
+        self.fix_eig_range(eigs.shape[0], is_partial=is_partial)
 
         if opts.fixed_freq_range is not None:
             (freq_range_initial,
@@ -1011,6 +1183,13 @@ class BandGaps(MiniAppBase):
             opts.eig_range = slice(*opts.eig_range)
             freq_range_initial = nm.sqrt(eigs[opts.eig_range])
 
+        if is_partial and (opts.eig_range.stop >= eigs.shape[0]):
+            # The resonance following the range is needed for the margins.
+            raise ValueError('the %d computed eigenvalues do not cover the'
+                             ' eigenvalue or frequency range!'
+                             ' (increase n_eigs of the eigenvalue problem)'
+                             % eigs.shape[0])
+
         output('initial freq. range     : [%8.3f, %8.3f]'
                % tuple(freq_range_initial[[0, -1]]))
 
@@ -1049,8 +1228,10 @@ class BandGaps(MiniAppBase):
 
         return bg
 
-    def fix_eig_range(self, n_eigs):
-        eig_range = get_default(self.app_options.eig_range, (0, n_eigs))
+    def fix_eig_range(self, n_eigs, is_partial=False):
+        # The last eigenvalue of a partial spectrum only bounds the range.
+        n_max = n_eigs - 1 if is_partial else n_eigs
+        eig_range = get_default(self.app_options.eig_range, (0, n_max))
         if eig_range[-1] < 0:
             eig_range[-1] += n_eigs + 1
 
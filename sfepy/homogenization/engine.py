@@ -310,6 +310,10 @@ class HomogenizationWorkerMulti(HomogenizationWorker):
         """
         multiproc = multi.multiproc_proc
 
+        use_shared_memory = multiproc.use_shared_memory
+        if use_shared_memory:
+            multiproc.init_shared_memory()
+
         dependencies = multiproc.get_dict('dependecies', clear=True)
         save_names = multiproc.get_dict('save_names', clear=True)
         numdeps = multiproc.get_dict('numdeps', clear=True)
@@ -357,7 +361,9 @@ class HomogenizationWorkerMulti(HomogenizationWorker):
                     coef_info, save_names, dependencies, micro_states,
                     time_tag, micro_chunk_tab, str(ii + 1))
             w = multiproc.Process(target=self.calculate_req_multi,
-                                  args=args)
+                                  args=args,
+                                  kwargs={'use_shared_memory'
+                                          : use_shared_memory})
             w.start()
             workers.append(w)
 
@@ -365,6 +371,10 @@ class HomogenizationWorkerMulti(HomogenizationWorker):
         for w in workers:
             w.join()
 
+        if use_shared_memory:
+            dependencies = {key : multiproc.get_shared(val, unlink=True)
+                            for key, val in dependencies.items()}
+
         if micro_states is not None:
             dependencies = self.dechunk_reqs_coefs(dependencies,
                                                    len(micro_chunk_tab))
@@ -375,7 +385,8 @@ class HomogenizationWorkerMulti(HomogenizationWorker):
     def calculate_req_multi(tasks, lock, remaining, numdeps, inverse_deps,
                             problem, opts, post_process_hook,
                             req_info, coef_info, save_names, dependencies,
-                            micro_states, time_tag, chunk_tab, proc_id):
+                            micro_states, time_tag, chunk_tab, proc_id,
+                            use_shared_memory=False):
         """Calculate a requirement in parallel.
 
         Parameters
@@ -392,19 +403,41 @@ class HomogenizationWorkerMulti(HomogenizationWorker):
         inverse_deps : dict
             The inverse dependencies - which requirements depend
             on a given one.
+        use_shared_memory : bool
+            If True, the values in `dependencies` are shared memory
+            descriptors, see :func:`put_shared()
+            <sfepy.base.multiproc_proc.put_shared()>`, instead of the
+            values themselves.
 
         For the definition of other parameters see 'calculate_req'.
         """
+        if use_shared_memory:
+            from sfepy.base.multiproc_proc import get_shared, put_shared
+
         while remaining.value > 0:
             name = tasks.get()
 
             if name is None:
                 continue
 
+            if use_shared_memory:
+                # Get only the direct dependencies, see calculate_req().
+                if name.startswith('c.'):
+                    reqs = coef_info[name[2:]].get('requires', [])
+                else:
+                    reqs = req_info[name].get('requires', [])
+                deps = {req : get_shared(dependencies[req]) for req in reqs}
+
+            else:
+                deps = dependencies
+
             save_names_loc = {}
             val = HomogenizationWorker.calculate_req(problem, opts,
                 post_process_hook, name, req_info, coef_info, save_names_loc,
-                dependencies, micro_states, time_tag, chunk_tab, proc_id)
+                deps, micro_states, time_tag, chunk_tab, proc_id)
+
+            if use_shared_memory:
+                val = put_shared(val)
 
             lock.acquire()
             dependencies[name] = val
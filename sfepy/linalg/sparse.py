@@ -1,5 +1,7 @@
 """Some sparse matrix utilities missing in scipy."""
 from __future__ import absolute_import
+from itertools import count
+
 import numpy as nm
 import scipy.sparse as sp
 
@@ -246,3 +248,46 @@ def infinity_norm(mtx):
         norm = nm.dot(nm.abs(mtx), ones).max()
 
     return norm
+
+_matrix_versions = count(1)
+
+def set_matrix_version(mtx):
+    """
+    Stamp a sparse matrix with a new unique version number.
+
+    The version should be updated whenever the matrix values are changed in
+    place, so that the linear solvers can detect the change without hashing
+    the matrix arrays, see :func:`get_matrix_version()`.
+
+    Parameters
+    ----------
+    mtx : spmatrix
+        The sparse matrix.
+
+    Returns
+    -------
+    version : int
+        The new version of the matrix.
+    """
+    version = next(_matrix_versions)
+    mtx.sfepy_version = version
+
+    return version
+
+def get_matrix_version(mtx):
+    """
+    Get the version number of a sparse matrix set by
+    :func:`set_matrix_version()`.
+
+    Parameters
+    ----------
+    mtx : spmatrix
+        The sparse matrix.
+
+    Returns
+    -------
+    version : int or None
+        The matrix version or None, if the matrix has not been stamped. New
+        matrices created by operations on a stamped matrix are not stamped.
+    """
+    return getattr(mtx, 'sfepy_version', None)
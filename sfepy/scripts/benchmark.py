@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Run SfePy benchmarks and compare their results between git commits.
+
+The benchmark results (times and peak memory) are appended to a history
+file, labeled by the git commit of the sources.
+
+Examples
+--------
+
+Run all benchmarks and store the results in the default history file::
+
+  sfepy-benchmark run
+
+Run only the assembling benchmarks, for the smallest parameters::
+
+  sfepy-benchmark run --select=bench_assembling --quick
+
+Compare the results of two commits::
+
+  sfepy-benchmark compare <commit> HEAD
+"""
+import sys
+sys.path.append('.')
+from argparse import ArgumentParser, RawDescriptionHelpFormatter
+
+helps = {
+    'history' : 'the benchmark history file [default: %(default)s]',
+    'select' : 'run only benchmarks whose names contain the given string',
+    'quick' : 'run the benchmarks only for the first value of each parameter',
+    'repeat' : 'the number of timing repeats [default: %(default)s]',
+    'number' : 'the number of calls in each timing repeat'
+    ' [default: %(default)s]',
+    'list' : 'list the benchmarks and exit',
+    'commits' : 'the two commits to compare (the git commit hashes or their'
+    ' prefixes, "HEAD" stands for the current commit)',
+    'threshold' : 'the relative change considered significant'
+    ' [default: %(default)s]',
+    'key' : 'the compared quantity [default: %(default)s]',
+}
+
+def main():
+    parser = ArgumentParser(description=__doc__,
+                            formatter_class=RawDescriptionHelpFormatter)
+    parser.add_argument('--version', action='version', version='%(prog)s')
+    parser.add_argument('--history', metavar='filename',
+                        action='store', dest='history',
+                        default='output/benchmarks/history.jsonl',
+                        help=helps['history'])
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run = subparsers.add_parser('run')
+    run.add_argument('-s', '--select', metavar='str',
+                     action='store', dest='select',
+                     default=None, help=helps['select'])
+    run.add_argument('--quick',
+                     action='store_true', dest='quick',
+                     default=False, help=helps['quick'])
+    run.add_argument('-r', '--repeat', metavar='int', type=int,
+                     action='store', dest='repeat',
+                     default=3, help=helps['repeat'])
+    run.add_argument('-n', '--number', metavar='int', type=int,
+                     action='store', dest='number',
+                     default=1, help=helps['number'])
+    run.add_argument('-l', '--list',
+                     action='store_true', dest='list',
+                     default=False, help=helps['list'])
+
+    compare = subparsers.add_parser('compare')
+    compare.add_argument('commits', nargs=2, help=helps['commits'])
+    compare.add_argument('-t', '--threshold', metavar='float', type=float,
+                         action='store', dest='threshold',
+                         default=0.1, help=helps['threshold'])
+    compare.add_argument('-k', '--key',
+                         action='store', dest='key',
+                         choices=['time_min', 'time_median', 'peakmem'],
+                         default='time_min', help=helps['key'])
+    options = parser.parse_args()
+
+    from sfepy.base.base import output
+    import sfepy.benchmarks.runner as br
+
+    if options.command == 'run':
+        cases = br.collect_benchmarks(select=options.select)
+        if options.list:
+            for name, cls, method_name in cases:
+                output(name)
+            return
+
+        records = br.run_benchmarks(cases, repeat=options.repeat,
+                                    number=options.number,
+                                    quick=options.quick)
+        br.save_history(options.history, records)
+        output('results saved to:', options.history)
+
+    else:
+        records = br.load_history(options.history)
+        head = br.get_commit_info()['commit']
+        commits = [head if commit == 'HEAD' else commit
+                   for commit in options.commits]
+        rows = br.compare_history(records, commits[0], commits[1],
+                                  threshold=options.threshold,
+                                  key=options.key)
+        if not len(rows):
+            output('no common benchmark results of %s and %s!'
+                   % tuple(options.commits))
+
+        else:
+            br.report_comparison(rows)
+
+if __name__ == '__main__':
+    main()
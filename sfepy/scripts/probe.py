@@ -17,20 +17,28 @@ keys, pointing to proper functions accessible from the input file scope.
 For each probe returned by `gen_probes()` a data plot figure and a text
 file with the data plotted are saved, see the options below.
 
+With the --all-steps option, all time steps stored in the results file are
+probed in a single pass, without calling the 'probe_hook' function. The data
+names and the corresponding variable names are given by the optional
+'probe_variables' dict in the input file options, otherwise --only-names are
+used as both the data and variable names. For each probe, a HDF5 file with
+the probed data of all time steps is saved.
+
 Generation options
 ------------------
--o, --auto-dir, --same-dir, -f, --only-names, -s
+-o, --auto-dir, --same-dir, -f, --only-names, -s, --all-steps
 
 Postprocessing mode
 -------------------
 sfepy-probe [postprocessing options] <probe file> <figure file>
 
-Read a previously probed data from the probe text file, re-plot them,
-and integrate them along the probe.
+Read a previously probed data from the probe text or HDF5 file, re-plot
+them, and integrate them along the probe. For HDF5 files, the time step
+given by -s is used.
 
 Postprocessing options
 ----------------------
---postprocess, --radial, --only-names
+--postprocess, --radial, --only-names, -s
 
 Notes
 -----
@@ -51,7 +59,8 @@ from sfepy.base.ioutils import edit_filename
 from sfepy.base.conf import ProblemConf, get_standard_keywords
 from sfepy.discrete import Problem
 from sfepy.discrete.fem import MeshIO
-from sfepy.discrete.probes import write_results, read_results
+from sfepy.discrete.probes import (write_results, read_results,
+                                   write_results_hdf5, probe_time_history)
 import six
 
 helps = {
@@ -71,6 +80,9 @@ helps = {
     'probe only named data',
     'step' :
     'probe the given time step',
+    'all_steps' :
+    'probe all time steps in a single pass and save the results into HDF5'
+    ' files',
     'close_limit' :
     'maximum limit distance of a point from the closest element allowed'
     ' for extrapolation. [default: %(default)s]',
@@ -98,19 +110,20 @@ def generate_probes(filename_input, filename_results, options,
 
     output('results in: %s' % filename_results)
 
-    io = MeshIO.any_from_filename(filename_results)
-    step = options.step if options.step >= 0 else io.read_last_step()
-    all_data = io.read_data(step)
-    output('loaded:', list(all_data.keys()))
-    output('from step:', step)
-
-    if options.only_names is None:
-        data = all_data
-    else:
-        data = {}
-        for key, val in six.iteritems(all_data):
-            if key in options.only_names:
-                data[key] = val
+    if not options.all_steps:
+        io = MeshIO.any_from_filename(filename_results)
+        step = options.step if options.step >= 0 else io.read_last_step()
+        all_data = io.read_data(step)
+        output('loaded:', list(all_data.keys()))
+        output('from step:', step)
+
+        if options.only_names is None:
+            data = all_data
+        else:
+            data = {}
+            for key, val in six.iteritems(all_data):
+                if key in options.only_names:
+                    data[key] = val
 
     if problem is None:
         problem = Problem.from_conf(conf,
@@ -120,9 +133,6 @@ def generate_probes(filename_input, filename_results, options,
         gen_probes = conf.get_function(conf.options.gen_probes)
         probes, labels = gen_probes(problem)
 
-    if probe_hooks is None:
-        probe_hooks = {None : conf.get_function(conf.options.probe_hook)}
-
     if options.output_filename_trunk is None:
             options.output_filename_trunk = problem.ofn_trunk
 
@@ -134,6 +144,42 @@ def generate_probes(filename_input, filename_results, options,
 
     output_dir = os.path.dirname(filename_results)
 
+    if options.all_steps:
+        probe_variables = opts.get('probe_variables', None)
+        if probe_variables is None:
+            if options.only_names is None:
+                raise ValueError('--all-steps requires "probe_variables"'
+                                 ' option or --only-names!')
+            probe_variables = {name : name for name in options.only_names}
+
+        elif options.only_names is not None:
+            probe_variables = {key : val
+                               for key, val in probe_variables.items()
+                               if key in options.only_names}
+
+        variables = problem.create_variables(
+            list(set(probe_variables.values()))
+        )
+        variables = {key : variables[val]
+                     for key, val in six.iteritems(probe_variables)}
+
+        for probe in probes:
+            probe.set_options(close_limit=options.close_limit)
+
+        steps, times, results = probe_time_history(filename_results, probes,
+                                                   variables)
+        for ip, probe in enumerate(probes):
+            output(ip, probe.name)
+            filename = edit_filename(filename_template % ip, new_ext='.h5')
+            write_results_hdf5(filename, probe, results[ip], steps=steps,
+                               times=times)
+            output('data ->', os.path.normpath(filename))
+
+        return
+
+    if probe_hooks is None:
+        probe_hooks = {None : conf.get_function(conf.options.probe_hook)}
+
     for ip, probe in enumerate(probes):
         output(ip, probe.name)
 
@@ -197,8 +243,11 @@ def postprocess(filename_input, filename_results, options):
     """
     from matplotlib import pyplot as plt
 
+    step = options.step if options.step >= 0 else None
     header, results = read_results(filename_input,
-                                   only_names=options.only_names)
+                                   only_names=options.only_names, step=step)
+    if not len(results):
+        raise ValueError('no probe data in step %s!' % step)
     output(header)
 
     fig = plt.figure()
@@ -252,6 +301,9 @@ def main():
     parser.add_argument('-s', '--step', type=int, metavar='step',
                         action='store', dest='step',
                         default=0, help=helps['step'])
+    parser.add_argument('--all-steps',
+                        action='store_true', dest='all_steps',
+                        default=False, help=helps['all_steps'])
     parser.add_argument('-c', '--close-limit', type=float, metavar='distance',
                         action='store', dest='close_limit',
                         default=0.1, help=helps['close_limit'])
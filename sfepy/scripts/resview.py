@@ -224,7 +224,7 @@ def read_mesh(filenames, step=None, print_info=True, ret_n_steps=False,
 
         ftime, mesh = cache[key]
 
-    elif ext in ['.h5', '.h5x']:
+    elif ext in ['.h5', '.h5x', '.h5ts']:
         # Custom sfepy format.
         fname = filenames[0]
         if 'io' not in cache:
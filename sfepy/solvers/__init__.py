@@ -1,7 +1,8 @@
 from __future__ import absolute_import
 import os
 import sfepy
-from sfepy.base.base import load_classes, insert_static_method
+from sfepy.base.base import (LazyClassTable, insert_static_method,
+                             sfepy_config_dir)
 from .solvers import *
 from .eigen import eig
 from .auto_fallback import AutoFallbackSolver
@@ -10,12 +11,16 @@ solver_files = sfepy.get_paths('sfepy/solvers/*.py')
 remove = ['setup.py', 'solvers.py', 'ls_mumps_parallel.py']
 solver_files = [name for name in solver_files
                 if os.path.basename(name) not in remove]
-solver_table = load_classes(solver_files,
-                            [AutoFallbackSolver,
-                             LinearSolver, NonlinearSolver,
-                             TimeStepController, TimeSteppingSolver,
-                             EigenvalueSolver, QuadraticEVPSolver,
-                             OptimizationSolver], package_name='sfepy.solvers')
+# The solver modules are imported on the first use of their solvers.
+solver_table = LazyClassTable(solver_files,
+                              [AutoFallbackSolver,
+                               LinearSolver, NonlinearSolver,
+                               TimeStepController, TimeSteppingSolver,
+                               EigenvalueSolver, QuadraticEVPSolver,
+                               OptimizationSolver],
+                              package_name='sfepy.solvers',
+                              registry_filename=os.path.join(
+                                  sfepy_config_dir, 'solver_registry.json'))
 
 
 def register_solver(cls):
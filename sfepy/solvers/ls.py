@@ -1,4 +1,5 @@
 from __future__ import absolute_import
+from collections import OrderedDict
 import hashlib
 
 import numpy as nm
@@ -10,6 +11,7 @@ warnings.simplefilter('ignore', sps.SparseEfficiencyWarning)
 
 from sfepy.base.base import output, get_default, assert_, try_imports
 from sfepy.base.timing import Timer
+from sfepy.linalg.sparse import get_matrix_version
 from sfepy.solvers.solvers import LinearSolver
 
 def solve(mtx, rhs, solver_class=None, solver_conf=None):
@@ -46,6 +48,14 @@ def _get_cs_matrix_hash(mtx, chunk_size=100000):
     return digest
 
 def _is_new_matrix(mtx, mtx_digest, force_reuse=False):
+    """
+    Check whether `mtx` differs from the matrix with `mtx_digest`.
+
+    The matrix version stamped by the assembler is used as the digest, if
+    available, see :func:`set_matrix_version()
+    <sfepy.linalg.sparse.set_matrix_version()>`. Otherwise, the SHA1 hash of
+    the matrix arrays is computed.
+    """
     if not isinstance(mtx, sps.csr_matrix):
         return True, mtx_digest
 
@@ -54,12 +64,89 @@ def _is_new_matrix(mtx, mtx_digest, force_reuse=False):
 
     id0, digest0 = mtx_digest
     id1 = id(mtx)
-    digest1 = _get_cs_matrix_hash(mtx)
+    digest1 = get_matrix_version(mtx)
+    if digest1 is None:
+        digest1 = _get_cs_matrix_hash(mtx)
+
     if (id1 == id0) and (digest1 == digest0):
         return False, (id1, digest1)
 
     return True, (id1, digest1)
 
+class FactorizationCache(object):
+    """
+    LRU cache of matrix factorizations keyed by matrix digests.
+
+    The cache size is bounded by the number of factorizations and optionally
+    by their estimated memory.
+
+    Parameters
+    ----------
+    max_size : int
+        The maximum number of cached factorizations.
+    max_mem : float, optional
+        The maximum memory of cached factorizations in MB. The most recently
+        used factorization is kept regardless of its memory.
+    """
+
+    def __init__(self, max_size=1, max_mem=None):
+        self.max_size = max(max_size, 1)
+        self.max_mem = max_mem * 1024**2 if max_mem is not None else None
+        self.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def clear(self):
+        self.items = OrderedDict()
+        self.mem = 0
+
+    def get(self, key):
+        """
+        Return the factorization for `key` or None.
+        """
+        item = self.items.get(key)
+        if item is None:
+            return None
+
+        self.items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, factor, mem=0):
+        """
+        Store the factorization `factor` with the estimated memory `mem` in
+        bytes and remove the least recently used ones over the limits.
+        """
+        if key in self.items:
+            self.mem -= self.items.pop(key)[1]
+
+        self.items[key] = (factor, mem)
+        self.mem += mem
+
+        while len(self.items) > 1:
+            if ((len(self.items) <= self.max_size)
+                and ((self.max_mem is None) or (self.mem <= self.max_mem))):
+                break
+
+            self.mem -= self.items.popitem(last=False)[1][1]
+
+def _get_factor_memory(factor, mtx):
+    """
+    Estimate the memory of a factorization of `mtx` in bytes.
+
+    SuperLU factors report their number of nonzeros, otherwise the matrix
+    memory is used as a lower bound.
+    """
+    lu = getattr(factor, '__self__', factor)
+    nnz = getattr(lu, 'nnz', None)
+    if not isinstance(nnz, int):
+        nnz = mtx.nnz
+
+    return nnz * (mtx.dtype.itemsize + mtx.indices.dtype.itemsize)
+
 def standard_call(call):
     """
     Decorator handling argument preparation and timing for linear solvers.
@@ -135,6 +222,9 @@ def petsc_call(call):
 class ScipyDirect(LinearSolver):
     """
     Direct sparse solver from SciPy.
+
+    The right-hand side can be a 2D array with a right-hand side in each
+    column, to solve the system with several right-hand sides in one call.
     """
     name = 'ls.scipy_direct'
 
@@ -147,6 +237,12 @@ class ScipyDirect(LinearSolver):
          """If True, determine automatically a reused matrix using its
             SHA1 digest. If False, .clear() has to be called
             manually whenever the matrix changes - expert use only!"""),
+        ('factorization_cache_size', 'int', 1, False,
+         """The maximum number of cached factorizations of different
+            matrices. Used with `use_presolve` and `use_mtx_digest`."""),
+        ('factorization_cache_memory', 'float', None, False,
+         """If given, the maximum memory of the cached factorizations in
+            MB."""),
     ]
 
     def __init__(self, conf, method=None, **kwargs):
@@ -181,6 +277,7 @@ class ScipyDirect(LinearSolver):
         else:
             self.sls.use_solver(useUmfpack=False)
 
+        self.is_umfpack = is_umfpack
         self.clear()
 
     @standard_call
@@ -193,18 +290,59 @@ class ScipyDirect(LinearSolver):
             self.presolve(mtx, use_mtx_digest=conf.use_mtx_digest)
 
             # Matrix is already prefactorized.
-            return self.solve(rhs)
+            return self.back_substitute(rhs)
 
         else:
             return self.sls.spsolve(mtx, rhs)
 
+    @standard_call
+    def solve_many(self, rhs, x0=None, conf=None, eps_a=None, eps_r=None,
+                   i_max=None, mtx=None, status=None, **kwargs):
+        """
+        Solve the linear system with several right-hand sides given in the
+        columns of the 2D array `rhs` using a single matrix factorization.
+        """
+        if not conf.use_presolve:
+            self.clear()
+
+        self.presolve(mtx, use_mtx_digest=conf.use_mtx_digest)
+
+        return self.back_substitute(rhs)
+
+    def back_substitute(self, rhs):
+        """
+        Solve the system using the current factorization, see
+        :func:`ScipyDirect.presolve()`.
+        """
+        if (rhs.ndim == 2) and self.is_umfpack:
+            # The UMFPACK factorized solver accepts only vectors.
+            return nm.stack([self.solve(rhs[:, ii])
+                             for ii in range(rhs.shape[1])], axis=1)
+
+        return self.solve(rhs)
+
     def clear(self):
         if self.solve is not None:
             del self.solve
 
         self.solve = None
+        self.factors = FactorizationCache(
+            self.conf.factorization_cache_size,
+            self.conf.factorization_cache_memory,
+        )
+
+    def factorize(self, mtx):
+        """
+        Return the solve function using a factorization of `mtx`.
+        """
+        return self.sls.factorized(mtx.tocsc())
 
     def presolve(self, mtx, use_mtx_digest=True):
+        """
+        Prepare the matrix factorization. If `use_mtx_digest` is True, the
+        factorizations of previously seen matrices are taken from the
+        factorization cache.
+        """
         if use_mtx_digest:
             is_new, mtx_digest = _is_new_matrix(mtx, self.mtx_digest)
 
@@ -212,7 +350,15 @@ class ScipyDirect(LinearSolver):
             is_new, mtx_digest = False, None
 
         if is_new or (self.solve is None):
-            self.solve = self.sls.factorized(mtx.tocsc())
+            use_cache = use_mtx_digest and isinstance(mtx, sps.csr_matrix)
+            solve = self.factors.get(mtx_digest[1]) if use_cache else None
+            if solve is None:
+                solve = self.factorize(mtx)
+                if use_cache:
+                    self.factors.put(mtx_digest[1], solve,
+                                     _get_factor_memory(solve, mtx))
+
+            self.solve = solve
             self.mtx_digest = mtx_digest
 
 
@@ -229,6 +375,12 @@ class ScipySuperLU(ScipyDirect):
          """If True, determine automatically a reused matrix using its
             SHA1 digest. If False, .clear() has to be called
             manually whenever the matrix changes - expert use only!"""),
+        ('factorization_cache_size', 'int', 1, False,
+         """The maximum number of cached factorizations of different
+            matrices. Used with `use_presolve` and `use_mtx_digest`."""),
+        ('factorization_cache_memory', 'float', None, False,
+         """If given, the maximum memory of the cached factorizations in
+            MB."""),
     ]
 
     def __init__(self, conf, **kwargs):
@@ -248,6 +400,12 @@ class ScipyUmfpack(ScipyDirect):
          """If True, determine automatically a reused matrix using its
             SHA1 digest. If False, .clear() has to be called
             manually whenever the matrix changes - expert use only!"""),
+        ('factorization_cache_size', 'int', 1, False,
+         """The maximum number of cached factorizations of different
+            matrices. Used with `use_presolve` and `use_mtx_digest`."""),
+        ('factorization_cache_memory', 'float', None, False,
+         """If given, the maximum memory of the cached factorizations in
+            MB."""),
     ]
 
     def __init__(self, conf, **kwargs):
@@ -968,6 +1126,12 @@ class CholeskySolver(ScipyDirect):
          """If True, determine automatically a reused matrix using its
             SHA1 digest. If False, .clear() has to be called
             manually whenever the matrix changes - expert use only!"""),
+        ('factorization_cache_size', 'int', 1, False,
+         """The maximum number of cached factorizations of different
+            matrices. Used with `use_presolve` and `use_mtx_digest`."""),
+        ('factorization_cache_memory', 'float', None, False,
+         """If given, the maximum memory of the cached factorizations in
+            MB."""),
     ]
 
     def __init__(self, conf, **kwargs):
@@ -981,6 +1145,7 @@ class CholeskySolver(ScipyDirect):
         else:
             raise ValueError('cholesky not available!')
 
+        self.is_umfpack = False
         self.clear()
 
     @standard_call
@@ -993,16 +1158,8 @@ class CholeskySolver(ScipyDirect):
 
         return self.solve(rhs)
 
-    def presolve(self, mtx, use_mtx_digest=True):
-        if use_mtx_digest:
-            is_new, mtx_digest = _is_new_matrix(mtx, self.mtx_digest)
-
-        else:
-            is_new, mtx_digest = False, None
-
-        if is_new or (self.solve is None):
-            self.solve = self.sls(mtx.tocsc())
-            self.mtx_digest = mtx_digest
+    def factorize(self, mtx):
+        return self.sls(mtx.tocsc())
 
 
 class SchurMumps(MUMPSSolver):
@@ -1057,6 +1214,9 @@ class MultiProblem(ScipyDirect):
     def __init__(self, conf, context=None, **kwargs):
         ScipyDirect.__init__(self, conf, context=context, **kwargs)
 
+    # The subproblems are assembled in each call.
+    solve_many = LinearSolver.solve_many
+
     def init_subproblems(self, conf, **kwargs):
         from sfepy.discrete import Problem
         from sfepy.base.conf import ProblemConf, get_standard_keywords
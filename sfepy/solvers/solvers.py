@@ -267,6 +267,17 @@ class LinearSolver(Solver):
                  i_max=None, mtx=None, status=None, context=None, **kwargs):
         raise ValueError('called an abstract LinearSolver instance!')
 
+    def solve_many(self, rhs, mtx=None, **kwargs):
+        """
+        Solve the linear system with several right-hand sides given in the
+        columns of the 2D array `rhs`.
+
+        This implementation calls the solver for each column. Solvers that
+        can reuse a matrix factorization override it.
+        """
+        return nm.stack([self(rhs[:, ii], mtx=mtx, **kwargs)
+                         for ii in range(rhs.shape[1])], axis=1)
+
     def get_tolerance(self):
         """
         Return tuple `(eps_a, eps_r)` of absolute and relative tolerance
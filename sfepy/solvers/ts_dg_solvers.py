@@ -5,6 +5,7 @@ import numpy as nm
 import numpy.linalg as nla
 
 # sfepy imports
+from sfepy.discrete.dg.fields import DGField
 from sfepy.discrete.dg.limiters import ComposedLimiter, IdentityLimiter
 from sfepy.base.base import get_default, output
 from sfepy.solvers import TimeSteppingSolver
@@ -13,6 +14,75 @@ from sfepy.solvers.ts import TimeStepper
 from sfepy.solvers.ts_solvers import standard_ts_call
 
 
+def get_cell_mass_inverse(mtx, variables, active_only=True):
+    """
+    Get the inverse of the block-diagonal DG mass matrix `mtx` as a function
+    applying the inverted cell blocks to a vector.
+
+    Parameters
+    ----------
+    mtx : sparse matrix
+        The mass matrix, with the rows and columns in the active or full
+        numbering of `variables`, depending on `active_only`.
+    variables : Variables instance
+        The variables defining the DOF numbering. All state variables have to
+        be defined on DG fields.
+    active_only : bool
+        If True, `mtx` uses the reduced (active DOFs only) numbering.
+
+    Returns
+    -------
+    apply_inverse : callable
+        The function ``apply_inverse(vec)`` returning the product of the
+        inverse of `mtx` and `vec`.
+    """
+    n_eq = mtx.shape[0]
+    covered = nm.zeros(n_eq, dtype=bool)
+    norm = 0.0
+    blocks = []
+    for var in variables.iter_state(ordered=True):
+        field = var.field
+        if not isinstance(field, DGField):
+            raise ValueError('variable %s is not defined on a DG field!'
+                             % var.name)
+
+        dpn = var.n_components
+        dofs = (dpn * field.econn[:, :, None]
+                + nm.arange(dpn, dtype=nm.int32)).reshape((field.n_cell, -1))
+        if active_only:
+            eqs = var.eq_map.eq[dofs]
+            if (eqs < 0).any():
+                raise ValueError('variable %s has DOFs with EBCs or EPBCs!'
+                                 % var.name)
+            eqs = eqs + variables.adi.indx[var.name].start
+
+        else:
+            eqs = dofs + variables.di.indx[var.name].start
+
+        n_cell, n_c = eqs.shape
+        rows = nm.repeat(eqs, n_c, axis=1)
+        cols = nm.tile(eqs, (1, n_c))
+        aux = nm.asarray(mtx[rows.ravel(), cols.ravel()])
+        mtx_cells = aux.reshape((n_cell, n_c, n_c))
+
+        covered[eqs] = True
+        norm += nm.abs(mtx_cells).sum()
+        blocks.append((eqs, nla.inv(mtx_cells)))
+
+    if (not covered.all()
+        or not nm.isclose(norm, abs(mtx).sum(), rtol=1e-12, atol=0.0)):
+        raise ValueError('the matrix is not block-diagonal w.r.t. DG cells!')
+
+    def apply_inverse(vec):
+        out = nm.empty_like(vec)
+        for eqs, mtx_icells in blocks:
+            out[eqs] = nm.einsum('cij,cj->ci', mtx_icells, vec[eqs])
+
+        return out
+
+    return apply_inverse
+
+
 class DGMultiStageTSS(TimeSteppingSolver):
     """Explicit time stepping solver with multistage solve_step method"""
     __metaclass__ = SolverMeta
@@ -33,6 +103,13 @@ class DGMultiStageTSS(TimeSteppingSolver):
             solver is invoked also for the initial time."""),
         ('limiters', 'dictionary', None, None,
          "Limiters for DGFields, keys: field name, values: limiter class"),
+        ('cell_mass_inverse', 'bool', False, False,
+         """If True, the block-diagonal DG mass matrix is assembled and
+            inverted cell by cell only once, and each stage requires just
+            the residual evaluation and the multiplication by the inverted
+            cell blocks. Otherwise, the matrix is assembled and the linear
+            solver is called in each stage. The mass matrix has to be
+            constant in time."""),
     ]
 
     def __init__(self, conf, nls=None, context=None, **kwargs):
@@ -65,6 +142,42 @@ class DGMultiStageTSS(TimeSteppingSolver):
         self.post_stage_hook = ComposedLimiter(*zip(*applied_limiters),
                                                verbose=self.verbose)
 
+        self.mass_inverse = None
+
+    def solve_stage(self, nls, vec_x, stage, x0=None):
+        """
+        Solve the linear system with the mass matrix and the residual
+        evaluated in `vec_x` as the right-hand side.
+        """
+        vec_r = nls.fun(vec_x)
+
+        if self.conf.cell_mass_inverse:
+            if self.mass_inverse is None:
+                mtx_a = nls.fun_grad(vec_x)
+                variables = self.context.equations.variables
+                self.mass_inverse = get_cell_mass_inverse(
+                    mtx_a, variables, active_only=self.context.active_only,
+                )
+
+            return self.mass_inverse(vec_r)
+
+        lin_solver = nls.lin_solver
+        ls_eps_a, ls_eps_r = lin_solver.get_tolerance()
+        eps_a = get_default(ls_eps_a, 1.0)
+        eps_r = get_default(ls_eps_r, 1.0)
+        ls_status = {}
+
+        mtx_a = nls.fun_grad(vec_x)
+        vec_dx = lin_solver(vec_r, x0=x0,
+                            eps_a=eps_a, eps_r=eps_r, mtx=mtx_a,
+                            status=ls_status)
+
+        if self.verbose:
+            vec_e = mtx_a * vec_dx - vec_r
+            lerr = nla.norm(vec_e)
+            output(self.stage_format.format(stage, lerr))
+
+        return vec_dx
 
     def solve_step0(self, nls, vec0):
         res = nls.fun(vec0)
@@ -130,31 +243,9 @@ class EulerStepSolver(DGMultiStageTSS):
         if ts is None:
             raise ValueError("Provide TimeStepper to explicit Euler solver")
 
-        fun = nls.fun
-        fun_grad = nls.fun_grad
-        lin_solver = nls.lin_solver
-
-        ls_eps_a, ls_eps_r = lin_solver.get_tolerance()
-        eps_a = get_default(ls_eps_a, 1.0)
-        eps_r = get_default(ls_eps_r, 1.0)
-
         vec_x = vec_x0.copy()
 
-        vec_r = fun(vec_x)
-
-        mtx_a = fun_grad(vec_x)
-        ls_status = {}
-
-        vec_dx = lin_solver(vec_r, x0=vec_x,
-                            eps_a=eps_a, eps_r=eps_r, mtx=mtx_a,
-                            status=ls_status)
-
-        vec_e = mtx_a * vec_dx - vec_r
-        lerr = nla.norm(vec_e)
-        if self.verbose:
-            output(self.name + ' linear system sol error {}'.format(lerr))
-            output(self.name + ' mtx max {}, min {}, trace {}'
-                   .format(mtx_a.max(), mtx_a.min(), nm.sum(mtx_a.diagonal())))
+        vec_dx = self.solve_stage(nls, vec_x, 1, x0=vec_x)
 
         vec_x = vec_x - ts.dt * (vec_dx - vec_x)
         vec_x = self.post_stage_hook(vec_x)
@@ -191,65 +282,29 @@ class TVDRK3StepSolver(DGMultiStageTSS):
         if ts is None:
             raise ValueError("Provide TimeStepper to explicit Runge-Kutta solver")
 
-        fun = nls.fun
-        fun_grad = nls.fun_grad
-        lin_solver = nls.lin_solver
-
-        ls_eps_a, ls_eps_r = lin_solver.get_tolerance()
-        eps_a = get_default(ls_eps_a, 1.0)
-        eps_r = get_default(ls_eps_r, 1.0)
-        ls_status = {}
-
         # ----1st stage----
         vec_x = vec_x0.copy()
 
-        vec_r = fun(vec_x)
-        mtx_a = fun_grad(vec_x)
-        vec_dx = lin_solver(vec_r, x0=vec_x,
-                            eps_a=eps_a, eps_r=eps_r, mtx=mtx_a,
-                            status=ls_status)
+        vec_dx = self.solve_stage(nls, vec_x, 1, x0=vec_x)
 
         vec_x1 = vec_x - ts.dt * (vec_dx - vec_x)
 
-        if self.verbose:
-            vec_e = mtx_a * vec_dx - vec_r
-            lerr = nla.norm(vec_e)
-            output(self.stage_format.format(1, lerr))
-
         vec_x1 = self.post_stage_hook(vec_x1)
 
         # ----2nd stage----
-        vec_r = fun(vec_x1)
-        mtx_a = fun_grad(vec_x1)
-        vec_dx = lin_solver(vec_r, x0=vec_x1,
-                            eps_a=eps_a, eps_r=eps_r, mtx=mtx_a,
-                            status=ls_status)
+        vec_dx = self.solve_stage(nls, vec_x1, 2, x0=vec_x1)
 
         vec_x2 = (3 * vec_x + vec_x1 - ts.dt * (vec_dx - vec_x1)) / 4
 
-        if self.verbose:
-            vec_e = mtx_a * vec_dx - vec_r
-            lerr = nla.norm(vec_e)
-            output(self.stage_format.format(2, lerr))
-
         vec_x2 = self.post_stage_hook(vec_x2)
 
         # ----3rd stage-----
         ts.set_substep_time(1. / 2. * ts.dt)
         vec_x2 = prestep_fun(ts, vec_x2)
-        vec_r = fun(vec_x2)
-        mtx_a = fun_grad(vec_x2)
-        vec_dx = lin_solver(vec_r, x0=vec_x2,
-                            eps_a=eps_a, eps_r=eps_r, mtx=mtx_a,
-                            status=ls_status)
+        vec_dx = self.solve_stage(nls, vec_x2, 3, x0=vec_x2)
 
         vec_x3 = (vec_x + 2 * vec_x2 - 2 * ts.dt * (vec_dx - vec_x2)) / 3
 
-        if self.verbose:
-            vec_e = mtx_a * vec_dx - vec_r
-            lerr = nla.norm(vec_e)
-            output(self.stage_format.format(3, lerr))
-
         vec_x3 = self.post_stage_hook(vec_x3)
 
         return vec_x3
@@ -281,31 +336,13 @@ class RK4StepSolver(DGMultiStageTSS):
         if ts is None:
             raise ValueError("Provide TimeStepper to explicit Runge-Kutta solver")
 
-        fun = nls.fun
-        fun_grad = nls.fun_grad
-        lin_solver = nls.lin_solver
-
-        ls_eps_a, ls_eps_r = lin_solver.get_tolerance()
-        eps_a = get_default(ls_eps_a, 1.0)
-        eps_r = get_default(ls_eps_r, 1.0)
-        ls_status = {}
-
         dt = ts.dt
         vec_x = None
         vec_xs = []
 
         for stage, stage_update in enumerate(self.stage_updates):
             stage_vec = stage_update(vec_x0, vec_x, dt)
-            vec_r = fun(stage_vec)
-            mtx_a = fun_grad(stage_vec)
-            vec_dx = lin_solver(vec_r,  # x0=stage_vec,
-                                eps_a=eps_a, eps_r=eps_r, mtx=mtx_a,
-                                status=ls_status)
-
-            vec_e = mtx_a * vec_dx - vec_r
-            lerr = nla.norm(vec_e)
-            if self.verbose:
-                output(self.stage_format.format(stage, lerr))
+            vec_dx = self.solve_stage(nls, stage_vec, stage)
 
             vec_x = - vec_dx - stage_vec
 
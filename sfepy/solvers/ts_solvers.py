@@ -640,7 +640,9 @@ class ElastodynamicsBaseTS(TimeSteppingSolver):
 
         M = self.get_matrices(nls, vec, unpack)[0][iu, iu]
         a0 = nls.lin_solver(-r, mtx=M)
-        nls.lin_solver.clear()
+        if not nls.lin_solver.conf.get('use_mtx_digest', False):
+            # Otherwise the matrix change is detected automatically.
+            nls.lin_solver.clear()
         output_array_stats(a0, 'initial acceleration', verbose=self.verbose)
         return a0
 
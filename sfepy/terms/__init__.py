@@ -4,10 +4,14 @@ from . import terms
 from . import extmods
 from .terms import Terms, Term
 from .terms_th import THTerm, ETHTerm
-from sfepy.base.base import load_classes
+import os.path as op
+from sfepy.base.base import LazyClassTable, sfepy_config_dir
 
+# The term modules are imported on the first use of their terms.
 term_files = sfepy.get_paths('sfepy/terms/terms*.py')
-term_table = load_classes(term_files, [Term], ignore_errors=True)
+term_table = LazyClassTable(term_files, [Term], ignore_errors=True,
+                            registry_filename=op.join(sfepy_config_dir,
+                                                      'term_registry.json'))
 
 del sfepy
 
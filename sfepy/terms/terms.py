@@ -6,6 +6,7 @@ import numpy as nm
 from sfepy.base.base import (as_float_or_complex, get_default, assert_,
                              Container, Struct, basestr, goptions)
 from sfepy.base.compat import in1d
+from sfepy.base.timing import Timer
 
 # Used for imports in term files.
 from sfepy.terms.extmods import terms
@@ -138,6 +139,37 @@ def split_complex_args(args):
 
     return newargs
 
+def get_assembling_row_bounds(n_thread, n_row, indptr=None):
+    """
+    Split the rows of a global vector or matrix into `n_thread` contiguous
+    blocks for the thread-parallel assembling.
+
+    Parameters
+    ----------
+    n_thread : int
+        The number of threads.
+    n_row : int
+        The number of rows.
+    indptr : array, optional
+        If given, the CSR matrix row pointers used to balance the blocks by
+        the number of nonzeros instead of the number of rows.
+
+    Returns
+    -------
+    row_bounds : array
+        The block bounds of length `n_thread + 1`, so that the block `it`
+        consists of rows in [`row_bounds[it]`, `row_bounds[it + 1]`).
+    """
+    if indptr is None:
+        row_bounds = nm.linspace(0, n_row, n_thread + 1)
+
+    else:
+        nnzs = nm.linspace(0, indptr[-1], n_thread + 1)
+        row_bounds = nm.searchsorted(indptr, nnzs)
+        row_bounds[0], row_bounds[-1] = 0, n_row
+
+    return nm.ascontiguousarray(row_bounds, dtype=nm.int32)
+
 def create_arg_parser(allow_derivatives=False):
     from pyparsing import (Literal, Word, OneOrMore, delimitedList, Group,
                            StringStart, StringEnd, Combine, Optional, nums,
@@ -322,6 +354,8 @@ class Term(Struct):
     integration = 'cell'
     integration_order = None # None = any
     geometries = ['1_2', '2_3', '2_4', '3_4', '3_8']
+    # Can the term be evaluated in cell chunks, see evaluate_chunks()?
+    can_chunk = True
 
     @staticmethod
     def new(name_args, integral, region, **kwargs):
@@ -1334,6 +1368,15 @@ class Term(Struct):
             mat.time_update(None, [Struct(terms=[self])])
 
     def call_get_fargs(self, args, kwargs):
+        """
+        Call :func:`Term.get_fargs()`. If the global option
+        `'profile_terms'` is True, the elapsed time is added to
+        `self.fargs_time`.
+        """
+        profile = goptions['profile_terms']
+        if profile:
+            timer = Timer(start=True)
+
         try:
             fargs = self.get_fargs(*args, **kwargs)
 
@@ -1341,6 +1384,9 @@ class Term(Struct):
             terms.errclear()
             raise
 
+        if profile:
+            self.fargs_time = getattr(self, 'fargs_time', 0.0) + timer.stop()
+
         return fargs
 
     @staticmethod
@@ -1421,6 +1467,180 @@ class Term(Struct):
         else:
             return out, status
 
+    def get_weak_shape(self, diff_var=None):
+        """
+        Get the shape of the term values in the 'weak' evaluation mode.
+
+        Returns
+        -------
+        varr : FieldVariable instance
+            The virtual variable.
+        diff_var : str or None
+            The name of the variable or material parameter with respect to
+            which the term is differentiated, translated to the term argument
+            type for material parameters.
+        shape : tuple
+            The shape `(n_el, 1, n_row, n_col)`, where `n_col` is one in the
+            residual mode (`diff_var` is None).
+        """
+        varr = self.get_virtual_variable()
+        if varr is None:
+            raise ValueError('no virtual variable in weak mode! (in "%s")'
+                             % self.get_str())
+
+        if diff_var is not None:
+            tvariables = self.get_variables(as_list=False)
+            if diff_var in tvariables:
+                varc = tvariables[diff_var]
+
+            elif diff_var in self.get_material_names(part=1):
+                varc = None
+                ii = self.get_material_names(part=1).index(diff_var)
+                diff_var = self.ats[ii]
+
+            else:
+                raise ValueError(f'variable "{diff_var}" is neither in'
+                                 ' term variables nor in term.diff_info!')
+
+        n_elr, n_qpr, dim, n_enr, n_cr = self.get_data_shape(varr)
+        n_row = n_cr * n_enr
+
+        if diff_var is None:
+            shape = (n_elr, 1, n_row, 1)
+
+        else:
+            if varc is not None:
+                n_elc, n_qpc, dim, n_enc, n_cc = self.get_data_shape(varc)
+                n_col = n_cc * n_enc
+
+            else:
+                n_col = self.diff_info[diff_var]
+
+            shape = (n_elr, 1, n_row, n_col)
+
+        return varr, diff_var, shape
+
+    def get_chunk_fargs(self, fargs, n_el, ic0, ic1):
+        """
+        Get the term function arguments restricted to the cells `ic0` to `ic1
+        - 1` of the term region with `n_el` cells.
+
+        Only the declared cell data are sliced, i.e. the mappings with `n_el`
+        cells, the quadrature point arrays with the shape `(n_el, n_qp,
+        n_row, n_col)` and the integer cell connectivities with the shape
+        `(n_el, n_ep)`, where `n_qp` (or 1) and `n_ep` are given by the
+        mappings. Other arguments are passed unchanged. Return None if the
+        arguments cannot be restricted, e.g. when an argument of other kind
+        has `n_el` rows, as it is not known whether it holds cell data.
+        """
+        from sfepy.discrete.common.mappings import PyCMapping
+
+        if self.integration == 'facet_extra':
+            # The cell data are indexed by facet indices.
+            return None
+
+        maps = [arg for arg in fargs
+                if isinstance(arg, PyCMapping) and (arg.n_el == n_el)]
+        n_qps = set([1] + [arg.n_qp for arg in maps])
+        n_eps = set(arg.n_ep for arg in maps)
+
+        def _is_cell_data(arg):
+            if arg.ndim == 4:
+                return arg.shape[1] in n_qps
+
+            elif (arg.ndim == 2) and (arg.dtype.kind in 'iu'):
+                return arg.shape[1] in n_eps
+
+            return False
+
+        def _has_cells(arg):
+            if isinstance(arg, PyCMapping):
+                return arg.n_el == n_el
+
+            elif isinstance(arg, nm.ndarray):
+                return arg.ndim and (arg.shape[0] == n_el)
+
+            elif isinstance(arg, (tuple, list)):
+                return any(_has_cells(aux) for aux in arg)
+
+            return False
+
+        cfargs = []
+        for arg in fargs:
+            if _has_cells(arg):
+                if isinstance(arg, PyCMapping):
+                    arg = arg.get_chunk(ic0, ic1)
+
+                elif isinstance(arg, nm.ndarray) and _is_cell_data(arg):
+                    arg = arg[ic0:ic1]
+
+                else:
+                    return None
+
+            cfargs.append(arg)
+
+        return cfargs
+
+    def evaluate_chunks(self, chunk_size=None, diff_var=None,
+                        standalone=True, **kwargs):
+        """
+        Evaluate the term in the 'weak' mode in chunks of cells.
+
+        This is a generator yielding `(vals, iels, status)` for consecutive
+        cell chunks of at most `chunk_size` cells. All chunks are evaluated
+        into a single preallocated buffer, so the peak memory is bounded by
+        the chunk size and the yielded values have to be used (e.g.
+        assembled) before requesting the next chunk.
+
+        If `chunk_size` is None, the term has `can_chunk` False, the values
+        are not real or the term function arguments cannot be split, the term
+        is evaluated at once by :func:`Term.evaluate()`.
+        """
+        if standalone:
+            self.standalone_setup()
+
+        def _evaluate_all():
+            return self.evaluate(mode='weak', diff_var=diff_var,
+                                 standalone=False, ret_status=True, **kwargs)
+
+        if (chunk_size is None) or not self.can_chunk:
+            yield _evaluate_all()
+            return
+
+        varr, _diff_var, shape = self.get_weak_shape(diff_var)
+        n_el = shape[0]
+        if (n_el <= chunk_size) or (varr.dtype != nm.float64):
+            yield _evaluate_all()
+            return
+
+        kwargs = kwargs.copy()
+        term_mode = kwargs.pop('term_mode', None)
+
+        args = self.get_args(**kwargs)
+        self.check_shapes(*args)
+
+        _args = tuple(args) + ('weak', term_mode, _diff_var)
+        fargs = self.call_get_fargs(_args, kwargs)
+        if self.get_chunk_fargs(fargs, n_el, 0, 1) is None:
+            yield _evaluate_all()
+            return
+
+        iels = self.get_assembling_cells(shape)
+        buf = nm.empty((chunk_size,) + shape[1:], dtype=nm.float64)
+        for ic0 in range(0, n_el, chunk_size):
+            ic1 = min(ic0 + chunk_size, n_el)
+
+            cfargs = self.get_chunk_fargs(fargs, n_el, ic0, ic1)
+            vals = buf[:ic1 - ic0]
+            status = self.call_function(vals, cfargs)
+            vals *= self.sign
+
+            if goptions['check_term_finiteness']:
+                assert_(nm.isfinite(vals).all(),
+                        msg='"%s" term values not finite!' % self.get_str())
+
+            yield vals, iels[ic0:ic1], status
+
     def evaluate(self, mode='eval', diff_var=None,
                  standalone=True, ret_status=False, **kwargs):
         """
@@ -1488,44 +1708,11 @@ class Term(Struct):
             out = (val,)
 
         elif mode == 'weak':
-            varr = self.get_virtual_variable()
-            if varr is None:
-                raise ValueError('no virtual variable in weak mode! (in "%s")'
-                                 % self.get_str())
-
-            if diff_var is not None:
-                tvariables = self.get_variables(as_list=False)
-                if diff_var in tvariables:
-                    varc = tvariables[diff_var]
-
-                elif diff_var in self.get_material_names(part=1):
-                    varc = None
-                    ii = self.get_material_names(part=1).index(diff_var)
-                    diff_var = self.ats[ii]
-
-                else:
-                    raise ValueError(f'variable "{diff_var}" is neither in'
-                                     ' term variables nor in term.diff_info!')
+            varr, diff_var, shape = self.get_weak_shape(diff_var)
 
             args = self.get_args(**kwargs)
             self.check_shapes(*args)
 
-            n_elr, n_qpr, dim, n_enr, n_cr = self.get_data_shape(varr)
-            n_row = n_cr * n_enr
-
-            if diff_var is None:
-                shape = (n_elr, 1, n_row, 1)
-
-            else:
-                if varc is not None:
-                    n_elc, n_qpc, dim, n_enc, n_cc = self.get_data_shape(varc)
-                    n_col = n_cc * n_enc
-
-                else:
-                    n_col = self.diff_info[diff_var]
-
-                shape = (n_elr, 1, n_row, n_col)
-
             if shape[0] == 0:
                 vals = nm.zeros(shape, dtype=varr.dtype)
                 status = 0
@@ -1578,13 +1765,81 @@ class Term(Struct):
         else:
             return dct
 
+    def get_scatter_index(self, mtx, iels, rdc, cdc, diff_var,
+                          use_bsearch=False):
+        """
+        Get the positions of the cell matrix entries of the term in the data
+        array of the CSR matrix `mtx`.
+
+        The positions are computed only once and cached in `mtx`, as the
+        matrix graph does not change between repeated assemblings. The cache
+        entry is recomputed if the DOF connectivities or the assembling cells
+        change. The first cell and the number of cells are a part of the cache
+        key, so that the chunks of cells (see the 'assembly_chunk_size' global
+        option) have separate entries.
+        """
+        import sfepy.discrete.common.extmods.assemble as asm
+
+        cache = getattr(mtx, '_sfepy_scatter_indices', None)
+        if cache is None:
+            cache = mtx._sfepy_scatter_indices = {}
+
+        key = (self.get_virtual_name(), diff_var.name, self.region.name,
+               self.get_dof_conn_type(self.get_virtual_name()),
+               self.get_dof_conn_type(diff_var.name),
+               self.arg_trace_regions[diff_var.name],
+               len(iels), iels[0] if len(iels) else -1)
+
+        item = cache.get(key)
+        if ((item is None) or (item[0] is not rdc) or (item[1] is not cdc)
+            or not nm.array_equal(item[2], iels)):
+            index = asm.get_matrix_scatter_index(mtx.indptr, mtx.indices,
+                                                 iels, rdc, cdc, use_bsearch)
+            item = cache[key] = (rdc, cdc, iels.copy(), index)
+
+        return item[3]
+
+    def get_thread_cells(self, cache, iels, rdc, row_bounds):
+        """
+        Get the cells of the term assembled by each thread of the
+        thread-parallel assembling, see :func:`get_thread_cells()
+        <sfepy.discrete.common.extmods.assemble.get_thread_cells()>`.
+
+        The cells are computed only once and cached in the `cache`
+        dictionary. The cache entry is recomputed if the row DOF
+        connectivity, the row bounds or the assembling cells change. The
+        first cell and the number of cells are a part of the cache key, so
+        that the chunks of cells (see the 'assembly_chunk_size' global
+        option) have separate entries.
+        """
+        import sfepy.discrete.common.extmods.assemble as asm
+
+        vname = self.get_virtual_name()
+        key = (vname, self.region.name, self.get_dof_conn_type(vname),
+               len(iels), iels[0] if len(iels) else -1)
+
+        item = cache.get(key)
+        if ((item is None) or (item[0] is not rdc)
+            or not nm.array_equal(item[1], row_bounds)
+            or not nm.array_equal(item[2], iels)):
+            cell_ptr, cells = asm.get_thread_cells(iels, rdc, row_bounds)
+            item = cache[key] = (rdc, row_bounds.copy(), iels.copy(),
+                                 cell_ptr, cells)
+
+        return item[3], item[4]
+
     def assemble_to(self, asm_obj, val, iels, mode='vector', diff_var=None):
         """
         Assemble the results of term evaluation.
 
         For standard terms, assemble the values in `val` corresponding to
         elements/cells `iels` into a vector or a CSR sparse matrix `asm_obj`,
-        depending on `mode`.
+        depending on `mode`. If the global option `'assembly_threads'` is
+        greater than one, real values are assembled in parallel, with each
+        thread owning a contiguous block of the global rows. If the global
+        option `'assembly_scatter_index'` is True, matrices are assembled
+        using the cached positions of the cell matrix entries in the CSR data
+        array, see :func:`Term.get_scatter_index()`.
 
         For terms with a dynamic connectivity (e.g. contact terms), in
         `'matrix'` mode, return the extra COO sparse matrix instead. The extra
@@ -1594,6 +1849,8 @@ class Term(Struct):
         """
         import sfepy.discrete.common.extmods.assemble as asm
 
+        n_thread = goptions['assembly_threads']
+
         vvar = self.get_virtual_variable()
         rname = self.region.name
         extra = None
@@ -1614,7 +1871,19 @@ class Term(Struct):
                 dc = vvar.get_dof_conn(rname, rdct)
                 assert_(val.shape[2] == dc.shape[1])
 
-                assemble(asm_obj, val, iels, 1.0, dc)
+                if (n_thread > 1) and (asm_obj.dtype == nm.float64):
+                    row_bounds = get_assembling_row_bounds(n_thread,
+                                                           len(asm_obj))
+                    # Vectors are usually created anew, so that the thread
+                    # cells are cached in the term.
+                    cache = self.set_default('_thread_cells', {})
+                    cell_ptr, cells = self.get_thread_cells(cache, iels, dc,
+                                                            row_bounds)
+                    asm.assemble_vector_mt(asm_obj, val, iels, 1.0, dc,
+                                           row_bounds, cell_ptr, cells)
+
+                else:
+                    assemble(asm_obj, val, iels, 1.0, dc)
 
             else:
                 vals, rows, var = val
@@ -1672,16 +1941,46 @@ class Term(Struct):
                 if use_bsearch:
                     assert_(asm_obj.has_sorted_indices)
 
-                if asm_obj.dtype == nm.float64:
-                    assemble = (asm.assemble_matrix_b if use_bsearch else
-                                asm.assemble_matrix)
+                if goptions['assembly_scatter_index']:
+                    index = self.get_scatter_index(asm_obj, iels, rdc, cdc,
+                                                   svar, use_bsearch)
+                    if asm_obj.dtype == nm.float64:
+                        asm.assemble_matrix_indexed(tmd[0], index, val, sign)
+
+                    else:
+                        asm.assemble_matrix_indexed_complex(tmd[0], index, val,
+                                                            sign)
+
+                elif (n_thread > 1) and (asm_obj.dtype == nm.float64):
+                    row_bounds = getattr(asm_obj, '_sfepy_row_bounds', None)
+                    if (row_bounds is None) or (len(row_bounds) != n_thread + 1):
+                        row_bounds = get_assembling_row_bounds(
+                            n_thread, asm_obj.shape[0], asm_obj.indptr,
+                        )
+                        asm_obj._sfepy_row_bounds = row_bounds
+
+                    cache = getattr(asm_obj, '_sfepy_thread_cells', None)
+                    if cache is None:
+                        cache = asm_obj._sfepy_thread_cells = {}
+
+                    cell_ptr, cells = self.get_thread_cells(cache, iels, rdc,
+                                                            row_bounds)
+                    asm.assemble_matrix_mt(tmd[0], tmd[1], tmd[2], val, iels,
+                                           sign, rdc, cdc, row_bounds,
+                                           use_bsearch, cell_ptr, cells)
 
                 else:
-                    assert_(asm_obj.dtype == nm.complex128)
-                    assemble = (asm.assemble_matrix_complex_b if use_bsearch else
-                                asm.assemble_matrix_complex)
+                    if asm_obj.dtype == nm.float64:
+                        assemble = (asm.assemble_matrix_b if use_bsearch else
+                                    asm.assemble_matrix)
+
+                    else:
+                        assert_(asm_obj.dtype == nm.complex128)
+                        assemble = (asm.assemble_matrix_complex_b
+                                    if use_bsearch else
+                                    asm.assemble_matrix_complex)
 
-                assemble(tmd[0], tmd[1], tmd[2], val, iels, sign, rdc, cdc)
+                    assemble(tmd[0], tmd[1], tmd[2], val, iels, sign, rdc, cdc)
 
             else:
                 from scipy.sparse import coo_matrix
@@ -97,6 +97,7 @@ class ContactTerm(Term):
     arg_shapes = {'material' : '.: 1',
                   'virtual' : ('D', 'state'), 'state' : 'D'}
     integration = 'facet'
+    can_chunk = False
 
     def __init__(self, *args, **kwargs):
         Term.__init__(self, *args, **kwargs)
@@ -263,6 +264,7 @@ class ContactIPCTerm(Term):
                   'virtual' : ('D', 'state'), 'state' : 'D'}
     integration = 'facet'
     geometries = ['3_4', '3_8']
+    can_chunk = False
 
     def __init__(self, *args, **kwargs):
         Term.__init__(self, *args, **kwargs)
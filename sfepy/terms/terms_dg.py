@@ -37,6 +37,8 @@ class DGTerm(Term):
     eval_real methods to accommodate returning iels and vals.
     """
     poly_space_basis = "legendre"
+    can_chunk = False
+
     def call_function(self, out, fargs):
         try:
             out, status = self.function(out, *fargs)
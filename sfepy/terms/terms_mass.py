@@ -45,6 +45,8 @@ class MassTerm(ETermBase):
                   'material_beta' : '.: 1',
                   'virtual' : ('D', 'state'), 'state' : 'D'}
     modes = ('weak', 'eval')
+    # The lumped mass function uses DOFs of all cells.
+    can_chunk = False
 
     def get_function(self, rho, lumping, beta, virtual, state,
                      mode=None, term_mode=None, diff_var=None, **kwargs):
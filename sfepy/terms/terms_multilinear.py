@@ -133,7 +133,12 @@ def get_einsum_ops(eargs, ebuilder, expr_cache):
 
             elif val_name == 'ivol':
                 ag, _ = arg.term.get_mapping(arg.arg)
-                op = 1.0 / ag.volume[:, 0, 0, 0]
+                # Keep the inverse volumes while the mapping is valid.
+                key = (oname, 'ivol')
+                item = expr_cache.get(key)
+                if (item is None) or (item[0] is not ag):
+                    item = expr_cache[key] = (ag, 1.0 / ag.volume[:, 0, 0, 0])
+                op = item[1]
 
             elif val_name == 'I':
                 op = ebuilder.make_eye(arg.n_components)
@@ -614,15 +619,20 @@ class ExpressionBuilder(Struct):
                     new_subs = ''.join([subs[ii] for ii in inew])
                     if val_name == 'dofs':
                         key = (oname,) + tuple(inew)
+                        new_op = self.cache.get(key)
+                        if new_op is None:
+                            new_op = op.transpose(inew).copy()
+                            self.cache[key] = new_op
 
                     else:
-                        # id is unique only during object lifetime!
-                        key = (id(op),) + tuple(inew)
-
-                    new_op = self.cache.get(key)
-                    if new_op is None:
-                        new_op = op.transpose(inew).copy()
-                        self.cache[key] = new_op
+                        # Keep the transposed copy while the original
+                        # operand (e.g. mapping data) is the same object.
+                        key = ('layout', oname) + tuple(inew)
+                        item = self.cache.get(key)
+                        if (item is None) or (item[0] is not op):
+                            item = (op, op.transpose(inew).copy())
+                            self.cache[key] = item
+                        new_op = item[1]
 
                     new_subscripts[ia][io] = new_subs
                     new_operands[ia][io] = new_op
@@ -739,6 +749,9 @@ class ETermBase(Term):
         else:
             return out, status
 
+    def call_function(self, out, fargs):
+        return self.function(out, *fargs)
+
     def eval_real(self, shape, fargs, mode='eval', term_mode=None,
                   diff_var=None, **kwargs):
         out = nm.empty(shape, dtype=nm.float64)
@@ -776,6 +789,17 @@ class ETermBase(Term):
 
     def set_backend(self, backend='numpy', optimize=True, layout=None,
                     **kwargs):
+        """
+        Set the einsum backend and its options.
+
+        Besides the backend-specific `kwargs` (`eval_fun`, `memory_limit`,
+        `c_chunk_size`), `plan=True` selects the persistent evaluation plan
+        for the 'numpy' and 'opt_einsum' backends: the contraction of the
+        first expression is written directly into the output buffer instead
+        of a temporary array. In all cases, the contraction paths are
+        memoized by the operand shapes and the operands derived from the
+        mapping data are kept while the mapping is valid.
+        """
         if backend not in self.can_backend.keys():
             raise ValueError('backend {} not in {}!'
                              .format(self.backend, self.can_backend.keys()))
@@ -834,6 +858,7 @@ class ETermBase(Term):
             ebuilder=None,
             paths=None,
             path_infos=None,
+            path_cache={},
             eval_einsum=None,
         ))
 
@@ -934,7 +959,11 @@ class ETermBase(Term):
                                    optimize=paths[ia])
                     out[:] += aux.reshape(out.shape)
 
-            eval_fun = self.backend_kwargs.get('eval_fun', 'eval_einsum0')
+            eval_fun = self.backend_kwargs.get(
+                'eval_fun',
+                'eval_einsum4' if self.backend_kwargs.get('plan')
+                else 'eval_einsum0'
+            )
             eval_einsum = locals()[eval_fun]
 
         elif self.backend in ('numpy_loop', 'opt_einsum_loop'):
@@ -1157,23 +1186,57 @@ class ETermBase(Term):
             expressions = self.parsed_expressions
             out += [expressions, operands]
 
-        if einfo.paths is None:
+        # Contraction paths depend only on the expressions and operand
+        # shapes.
+        key = (expressions,
+               tuple(tuple(op.shape for op in ops) for ops in poperands))
+        paths = einfo.path_cache.get(key)
+        if paths is None:
             if self.verbosity > 1:
                 ebuilder.print_shapes(subscripts, operands)
 
-            einfo.paths, einfo.path_infos = self.get_paths(
+            paths = einfo.path_cache[key] = self.get_paths(
                 expressions,
                 poperands,
             )
             if self.verbosity > 2:
-                for path, path_info in zip(einfo.paths, einfo.path_infos):
+                for path, path_info in zip(*paths):
                     output('path:', path)
                     output(path_info)
 
+        einfo.paths, einfo.path_infos = paths
+
         out += [einfo.paths]
 
         return out
 
+    def get_chunk_fargs(self, fargs, n_el, ic0, ic1):
+        """
+        Slice the operands along the cell axis. Supported only for the
+        'numpy' and 'opt_einsum' backends.
+        """
+        if self.backend not in ('numpy', 'opt_einsum'):
+            return None
+
+        eval_einsum, eshape, expressions, operands, paths = fargs
+
+        coperands = []
+        for expression, ops in zip(expressions, operands):
+            subscripts = expression.split('->')[0].split(',')
+            cops = []
+            for subs, op in zip(subscripts, ops):
+                ic = subs.find('c')
+                if (ic >= 0) and (op.shape[ic] == n_el):
+                    op = op[(slice(None),) * ic + (slice(ic0, ic1),)]
+
+                cops.append(op)
+
+            coperands.append(cops)
+
+        ceshape = (ic1 - ic0,) + tuple(eshape[1:])
+
+        return [eval_einsum, ceshape, expressions, coperands, paths]
+
     def get_eval_shape(self, *args, **kwargs):
         mode, term_mode, diff_var = args[-3:]
         if diff_var is not None:
@@ -8,6 +8,7 @@ class THTerm(Term):
     Base class for terms depending on time history (fading memory
     terms).
     """
+    can_chunk = False
 
     def eval_real(self, shape, fargs, mode='eval', term_mode=None,
                   diff_var=None, **kwargs):
@@ -96,3 +96,173 @@ def test_assemble_matrix_complex(data):
     tst.report('expected:\n%s' % aux)
     ok = tst.compare_vectors(mtx, aux, label1='assembled', label2='expected')
     assert ok
+
+@pytest.mark.parametrize('n_thread', [1, 2, 3, 8])
+def test_assemble_mt(data, n_thread):
+    from sfepy.discrete.common.extmods.assemble import (assemble_vector_mt,
+                                                        assemble_matrix_mt,
+                                                        get_thread_cells)
+    from sfepy.terms.terms import get_assembling_row_bounds
+
+    row_bounds = get_assembling_row_bounds(n_thread, data.num)
+    cell_ptr, cells = get_thread_cells(data.iels, data.conn, row_bounds)
+
+    ok = True
+    for it in range(n_thread):
+        rows = data.conn[data.iels]
+        mask = (rows >= row_bounds[it]) & (rows < row_bounds[it + 1])
+        expected = nm.where(mask.any(axis=1))[0]
+        _ok = nm.array_equal(cells[cell_ptr[it]:cell_ptr[it + 1]], expected)
+        tst.report('thread %d cells: %s' % (it, _ok))
+        ok = ok and _ok
+
+    aux = nm.array([1, 1, 3, 2, 2], dtype=nm.float64)
+    for args in [(), (cell_ptr, cells)]:
+        vec = nm.zeros(data.num, dtype=nm.float64)
+        assemble_vector_mt(vec, data.vec_in_els, data.iels, 1, data.conn,
+                           row_bounds, *args)
+
+        _ok = tst.compare_vectors(vec, aux, label1='assembled',
+                                  label2='expected')
+        ok = ok and _ok
+
+    mtx = sps.csr_matrix(nm.ones((data.num, data.num),
+                                 dtype=nm.float64))
+    aux = nm.array([[1, 1, 1, 0, 0],
+                    [1, 1, 1, 0, 0],
+                    [1, 1, 3, 2, 2],
+                    [0, 0, 2, 2, 2],
+                    [0, 0, 2, 2, 2]], dtype=nm.float64)
+
+    row_bounds = get_assembling_row_bounds(n_thread, data.num, mtx.indptr)
+    cell_ptr, cells = get_thread_cells(data.iels, data.conn, row_bounds)
+    for use_bsearch, args in [(False, ()), (True, ()),
+                              (False, (cell_ptr, cells))]:
+        mtx.data[:] = 0.0
+        assemble_matrix_mt(mtx.data, mtx.indptr, mtx.indices, data.mtx_in_els,
+                           data.iels, 1, data.conn, data.conn, row_bounds,
+                           use_bsearch, *args)
+
+        _ok = tst.compare_vectors(mtx, aux, label1='assembled',
+                                  label2='expected')
+        ok = ok and _ok
+
+    mtx = sps.csr_matrix(aux)
+    with pytest.raises(IndexError):
+        assemble_matrix_mt(mtx.data, mtx.indptr, mtx.indices,
+                           2 * data.mtx_in_els, nm.array([1, 0], dtype=nm.int32),
+                           1, data.conn[::-1].copy(), data.conn, row_bounds)
+
+    assert ok
+
+def test_assemble_matrix_indexed(data):
+    from sfepy.discrete.common.extmods.assemble import (
+        get_matrix_scatter_index, assemble_matrix_indexed,
+        assemble_matrix_indexed_complex,
+    )
+
+    mtx = sps.csr_matrix(nm.ones((data.num, data.num),
+                                 dtype=nm.float64))
+    aux = nm.array([[1, 1, 1, 0, 0],
+                    [1, 1, 1, 0, 0],
+                    [1, 1, 3, 2, 2],
+                    [0, 0, 2, 2, 2],
+                    [0, 0, 2, 2, 2]], dtype=nm.float64)
+
+    ok = True
+    for use_bsearch in [False, True]:
+        index = get_matrix_scatter_index(mtx.indptr, mtx.indices, data.iels,
+                                         data.conn, data.conn, use_bsearch)
+        mtx.data[:] = 0.0
+        assemble_matrix_indexed(mtx.data, index, data.mtx_in_els, 1)
+
+        _ok = tst.compare_vectors(mtx, aux, label1='assembled',
+                                  label2='expected')
+        ok = ok and _ok
+
+    cmtx = mtx.astype(nm.complex128)
+    cmtx.data[:] = 0.0
+    assemble_matrix_indexed_complex(cmtx.data, index,
+                                    data.mtx_in_els.astype(nm.complex128),
+                                    2 - 3j)
+    _ok = tst.compare_vectors(cmtx, (2 - 3j) * aux, label1='assembled',
+                              label2='expected')
+    ok = ok and _ok
+
+    conn = data.conn.copy()
+    conn[0, 0] = -1
+    index = get_matrix_scatter_index(mtx.indptr, mtx.indices, data.iels,
+                                     conn, data.conn)
+    _ok = (index.reshape((2, 3, 3))[0, 0] == -1).all()
+    ok = ok and _ok
+
+    assert ok
+
+def test_create_csr_graph():
+    from sfepy.discrete.common.extmods.assemble import create_csr_graph
+
+    rng = nm.random.default_rng(12345)
+    ok = True
+    for ii in range(10):
+        n_row, n_col, n_cell = rng.integers(1, 30, 3)
+        rdc = rng.integers(-1, n_row, (n_cell, 4)).astype(nm.int32)
+        cdc = rng.integers(-1, n_col, (n_cell, 3)).astype(nm.int32)
+
+        prows, cols = create_csr_graph(rdc, cdc, n_row, n_col)
+        graph = sps.csr_matrix((nm.ones(len(cols), dtype=bool), cols, prows),
+                               shape=(n_row, n_col))
+
+        expected = nm.zeros((n_row, n_col), dtype=bool)
+        for rd, cd in zip(rdc, cdc):
+            expected[nm.ix_(rd[rd >= 0], cd[cd >= 0])] = True
+
+        _ok = (graph.toarray() == expected).all() and graph.has_sorted_indices
+        aux = graph.copy()
+        aux.sum_duplicates()
+        _ok = _ok and (aux.nnz == graph.nnz)
+        if not _ok:
+            tst.report('graph %d failed!' % ii)
+        ok = ok and _ok
+
+    assert ok
+
+def test_create_matrix_graph(output_dir):
+    import os
+    import os.path as op
+    import sfepy
+    from sfepy.discrete import Problem
+    from sfepy.base.conf import ProblemConf
+
+    filename = op.join(sfepy.base_dir,
+                       'examples/diffusion/poisson_periodic_boundary_condition.py')
+    conf = ProblemConf.from_file(filename)
+    pb = Problem.from_conf(conf)
+    pb.time_update()
+
+    cache_dir = op.join(output_dir, 'graphs')
+    eqs = pb.equations
+    graphs = [eqs.create_matrix_graph(method='coo'),
+              eqs.create_matrix_graph(method='native'),
+              eqs.create_matrix_graph(method='native', cache_dir=cache_dir),
+              eqs.create_matrix_graph(method='coo', cache_dir=cache_dir)]
+    filenames = os.listdir(cache_dir)
+    assert len(filenames) == 1
+
+    # A corrupted cache file is replaced.
+    filename = op.join(cache_dir, filenames[0])
+    with open(filename, 'r+b') as fd:
+        fd.truncate(os.path.getsize(filename) // 2)
+    graphs.append(eqs.create_matrix_graph(method='native',
+                                          cache_dir=cache_dir))
+    graphs.append(eqs.create_matrix_graph(method='native',
+                                          cache_dir=cache_dir))
+    assert os.listdir(cache_dir) == filenames
+
+    ok = True
+    for graph in graphs[1:]:
+        _ok = ((graph.shape == graphs[0].shape)
+               and (graph.indptr == graphs[0].indptr).all()
+               and (graph.indices == graphs[0].indices).all())
+        ok = ok and _ok
+
+    assert ok
@@ -143,3 +143,101 @@ def test_parse_conf():
     assert_(parse('[[[]]]')==([[[[]]]],{}))
     assert_(parse('a,{},[],None,True,False,"False"') ==
                      (['a',{},[],None,True,False,"False"],{}))
+
+def test_lazy_class_table(output_dir):
+    import os.path as op
+    from sfepy.base.base import Struct, LazyClassTable, load_classes
+
+    filenames = []
+    for ii, names in enumerate([['a', 'b'], ['c']]):
+        filename = op.join(output_dir, 'lazy_classes%d.py' % ii)
+        with open(filename, 'w') as fd:
+            fd.write('from sfepy.base.base import Struct\n')
+            for name in names:
+                fd.write('class C%s(Struct):\n    name = %r\n' % (name, name))
+        filenames.append(filename)
+
+    registry_filename = op.join(output_dir, 'lazy_classes.json')
+    table = LazyClassTable(filenames, [Struct],
+                           registry_filename=registry_filename)
+    assert_(sorted(table) == ['a', 'b', 'c'])
+    assert_(table._loaded == set(filenames))
+    assert_(op.exists(registry_filename))
+
+    # The registry is reused, no module is imported.
+    table = LazyClassTable(filenames, [Struct],
+                           registry_filename=registry_filename)
+    assert_(sorted(table.keys()) == ['a', 'b', 'c'])
+    assert_(('c' in table) and ('d' not in table))
+    assert_(len(table._loaded) == 0)
+
+    assert_(table['a'].name == 'a')
+    assert_(table._loaded == set(filenames[:1]))
+    assert_(dict(table) == load_classes(filenames, [Struct]))
+
+    class Cd(Struct):
+        name = 'd'
+    table['d'] = Cd
+    assert_((len(table) == 4) and (table['d'] is Cd))
+
+    # Changed files invalidate the registry -> all modules are imported.
+    with open(filenames[1], 'a') as fd:
+        fd.write('# A comment.\n')
+
+    table = LazyClassTable(filenames, [Struct],
+                           registry_filename=registry_filename)
+    assert_(table._loaded == set(filenames))
+
+def test_lazy_class_table_registry(output_dir):
+    import os
+    import os.path as op
+    import importlib
+    from sfepy.base.base import Struct, LazyClassTable
+
+    dirname = op.join(output_dir, 'lazy_registry')
+    os.makedirs(dirname, exist_ok=True)
+
+    sources = [
+        ('lz_reexport', 'from lz_defs import Cx\n'),
+        ('lz_defs', 'from sfepy.base.base import Struct\n'
+         'class Cx(Struct):\n    name = "x"\n'),
+        ('lz_optional', 'import lz_dep\n'
+         'from sfepy.base.base import Struct\n'
+         'class Cy(Struct):\n    name = "y"\n'),
+    ]
+    filenames = []
+    for name, source in sources:
+        filename = op.join(dirname, name + '.py')
+        with open(filename, 'w') as fd:
+            fd.write(source)
+        filenames.append(filename)
+
+    registry_filename = op.join(dirname, 'registry.json')
+    table = LazyClassTable(filenames, [Struct], ignore_errors=True,
+                           registry_filename=registry_filename)
+    # A class is mapped to the file of its defining module.
+    assert_(table._registry == {'x' : filenames[1]})
+    assert_(table._failed == filenames[2:])
+    assert_('y' not in table)
+
+    # The failed file is retried, other modules are not imported.
+    table = LazyClassTable(filenames, [Struct], ignore_errors=True,
+                           registry_filename=registry_filename)
+    assert_(table._loaded == set(filenames[2:]))
+    assert_('y' not in table)
+
+    # The missing dependency is installed.
+    with open(op.join(dirname, 'lz_dep.py'), 'w') as fd:
+        fd.write('\n')
+    importlib.invalidate_caches()
+
+    table = LazyClassTable(filenames, [Struct], ignore_errors=True,
+                           registry_filename=registry_filename)
+    assert_(table._loaded == set(filenames[2:]))
+    assert_(table['y'].name == 'y')
+
+    table = LazyClassTable(filenames, [Struct], ignore_errors=True,
+                           registry_filename=registry_filename)
+    assert_(len(table._loaded) == 0)
+    assert_((table['x'].name == 'x') and (table['y'].name == 'y'))
+    assert_(table._loaded == set(filenames[1:]))
@@ -0,0 +1,42 @@
+import os.path as op
+
+import numpy as nm
+
+import sfepy.base.testing as tst
+
+def test_benchmarks(output_dir):
+    import sfepy.benchmarks.runner as br
+
+    cases = br.collect_benchmarks()
+    names = [case[0] for case in cases]
+    tst.report('collected benchmarks:', len(names))
+    for name in ['bench_assembling.MatrixGraph.time_create_matrix_graph',
+                 'bench_assembling.TermAssembling.time_tangent_matrix',
+                 'bench_io.MeshReading.time_from_file',
+                 'bench_solvers.LinearSolvers.time_solve']:
+        assert name in names
+
+    cases = br.collect_benchmarks(select='MatrixGraph')
+    records = br.run_benchmarks(cases, repeat=2, quick=True)
+    assert len(records) == 1
+    record = records[0]
+    assert record['params'] == {'dim' : 2, 'size' : 16, 'method' : 'native'}
+    assert record['time_min'] <= record['time_median']
+    assert record['peakmem'] > 0
+
+    filename = op.join(output_dir, 'benchmarks.jsonl')
+    br.save_history(filename, records, info={'commit' : 'aaaa'})
+    records[0]['time_min'] *= 2.0
+    br.save_history(filename, records, info={'commit' : 'bbbb'})
+
+    history = br.load_history(filename)
+    assert len(history) == 2
+
+    rows = br.compare_history(history, 'aa', 'bb')
+    assert len(rows) == 1
+    assert nm.isclose(rows[0].ratio, 2.0)
+    assert rows[0].flag == '+'
+
+    rows = br.compare_history(history, 'bb', 'aa', key='peakmem')
+    assert nm.isclose(rows[0].ratio, 1.0)
+    assert rows[0].flag == ''
@@ -255,3 +255,133 @@ def test_save_ebc(data, output_dir):
     pb.save_ebc(name + '_ebcs.vtk', ebcs=ebcs, default=-1, force=False)
 
     assert True
+
+def test_eq_map_cache(data):
+    from sfepy.base.base import Struct
+    from sfepy.discrete import Function, Functions
+    from sfepy.discrete.conditions import Conditions, EssentialBC, PeriodicBC
+    from sfepy.discrete.common.dof_info import EquationMap
+    from sfepy.discrete.fem.periodic import match_y_line
+
+    variables = data.variables
+    regions = data.problem.domain.regions
+
+    def get_ebc(ts, coors, **kwargs):
+        return ts.time * coors[:, 1]
+
+    functions = Functions([Function('match_y_line', match_y_line),
+                           Function('get_ebc', get_ebc)])
+
+    ebcs = Conditions([
+        EssentialBC('fix_u', regions['LeftFix'], {'u.all' : 0.5}),
+        EssentialBC('fix_p', regions['RightFix'], {'p.0' : 'get_ebc'}),
+        EssentialBC('fix_p2', regions['Left'], {'p.0' : 1.0},
+                    times=[(0.0, 0.5)]),
+    ])
+    epbcs = Conditions([
+        PeriodicBC('pbc', [regions['LeftStrip'], regions['RightStrip']],
+                   {'u.all' : 'u.all'}, match='match_y_line'),
+    ])
+
+    ok = True
+    for var in variables.iter_state():
+        var.eq_map_cache.clear()
+
+    # Count the evaluations of the p EBC DOFs in the regions.
+    field = variables['p'].field
+    calls = []
+    def set_dofs(*args, **kwargs):
+        calls.append(args[1].name)
+        return field.__class__.set_dofs(field, *args, **kwargs)
+
+    for time in [0.1, 0.2, 0.7, 0.8, 0.3]:
+        ts = Struct(time=time, step=0)
+        field.set_dofs = set_dofs
+        try:
+            variables.equation_mapping(ebcs, epbcs, ts, functions)
+
+        finally:
+            del field.set_dofs
+
+        for var in variables.iter_state():
+            ref = EquationMap('eq_map', var.dofs,
+                              variables.di.get_info(var.name))
+            bcs = variables.bc_of_vars.get(var.name)
+            ref.map_equations(bcs, var.field, ts, functions)
+
+            eq_map = var.eq_map
+            for key in ['eq', 'eqi', 'eq_ebc', 'val_ebc', 'master', 'slave']:
+                _ok = nm.array_equal(getattr(eq_map, key), getattr(ref, key))
+                if not _ok:
+                    tst.report('%s: %s: %s mismatch!' % (time, var.name, key))
+                ok = ok and _ok
+
+    # Two different sets of active BCs.
+    _ok = len(variables['p'].eq_map_cache) == 2
+    tst.report('number of cached p mappings:',
+               len(variables['p'].eq_map_cache))
+    ok = ok and _ok
+
+    # The cached mappings evaluate the EBC function in the cached DOF
+    # coordinates.
+    _ok = calls == ['RightFix', 'Left', 'RightFix']
+    tst.report('p EBC DOFs evaluated in regions:', calls)
+    ok = ok and _ok
+
+    assert ok
+
+def test_periodic_matching():
+    import sfepy.discrete.fem.periodic as per
+
+    rng = nm.random.default_rng(12345)
+    yz = nm.array([[y, z] for y in nm.linspace(0, 1, 30)
+                   for z in nm.linspace(0, 1, 20)])
+    n_nod = len(yz)
+
+    per.clear_cache()
+    size0 = per.periodic_cache_size
+    per.set_cache_size(2)
+
+    ok = True
+    try:
+        for ii in range(3):
+            # Boundaries with the same number of nodes but different
+            # coordinates.
+            coors1 = nm.c_[nm.zeros(n_nod), yz + ii]
+            perm = rng.permutation(n_nod)
+            coors2 = coors1[perm] + [1.0, 0.0, 0.0]
+
+            for get_saved in [True, True, False]:
+                i1, i2 = per.match_x_plane(coors1, coors2,
+                                           get_saved=get_saved)
+                _ok = nm.allclose(coors1[i1] + [1.0, 0.0, 0.0], coors2[i2],
+                                  rtol=0.0, atol=1e-14)
+                ok = ok and _ok
+
+            line1 = nm.c_[nm.zeros(30), nm.linspace(0, 1, 30) + ii]
+            line2 = line1[rng.permutation(30)] + [1.0, 0.0]
+            i1, i2 = per.match_y_line(line1, line2)
+            _ok = nm.allclose(line1[i1] + [1.0, 0.0], line2[i2],
+                              rtol=0.0, atol=1e-14)
+            ok = ok and _ok
+
+        _ok = len(per.periodic_cache) == 2
+        tst.report('number of cached matchings:', len(per.periodic_cache))
+        ok = ok and _ok
+
+        coors2[0, 1] += 0.1
+        try:
+            per.match_x_plane(coors1, coors2)
+
+        except ValueError:
+            pass
+
+        else:
+            tst.report('mismatch not detected!')
+            ok = False
+
+    finally:
+        per.set_cache_size(size0)
+        per.clear_cache()
+
+    assert ok
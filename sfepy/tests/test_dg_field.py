@@ -1,11 +1,17 @@
 import numpy as nm
 import numpy.testing as nmts
+import scipy.sparse as sps
+import pytest
 
 from sfepy.base.base import Struct
+from sfepy.discrete import (FieldVariable, Material, Integral, Equation,
+                            Equations, Problem)
 from sfepy.discrete.fem import FEDomain
 from sfepy.mesh.mesh_generators import gen_block_mesh
 from sfepy.discrete.dg.poly_spaces import get_n_el_nod
 from sfepy.discrete.dg.fields import DGField
+from sfepy.terms import Term
+from sfepy.solvers.ts_dg_solvers import get_cell_mass_inverse
 
 
 def prepare_dgfield(approx_order, mesh):
@@ -231,3 +237,39 @@ class TestDGField:
                     ]
         rnbr_idx = nm.array(rnbr_idx, dtype=nm.int32)
         nmts.assert_equal(rnbr_idx, nbr_idx)
+
+    def test_cell_mass_inverse(self):
+        mesh = gen_block_mesh((1, 1), (4, 4), (.5, .5))
+        field, regions = prepare_dgfield(2, mesh)
+
+        u = FieldVariable('u', 'unknown', field)
+        v = FieldVariable('v', 'test', field, primary_var_name='u')
+
+        def get_val(ts, coors, mode=None, **kwargs):
+            if mode == 'qp':
+                val = 1.0 + coors[:, :1] + coors[:, 1:]**2
+                return {'val' : val[:, :, None]}
+
+        # The variable coefficient results in full cell blocks.
+        m = Material('m', function=get_val)
+        integral = Integral('i', order=6)
+        term = Term.new('dw_dot(m.val, v, u)', integral, regions['omega'],
+                        m=m, v=v, u=u)
+        pb = Problem('mass', equations=Equations([Equation('mass', term)]))
+        pb.time_update()
+        pb.update_materials()
+
+        variables = pb.equations.variables
+        variables.init_state()
+        mtx = pb.equations.eval_tangent_matrices(
+            variables.get_state(), pb.equations.create_matrix_graph(),
+        )
+
+        apply_inverse = get_cell_mass_inverse(mtx, variables)
+        vec = nm.linspace(-1, 1, mtx.shape[0])
+        nmts.assert_allclose(apply_inverse(mtx @ vec), vec,
+                             rtol=0, atol=1e-12)
+
+        mtx2 = mtx + sps.eye(mtx.shape[0], k=field.n_el_nod)
+        with pytest.raises(ValueError):
+            get_cell_mass_inverse(mtx2, variables)
@@ -274,3 +274,62 @@ def test_basis_functions_delta(gels):
         ok = ok and _ok
 
     assert ok
+
+def test_mapping_cache():
+    import gc
+    import sfepy
+    from sfepy.discrete import Integral
+    from sfepy.discrete.fem import Mesh, FEDomain, Field
+    from sfepy.discrete.common.mappings import mapping_cache
+
+    mesh = Mesh.from_file('meshes/2d/square_quad.mesh',
+                          prefix_dir=sfepy.data_dir)
+    domain = FEDomain('domain', mesh)
+    omega = domain.create_region('Omega', 'all')
+    integral = Integral('i', order=2)
+
+    fu = Field.from_args('u', nm.float64, 2, omega, approx_order=1)
+    fp = Field.from_args('p', nm.float64, 1, omega, approx_order=1)
+    fq = Field.from_args('q', nm.float64, 1, omega, approx_order=2)
+
+    # Remove the mappings of the fields of other tests.
+    gc.collect()
+    stats0 = mapping_cache.get_stats()
+    gu, _ = fu.get_mapping(omega, integral, 'cell')
+    gp, _ = fp.get_mapping(omega, integral, 'cell')
+    gq, _ = fq.get_mapping(omega, integral, 'cell')
+
+    # The geometry is shared by all fields, the basis only by fields of the
+    # same order.
+    assert (gp.det is gu.det) and (gq.det is gu.det)
+    assert (gp.volume is gu.volume) and (gq.volume is gu.volume)
+    assert (gp.bfg is gu.bfg) and (gq.bfg is not gu.bfg)
+    assert gq.integral is integral
+    gq0, _ = fq.create_mapping(omega, integral, 'cell')
+    assert nm.allclose(gq.det, gq0.det, rtol=0, atol=1e-14)
+
+    assert fu.get_mapping(omega, integral, 'cell')[0] is gu
+    stats = mapping_cache.get_stats()
+    tst.report(stats)
+    assert (stats.n_hit - stats0.n_hit) == 1
+    assert (stats.n_miss - stats0.n_miss) == 3
+    assert stats.n_entry == (stats0.n_entry + 3)
+
+    # Deleting a field removes its private data.
+    mem0 = stats.mem
+    del fq, gq
+    gc.collect()
+    stats = mapping_cache.get_stats()
+    assert stats.n_entry == (stats0.n_entry + 2)
+    assert stats.mem < mem0
+
+    # The most recently used mapping is kept.
+    mapping_cache.shrink(max_mem=1e-6)
+    stats = mapping_cache.get_stats()
+    assert stats.n_entry == 1
+    assert list(fu.mappings.keys()) == [('Omega', 2, 'cell')]
+    assert len(fp.mappings) == 0
+
+    fu.clear_mappings()
+    fp.clear_mappings()
+    assert mapping_cache.get_stats().n_entry == 0
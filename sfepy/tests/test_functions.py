@@ -228,3 +228,83 @@ def test_region_functions(problem, output_dir):
 
     name = op.join(output_dir, 'test_region_functions.vtk')
     problem.save_regions_as_groups(name, ['Circle'])
+
+def test_material_dependencies(problem):
+    from sfepy.discrete import Material, Function
+    from sfepy.base.conf import transform_variables
+
+    calls = []
+    def get_pars(ts, coors, mode=None, **kwargs):
+        if mode == 'special':
+            calls.append(ts.step)
+            return {'step' : ts.step}
+
+    ts = problem.get_default_ts(step=0)
+    ts.set_from_data(0.0, 1.0, n_step=3)
+
+    mat = Material('md', function=Function('get_pars', get_pars))
+    for step in range(3):
+        ts.set_step(step)
+        mat.time_update(ts, None, mode='normal', problem=problem)
+    assert_(calls == [0, 1, 2])
+
+    calls[:] = []
+    mat = Material('md', function=Function('get_pars', get_pars,
+                                           dependencies=('coors',)))
+    for step in range(3):
+        ts.set_step(step)
+        mat.time_update(ts, None, mode='normal', problem=problem)
+    assert_(calls == [0])
+
+    coors = problem.get_mesh_coors().copy()
+    problem.set_mesh_coors(1.5 * coors)
+    mat.time_update(ts, None, mode='normal', problem=problem)
+    problem.set_mesh_coors(coors)
+    assert_(calls == [0, 2])
+
+    problem.set_mesh_coors(coors, actual=True)
+    mat.time_update(ts, None, mode='normal', problem=problem)
+    assert_(calls == [0, 2, 2])
+
+    calls[:] = []
+    variables = problem.equations.variables
+    if variables.vec is None:
+        variables.init_state()
+    mat = Material('md', function=get_pars, dependencies=('state',))
+    for ii in range(2):
+        mat.time_update(ts, problem.equations, mode='normal',
+                        problem=problem)
+    assert_(calls == [2])
+
+    variables.set_state(variables() + 1.0)
+    mat.time_update(ts, problem.equations, mode='normal', problem=problem)
+    variables.set_state(variables() - 1.0)
+    assert_(calls == [2, 2])
+
+    calls[:] = []
+    mat = Material('md', function=get_pars, dependencies=('time',))
+    for step in [0, 0, 1, 1, 2]:
+        ts.set_step(step)
+        mat.time_update(ts, None, mode='normal', problem=problem)
+    assert_(calls == [0, 1, 2])
+
+    with pytest.raises(ValueError):
+        Material('md', function=get_pars, dependencies=('space',))
+
+    materials = problem.get_materials()
+    materials.time_update(ts, problem.equations, mode='normal',
+                          problem=problem)
+    # Constant values are stored once per cell group.
+    mat3 = materials['mf3']
+    key = mat3.get_keys(region_name='Omega')[0]
+    assert_(mat3.get_data(key, 'a').shape[0] == 1)
+
+    pb = problem.copy()
+    pb.set_variables(transform_variables(problem.conf.variables2))
+    pb.set_equations(problem.conf.equations2)
+    materials = pb.get_materials()
+    materials.time_update(ts, pb.equations, mode='normal', problem=pb)
+    mat6 = materials['mf6']
+    for region_name in ['Circle', 'Rest']:
+        key = mat6.get_keys(region_name=region_name)[0]
+        assert_(mat6.get_data(key, 'a').shape[0] == 1)
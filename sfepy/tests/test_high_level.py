@@ -191,3 +191,299 @@ def test_solving(data, output_dir):
     ok = ok and _ok
 
     assert ok
+
+def test_assembling_options(data):
+    from sfepy.base.base import goptions
+    from sfepy.discrete import (FieldVariable, Material, Problem,
+                                Equation, Equations, Integral)
+    from sfepy.discrete.conditions import Conditions, EssentialBC
+    from sfepy.terms import Term
+    from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+    u = FieldVariable('u', 'unknown', data.field)
+    v = FieldVariable('v', 'test', data.field, primary_var_name='u')
+
+    m = Material('m', D=stiffness_from_lame(data.dim, 1.0, 1.0))
+    f = Material('f', val=[[0.02], [0.01]])
+
+    fix_u = EssentialBC('fix_u', data.gamma1, {'u.all' : 0.0})
+
+    integral = Integral('i', order=3)
+
+    t1 = Term.new('dw_lin_elastic(m.D, v, u)',
+                  integral, data.omega, m=m, v=v, u=u)
+    t2 = Term.new('dw_volume_lvf(f.val, v)', integral, data.omega, f=f, v=v)
+
+    eqs = Equations([Equation('balance', t1 + t2)])
+
+    pb = Problem('elasticity', equations=eqs)
+    pb.set_bcs(ebcs=Conditions([fix_u]))
+    pb.time_update()
+    pb.update_materials()
+
+    pb.equations.init_state()
+    state = pb.equations.create_vec()
+    state[:] = nm.random.default_rng(0).random(len(state))
+    keys = ['assembly_threads', 'assembly_scatter_index',
+            'assembly_chunk_size']
+    options0 = {key : goptions[key] for key in keys}
+
+    results = []
+    try:
+        for options in [(1, False, None), (3, False, None), (1, True, None),
+                        (1, False, 100), (3, True, 100)]:
+            for key, val in zip(keys, options):
+                goptions[key] = val
+
+            mtx = pb.mtx_a.copy()
+            # Repeated assembling reuses the cached scatter index or thread
+            # cells.
+            pb.equations.eval_tangent_matrices(state, mtx)
+            if options[1]:
+                indices = {key : item[3] for key, item
+                           in mtx._sfepy_scatter_indices.items()}
+                if options[2] is not None:
+                    # Each chunk has its own entry.
+                    assert len(indices) > 1
+
+            pb.equations.eval_tangent_matrices(state, mtx)
+            if options[1]:
+                cache = mtx._sfepy_scatter_indices
+                assert cache.keys() == indices.keys()
+                assert all(cache[key][3] is index
+                           for key, index in indices.items())
+
+            if (options[0] > 1) and not options[1]:
+                assert len(mtx._sfepy_thread_cells) > 0
+            vec = pb.equations.eval_residuals(state)
+            results.append((mtx, vec))
+
+    finally:
+        for key, val in options0.items():
+            goptions[key] = val
+
+    mtx0, vec0 = results[0]
+    for mtx, vec in results[1:]:
+        assert nm.allclose(mtx0.data, mtx.data, rtol=1e-12, atol=1e-14)
+        assert nm.allclose(vec0, vec, rtol=1e-12, atol=1e-14)
+
+def test_profile_terms(data):
+    from sfepy.base.base import IndexedStruct, goptions
+    from sfepy.discrete import (FieldVariable, Material, Problem,
+                                Equation, Equations, Integral)
+    from sfepy.discrete.conditions import Conditions, EssentialBC
+    from sfepy.terms import Term
+    from sfepy.solvers.ls import ScipyDirect
+    from sfepy.solvers.nls import Newton
+    from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+    u = FieldVariable('u', 'unknown', data.field)
+    v = FieldVariable('v', 'test', data.field, primary_var_name='u')
+
+    m = Material('m', D=stiffness_from_lame(data.dim, 1.0, 1.0))
+    f = Material('f', val=[[0.02], [0.01]])
+
+    fix_u = EssentialBC('fix_u', data.gamma1, {'u.all' : 0.0})
+
+    integral = Integral('i', order=3)
+
+    t1 = Term.new('dw_lin_elastic(m.D, v, u)',
+                  integral, data.omega, m=m, v=v, u=u)
+    t2 = Term.new('dw_volume_lvf(f.val, v)', integral, data.omega, f=f, v=v)
+
+    eqs = Equations([Equation('balance', t1 + t2)])
+
+    pb = Problem('elasticity', equations=eqs)
+    pb.set_bcs(ebcs=Conditions([fix_u]))
+    pb.set_solver(Newton({}, lin_solver=ScipyDirect({})))
+    pb.conf.options['profile_terms'] = True
+
+    status = IndexedStruct()
+    pb.solve(status=status, save_results=False)
+    assert not goptions['profile_terms']
+
+    stats = status.term_stats
+    n_cell = data.omega.cells.shape[0]
+    keys = ['balance: %s [%s]' % (term.get_str(), mode)
+            for term, mode in [(t1, 'vector'), (t1, 'matrix'),
+                               (t2, 'vector')]]
+    for key in keys:
+        assert key in stats
+        item = stats[key]
+        assert item['n_call'] >= 1
+        assert item['n_cell'] == item['n_call'] * n_cell
+        assert item['nbytes'] > 0
+        assert nm.isclose(item['time'], item['get_fargs'] + item['eval']
+                          + item['assemble'])
+
+    # The matrix-only term is not evaluated in the vector mode.
+    assert ('balance: %s [matrix]' % t2.get_str()) not in stats
+
+    # The option is restored also when the solution fails.
+    def step_hook(pb, ts, variables):
+        raise ValueError('step hook failed!')
+
+    with pytest.raises(ValueError):
+        pb.solve(save_results=False, step_hook=step_hook)
+    assert not goptions['profile_terms']
+
+def test_eterm_plan(data):
+    from sfepy.discrete import FieldVariable, Material, Integral
+    from sfepy.terms import Term
+    from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+    u = FieldVariable('u', 'unknown', data.field)
+    v = FieldVariable('v', 'test', data.field, primary_var_name='u')
+    u.set_data(nm.random.default_rng(0).random(u.n_dof))
+
+    m = Material('m', D=stiffness_from_lame(data.dim, 1.0, 1.0))
+    integral = Integral('i', order=3)
+
+    vals = {}
+    for plan in [False, True]:
+        term = Term.new('de_lin_elastic(m.D, v, u)',
+                        integral, data.omega, m=m, v=v, u=u)
+        term.setup()
+        term.set_backend(backend='numpy', plan=plan)
+
+        for ii in range(2):
+            vec = term.evaluate(mode='weak')[0]
+            mtx = term.evaluate(mode='weak', diff_var='u')[0]
+
+        # Repeated evaluations reuse the memoized contraction paths.
+        assert len(term.einfos[None].path_cache) == 1
+        assert len(term.einfos['u'].path_cache) == 1
+
+        vals[plan] = (vec, mtx)
+
+    assert nm.allclose(vals[False][0], vals[True][0], rtol=1e-13, atol=1e-14)
+    assert nm.allclose(vals[False][1], vals[True][1], rtol=1e-13, atol=1e-14)
+
+def test_async_output(data, output_dir):
+    from sfepy.discrete import (FieldVariable, Material, Problem, Function,
+                                Equation, Equations, Integral)
+    from sfepy.discrete.conditions import Conditions, EssentialBC
+    from sfepy.discrete.fem.meshio import MeshIO
+    from sfepy.terms import Term
+    from sfepy.solvers.ls import ScipyDirect
+    from sfepy.solvers.nls import Newton
+    from sfepy.solvers.ts_solvers import SimpleTimeSteppingSolver
+    from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+    def get_shift(ts, coors, **kwargs):
+        return nm.full(len(coors), 0.1 * ts.time)
+
+    u = FieldVariable('u', 'unknown', data.field)
+    v = FieldVariable('v', 'test', data.field, primary_var_name='u')
+
+    m = Material('m', D=stiffness_from_lame(data.dim, 1.0, 1.0))
+    fix_u = EssentialBC('fix_u', data.gamma1, {'u.all' : 0.0})
+    shift_u = EssentialBC('shift_u', data.gamma2,
+                          {'u.0' : Function('get_shift', get_shift)})
+
+    integral = Integral('i', order=3)
+    t1 = Term.new('dw_lin_elastic(m.D, v, u)',
+                  integral, data.omega, m=m, v=v, u=u)
+    eqs = Equations([Equation('balance', t1)])
+
+    def post_process(out, pb, state, extend=False):
+        out['u_norm'] = out['u'].copy()
+        out['u_norm'].data = nm.linalg.norm(out['u'].data, axis=1)[:, None]
+        return out
+
+    results = {}
+    for async_output in [False, True, 3]:
+        for hook in [None, post_process]:
+            pb = Problem('elasticity', equations=eqs)
+            pb.set_bcs(ebcs=Conditions([fix_u, shift_u]))
+            nls = Newton({}, lin_solver=ScipyDirect({}))
+            tss = SimpleTimeSteppingSolver({'t0' : 0.0, 't1' : 1.0,
+                                            'n_step' : 5},
+                                           nls=nls, context=pb)
+            pb.set_solver(tss)
+            pb.conf.options['async_output'] = async_output
+
+            trunk = 'test_async_output_%s_%s' % (async_output,
+                                                 hook is not None)
+            pb.setup_output(output_dir=output_dir,
+                            output_filename_trunk=trunk, output_format='h5')
+            pb.solve(post_process_hook=hook)
+            assert pb.output_writer is None
+
+            io = MeshIO.any_from_filename(pb.get_output_name())
+            steps = io.read_times()[0]
+            assert len(steps) == 5
+            results[async_output, hook] = [io.read_data(step)
+                                           for step in steps]
+
+    for key, val in results.items():
+        val0 = results[False, key[1]]
+        for out, out0 in zip(val, val0):
+            assert sorted(out.keys()) == sorted(out0.keys())
+            for name in out0.keys():
+                assert nm.array_equal(out[name].data, out0[name].data)
+
+    assert not nm.allclose(results[False, None][1]['u'].data,
+                           results[False, None][4]['u'].data)
+
+    # An exception raised when saving the results stops the solution.
+    pb.output_dir = op.join(output_dir, 'nonexistent')
+    with pytest.raises(OSError):
+        pb.solve()
+    assert pb.output_writer is None
+
+def test_async_output_moving_mesh(data, output_dir):
+    import time
+    from sfepy.discrete import (FieldVariable, Material, Problem,
+                                Equation, Equations, Integral)
+    from sfepy.discrete.conditions import Conditions, EssentialBC
+    from sfepy.discrete.fem import Mesh
+    from sfepy.terms import Term
+    from sfepy.solvers.ls import ScipyDirect
+    from sfepy.solvers.nls import Newton
+    from sfepy.solvers.ts_solvers import SimpleTimeSteppingSolver
+    from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+    u = FieldVariable('u', 'unknown', data.field)
+    v = FieldVariable('v', 'test', data.field, primary_var_name='u')
+
+    m = Material('m', D=stiffness_from_lame(data.dim, 1.0, 1.0))
+    fix_u = EssentialBC('fix_u', data.gamma1, {'u.all' : 0.0})
+    shift_u = EssentialBC('shift_u', data.gamma2, {'u.0' : 0.1})
+
+    integral = Integral('i', order=3)
+    t1 = Term.new('dw_lin_elastic(m.D, v, u)',
+                  integral, data.omega, m=m, v=v, u=u)
+    eqs = Equations([Equation('balance', t1)])
+
+    domain = data.omega.domain
+    coors0 = domain.mesh.coors.copy()
+
+    def move_mesh(pb, ts, state):
+        pb.set_mesh_coors(coors0 + 0.5 * ts.step, update_fields=True)
+        # Delay the output, so that it is pending when the mesh moves.
+        pb.output_writer.write(time.sleep, 0.1)
+
+    pb = Problem('elasticity', equations=eqs)
+    pb.set_bcs(ebcs=Conditions([fix_u, shift_u]))
+    nls = Newton({}, lin_solver=ScipyDirect({}))
+    tss = SimpleTimeSteppingSolver({'t0' : 0.0, 't1' : 1.0, 'n_step' : 5},
+                                   nls=nls, context=pb)
+    pb.set_solver(tss)
+    pb.conf.options['async_output'] = 3
+
+    pb.setup_output(output_dir=output_dir,
+                    output_filename_trunk='test_async_output_moving_mesh',
+                    output_format='vtk')
+    try:
+        pb.solve(step_hook=move_mesh)
+
+    finally:
+        pb.set_mesh_coors(coors0, update_fields=True)
+
+    for step in range(5):
+        filename = pb.get_output_name(suffix=tss.ts.suffix % step)
+        mesh = Mesh.from_file(filename)
+        tst.report('step %d: %s' % (step, filename))
+        assert nm.allclose(mesh.coors, coors0 + 0.5 * step,
+                           rtol=0.0, atol=1e-12)
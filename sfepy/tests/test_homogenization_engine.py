@@ -94,3 +94,104 @@ def test_chunk_micro():
     tst.report('merging chunks:', ok)
 
     assert ok
+
+def test_batch_solve(output_dir):
+    import os.path as op
+    import sfepy
+    from sfepy.base.base import Struct
+    from sfepy.base.conf import ProblemConf, get_standard_keywords
+    from sfepy.homogenization.homogen_app import HomogenizationApp
+
+    required, other = get_standard_keywords()
+    required.remove('equations')
+    filename = op.join(sfepy.base_dir,
+                       'examples/homogenization/linear_homogenization.py')
+
+    options = Struct(output_filename_trunk=None)
+    coefs = {}
+    for batch_solve in [False, True]:
+        conf = ProblemConf.from_file(filename, required, other)
+        conf.options['output_dir'] = output_dir
+        for solver_conf in conf.solvers.values():
+            if solver_conf.name == 'ls':
+                solver_conf.kind = 'ls.scipy_direct'
+        conf.requirements['corrs_rs']['batch_solve'] = batch_solve
+
+        app = HomogenizationApp(conf, options, 'homogen:')
+        coefs[batch_solve] = app().D
+
+    tst.report(coefs[False])
+    tst.report(coefs[True])
+    assert nm.allclose(coefs[True], coefs[False], rtol=1e-12, atol=1e-12)
+
+def test_shared_memory():
+    import pytest
+    import sfepy.base.multiproc_proc as mpp
+
+    if not mpp.use_shared_memory:
+        pytest.skip('shared memory is not available')
+
+    val = {'a' : nm.arange(10.0), 'b' : [nm.eye(3, dtype=nm.int32), 'c']}
+    desc = mpp.put_shared(val)
+    assert mpp.is_shared(desc)
+
+    out = mpp.get_shared(desc, unlink=True)
+    assert nm.all(out['a'] == val['a'])
+    assert nm.all(out['b'][0] == val['b'][0])
+    assert out['b'][0].dtype == nm.int32
+    assert out['b'][1] == 'c'
+
+    out['a'][0] = 1.0
+    assert val['a'][0] == 0.0
+
+def test_multiprocessing(output_dir):
+    import os.path as op
+    import sfepy
+    from sfepy.base.base import Struct
+    from sfepy.base.conf import ProblemConf, get_standard_keywords
+    from sfepy.homogenization.homogen_app import HomogenizationApp
+    import sfepy.base.multiproc as multi
+    import sfepy.base.multiproc_proc as mpp
+
+    required, other = get_standard_keywords()
+    required.remove('equations')
+    filename = op.join(sfepy.base_dir,
+                       'examples/homogenization/linear_homogenization.py')
+
+    # Use two worker processes even on a single CPU.
+    names = ['use_multiprocessing', 'use_multiprocessing_proc',
+             'multiproc_proc', 'get_num_workers']
+    values = [getattr(multi, name, None) for name in names]
+    use_multiprocessing = mpp.use_multiprocessing
+    multi.use_multiprocessing = multi.use_multiprocessing_proc = True
+    multi.multiproc_proc = mpp
+    multi.get_num_workers = lambda: 2
+    mpp.use_multiprocessing = True
+
+    options = Struct(output_filename_trunk=None)
+    coefs = {}
+    try:
+        for multiprocessing in [False, True]:
+            conf = ProblemConf.from_file(filename, required, other)
+            conf.options['output_dir'] = output_dir
+            conf.options['multiprocessing'] = multiprocessing
+            for solver_conf in conf.solvers.values():
+                if solver_conf.name == 'ls':
+                    solver_conf.kind = 'ls.scipy_direct'
+            conf.requirements['corrs_rs']['batch_solve'] = True
+
+            app = HomogenizationApp(conf, options, 'homogen:')
+            coefs[multiprocessing] = app()
+
+    finally:
+        for name, value in zip(names, values):
+            setattr(multi, name, value)
+        mpp.use_multiprocessing = use_multiprocessing
+
+    tst.report(coefs[False].D)
+    tst.report(coefs[True].D)
+    assert multi.multiprocessing_mode == 'proc'
+    for key in ['Volume_total', 'D']:
+        assert nm.allclose(getattr(coefs[True], key),
+                           getattr(coefs[False], key),
+                           rtol=1e-12, atol=1e-12)
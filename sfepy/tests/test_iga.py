@@ -0,0 +1,46 @@
+import os.path as op
+
+import numpy as nm
+
+import sfepy
+import sfepy.base.testing as tst
+
+def test_eval_mapping_data():
+    from sfepy.discrete import Integral
+    from sfepy.discrete.iga.domain import IGDomain
+    import sfepy.discrete.iga.iga as iga
+    import sfepy.discrete.iga.extmods.igac as igac
+
+    ok = True
+    for name, gname in [('patch2d.iga', '2_4'), ('block3d.iga', '3_8')]:
+        domain = IGDomain.from_file(op.join(sfepy.data_dir,
+                                            'meshes/iga', name))
+        nurbs = domain.nurbs
+        integral = Integral('i', order=2 * nurbs.degrees.max())
+        qps, _ = integral.get_qp(gname)
+
+        ucs, indices = iga.get_unique_extraction(nurbs.cs)
+        for ii, cs1d in enumerate(nurbs.cs):
+            cs1d = nm.asarray(cs1d)
+            _ok = nm.allclose(ucs[ii][indices[ii]].reshape(cs1d.shape), cs1d,
+                              rtol=0.0, atol=1e-12)
+            tst.report('%s: %d unique extraction operators of %d: %s'
+                       % (name, len(ucs[ii]), len(cs1d), _ok))
+            ok = ok and _ok
+
+        cells = nm.arange(nurbs.conn.shape[0], dtype=nm.uint32)
+        out0 = igac.eval_mapping_data_in_qp(qps, nurbs.cps, nurbs.weights,
+                                            nurbs.degrees, nurbs.cs,
+                                            nurbs.conn, cells)
+        out1 = iga.eval_mapping_data_in_qp(qps, nurbs.cps, nurbs.weights,
+                                           nurbs.degrees, nurbs.cs,
+                                           nurbs.conn, cells,
+                                           extraction=(ucs, indices),
+                                           n_cell_max=3)
+        for key, val0, val1 in zip(['bfs', 'bfgs', 'dets'], out0, out1):
+            _ok = ((val0.shape == val1.shape)
+                   and nm.allclose(val0, val1, rtol=1e-10, atol=1e-10))
+            tst.report('%s: %s: %s' % (name, key, _ok))
+            ok = ok and _ok
+
+    assert ok
@@ -302,3 +302,113 @@ def test_ls_reuse(problem):
         tst.report('sol0 == 2 * sol2:', _ok); ok = ok and _ok
 
     assert ok
+
+def test_ls_matrix_version(problem):
+    import numpy as nm
+    import scipy.sparse as sp
+    from sfepy.linalg.sparse import get_matrix_version, set_matrix_version
+    from sfepy.solvers import Solver
+
+    problem.init_solvers(ls_conf=problem.solver_confs['d00'])
+    nls = problem.get_nls()
+
+    state0 = problem.get_initial_state()
+    state0.apply_ebc()
+    vec0 = state0.get_state(problem.active_only)
+
+    problem.update_materials()
+
+    rhs = nls.fun(vec0)
+    mtx = nls.fun_grad(vec0)
+    version0 = get_matrix_version(mtx)
+    assert version0 is not None
+
+    ls = Solver.any_from_conf(problem.solver_confs['d00'],
+                              use_presolve=True)
+    sol0 = ls(rhs, mtx=mtx)
+    assert ls.mtx_digest == (id(mtx), version0)
+
+    # Re-assembling the same matrix updates the version.
+    mtx = nls.fun_grad(vec0)
+    version1 = get_matrix_version(mtx)
+    assert version1 > version0
+
+    # In-place change with an explicit version update.
+    mtx.data *= 2.0
+    set_matrix_version(mtx)
+    sol1 = ls(rhs, mtx=mtx)
+    assert ls.mtx_digest == (id(mtx), get_matrix_version(mtx))
+    assert nm.allclose(sol0, 2 * sol1, atol=1e-12, rtol=0.0)
+
+    # Unstamped matrices are hashed.
+    sol2 = ls(rhs, mtx=mtx.copy())
+    assert isinstance(ls.mtx_digest[1], str)
+    assert nm.allclose(sol1, sol2, atol=1e-12, rtol=0.0)
+
+    # The matrix with extra matrices added is stamped as well.
+    def assemble(eq, it, term, asm_obj, *args, **kwargs):
+        term.assemble_to(asm_obj, *args, **kwargs)
+        return sp.eye(asm_obj.shape[0], format='coo')
+
+    mtx0 = problem.mtx_a
+    mtx = problem.equations.eval_tangent_matrices(state0(), mtx0,
+                                                  assemble=assemble)
+    assert mtx is not mtx0
+    version2 = get_matrix_version(mtx)
+    assert version2 is not None
+    assert version2 > get_matrix_version(mtx0)
+
+def test_ls_factorization_cache(problem):
+    import numpy as nm
+    from sfepy.solvers import Solver
+
+    problem.init_solvers(ls_conf=problem.solver_confs['d00'])
+    nls = problem.get_nls()
+
+    state0 = problem.get_initial_state()
+    state0.apply_ebc()
+    vec0 = state0.get_state(problem.active_only)
+
+    problem.update_materials()
+
+    rhs = nls.fun(vec0)
+    mtx1 = nls.fun_grad(vec0).copy()
+    mtx2 = 2 * mtx1
+
+    ls = Solver.any_from_conf(problem.solver_confs['d00'],
+                              use_presolve=True, factorization_cache_size=2)
+    factorize = ls.factorize
+    calls = []
+    def _factorize(mtx):
+        calls.append(mtx)
+        return factorize(mtx)
+    ls.factorize = _factorize
+
+    sol1 = ls(rhs, mtx=mtx1)
+    for ii in range(3):
+        sol2 = ls(rhs, mtx=mtx2)
+        assert nm.allclose(sol1, 2 * sol2, atol=1e-12, rtol=0.0)
+        _sol1 = ls(rhs, mtx=mtx1)
+        assert nm.allclose(sol1, _sol1, atol=1e-12, rtol=0.0)
+
+    assert len(calls) == 2
+    assert len(ls.factors) == 2
+
+    rhss = nm.c_[rhs, 2 * rhs, -rhs]
+    sols = ls.solve_many(rhss, mtx=mtx2)
+    assert len(calls) == 2
+    assert nm.allclose(sols, nm.c_[sol2, 2 * sol2, -sol2],
+                       atol=1e-12, rtol=0.0)
+
+    # The least recently used factorization is removed.
+    ls(rhs, mtx=3 * mtx1)
+    assert len(calls) == 3
+    assert len(ls.factors) == 2
+    ls(rhs, mtx=mtx1)
+    assert len(calls) == 4
+
+    ls.conf.factorization_cache_memory = 0.0
+    ls.clear()
+    ls(rhs, mtx=mtx1)
+    ls(rhs, mtx=mtx2)
+    assert len(ls.factors) == 1
@@ -77,3 +77,47 @@ def test_linearization(output_dir):
                 vmesh.write(name + '.vtk', out=out)
 
     assert ok
+
+def test_uniform_linearization():
+    from sfepy.discrete.fem import Mesh, FEDomain, Field
+    from sfepy.discrete.fem.linearizer import (get_eval_dofs, get_eval_coors,
+                                               create_output)
+    from sfepy import data_dir
+
+    ok = True
+    for name, order, basis in [('2d/square_quad.mesh', 3, 'lagrange'),
+                               ('2d/square_quad.mesh', 3, 'lobatto'),
+                               ('3d/block.mesh', 2, 'lagrange')]:
+        mesh = Mesh.from_file(os.path.join(data_dir, 'meshes', name))
+        domain = FEDomain('', mesh)
+        omega = domain.create_region('Omega', 'all')
+        field = Field.from_args('fu', nm.float64, 2, omega,
+                                approx_order=order, poly_space_basis=basis)
+        dofs = nm.random.default_rng(0).random((field.n_nod, 2))
+
+        for level in [0, 2]:
+            vmesh, vdofs, _level = field.linearize(dofs, level, level)
+
+            eval_dofs = get_eval_dofs(dofs, field.econn, field.poly_space,
+                                      ori=field.ori)
+            eval_coors = get_eval_coors(field.coors[:field.n_vertex_dof],
+                                        field.econn[:, :field.gel.n_vertex],
+                                        field.gel.poly_space)
+            _, coors, conn, vdofs0, _ = create_output(
+                eval_dofs, eval_coors, field.econn.shape[0],
+                field.poly_space, min_level=level, max_level=level,
+            )
+            _ok = ((_level == level)
+                   and nm.allclose(vmesh.coors, coors, rtol=0, atol=1e-14)
+                   and nm.array_equal(vmesh.get_conn(vmesh.descs[0]), conn)
+                   and nm.allclose(vdofs, vdofs0, rtol=0, atol=1e-13))
+
+            # The mesh and the evaluation matrix are reused.
+            vmesh2, vdofs2, _ = field.linearize(2 * dofs, level, level)
+            _ok = (_ok and (vmesh2 is vmesh)
+                   and nm.allclose(vdofs2, 2 * vdofs, rtol=0, atol=1e-13))
+            tst.report('%s %s order %d level %d: %s'
+                       % (name, basis, order, level, _ok))
+            ok = ok and _ok
+
+    assert ok
@@ -354,3 +354,61 @@ def test_evaluate_at():
         ok = ok and _ok
 
     assert ok
+
+def test_point_locator():
+    from sfepy import data_dir
+    from sfepy.discrete.fem import Mesh, FEDomain, Field
+    from sfepy.discrete.fem.fields_base import set_mesh_coors
+
+    mesh = Mesh.from_file(data_dir + '/meshes/3d/block.mesh')
+    domain = FEDomain('d', mesh)
+    omega = domain.create_region('Omega', 'all')
+
+    field = Field.from_args('f', nm.float64, (3, 1), omega, approx_order=2)
+
+    coors = field.get_coor()
+    source_vals = nm.c_[nm.sin(coors[:, 0]), coors[:, 1] ** 2,
+                        coors[:, 0] * coors[:, 2]]
+
+    bbox = domain.get_mesh_bounding_box()
+    points = nm.random.RandomState(0).uniform(bbox[0] - 0.1 * bbox[1],
+                                              1.1 * bbox[1], size=(200, 3))
+
+    locator = field.create_point_locator(points)
+    assert locator.is_valid()
+
+    ok = True
+    for mode in ['val', 'grad', 'div', 'cauchy_strain']:
+        for svals in [source_vals, source_vals * (1.0 + 2.0j)]:
+            vals0, st0 = field.evaluate_at(points, svals, mode=mode,
+                                           ret_status=True)[::2]
+            vals1, st1 = field.evaluate_at(None, svals, mode=mode,
+                                           ret_status=True,
+                                           locator=locator)[::2]
+            _ok = (nm.array_equal(st1, st0)
+                   and nm.allclose(vals1, vals0, rtol=0.0, atol=1e-12))
+            tst.report('locator mode %s, %s: %s'
+                       % (mode, svals.dtype, _ok))
+            ok = ok and _ok
+
+    # Moving the mesh invalidates the locator.
+    domain.cmesh.coors[:] *= 1.5
+    field.set_coors(coors * 1.5)
+    assert not locator.is_valid()
+
+    vals0 = field.evaluate_at(points, source_vals)
+    vals1 = field.evaluate_at(None, source_vals, locator=locator)
+    assert locator.is_valid()
+    _ok = nm.allclose(vals1, vals0, rtol=0.0, atol=1e-12, equal_nan=True)
+    tst.report('locator after mesh change: %s' % _ok)
+    ok = ok and _ok
+
+    # The repeated evaluation does not relocate the points.
+    assert not locator.update()
+
+    set_mesh_coors(domain, {'f' : field}, domain.mesh.coors / 1.5,
+                   update_fields=True)
+    assert not locator.is_valid()
+    assert locator.update()
+
+    assert ok
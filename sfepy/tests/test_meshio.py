@@ -415,3 +415,98 @@ def test_hdf5_meshio():
     for key, val in out2.items():
         tst.report('comparing:', key)
         tst.assert_equal(val, data[key])
+
+def test_hdf5_time_series_meshio(output_dir):
+    import numpy as nm
+    from sfepy.base.base import Struct
+    from sfepy.discrete.fem import Mesh
+    from sfepy.discrete.fem.meshio import (MeshIO, HDF5MeshIO,
+                                           HDF5TimeSeriesMeshIO, dec)
+    from sfepy.solvers.ts import TimeStepper
+
+    conf_dir = op.dirname(__file__)
+    mesh = Mesh.from_file(data_dir + '/meshes/various_formats/small3d.mesh',
+                          prefix_dir=conf_dir)
+    n_nod, n_el = mesh.n_nod, mesh.n_el
+
+    filenames = [op.join(output_dir, 'test_ts.h5'),
+                 op.join(output_dir, 'test_ts.h5ts')]
+    ios = [MeshIO.any_from_filename(filename) for filename in filenames]
+    assert_(type(ios[0]) is HDF5MeshIO)
+    assert_(type(ios[1]) is HDF5TimeSeriesMeshIO)
+
+    ts = TimeStepper(0.0, 1.0, n_step=5)
+    for step, time in ts:
+        out = {
+            'u' : Struct(name='output_data', mode='vertex',
+                         data=nm.full((n_nod, 3), time), dofs=None,
+                         var_name='u'),
+            's' : Struct(name='output_data', mode='cell',
+                         data=nm.full((n_el, 1, 6, 1), step + 1.0),
+                         dofs=None),
+        }
+        for filename, io in zip(filenames, ios):
+            mesh.write(filename, io=io, out=out, ts=ts)
+
+    assert_(op.abspath(filenames[1]) in HDF5TimeSeriesMeshIO._files)
+    # The metadata are written only on closing.
+    fd = HDF5TimeSeriesMeshIO._files[op.abspath(filenames[1])]
+    assert_(dec(fd.root.tstat.finished.read()) == '.' * 24)
+    assert_(fd.root.last_step[0] == 0)
+
+    io0, io1 = ios
+    assert_(_compare_meshes(io1.read(), mesh))
+    assert_(op.abspath(filenames[1]) not in HDF5TimeSeriesMeshIO._files)
+    with io1._open_file() as fd:
+        assert_(dec(fd.root.tstat.finished.read()) != '.' * 24)
+
+    for val0, val1 in zip(io0.read_times(), io1.read_times()):
+        tst.assert_equal(val1, val0)
+
+    assert_(io1.read_last_step() == io0.read_last_step())
+    assert_(io1.read_time_stepper() == io0.read_time_stepper())
+
+    out0 = io0.read_data(3)
+    out1 = io1.read_data(3)
+    assert_(set(out1.keys()) == set(out0.keys()))
+    for key, val0 in out0.items():
+        val1 = out1[key]
+        assert_(val1.mode == val0.mode)
+        assert_(val1.shape == val0.shape)
+        assert_(val1.dofs == val0.dofs)
+        tst.assert_equal(val1.data, val0.data)
+
+    assert_(io1.read_data(10) is None)
+
+    for name, indx in [('u', [4, 0]), ('s', [1, 2])]:
+        mode0, node0 = io0.read_data_header(name)
+        mode1, node1 = io1.read_data_header(name)
+        assert_(mode1 == mode0)
+        th0 = io0.read_time_history(node0, indx)
+        th1 = io1.read_time_history(node1, indx)
+        assert_(set(th1.keys()) == set(th0.keys()))
+        for ii in indx:
+            tst.assert_equal(th1[ii], th0[ii])
+
+    ths0 = io0.read_variables_time_history(['u', 's'], ts)
+    ths1 = io1.read_variables_time_history(['u', 's'], ts)
+    for key, val0 in ths0.items():
+        tst.assert_equal(nm.array(ths1[key]), nm.array(val0))
+
+    # Appending to a closed file reopens it.
+    ts1 = Struct(step=ts.n_step, time=1.25, nt=1.25)
+    mesh.write(filenames[1], io=io1, out=out, ts=ts1)
+    steps, times, nts = io1.read_times()
+    tst.assert_equal(steps, nm.arange(ts.n_step + 1))
+    assert_(io1.read_last_step() == ts.n_step)
+
+    try:
+        mesh.write(filenames[1], io=io1, out=out, ts=ts1)
+
+    except ValueError:
+        pass
+
+    else:
+        raise AssertionError('duplicate step saved!')
+
+    HDF5TimeSeriesMeshIO.close()
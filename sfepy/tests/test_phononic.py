@@ -0,0 +1,278 @@
+import numpy as nm
+import pytest
+
+from sfepy.discrete.fem.meshio import UserMeshIO
+from sfepy.mesh.mesh_generators import gen_block_mesh
+import sfepy.base.testing as tst
+
+def mesh_hook(mesh, mode):
+    """
+    Generate the block mesh.
+    """
+    if mode == 'read':
+        mesh = gen_block_mesh([1, 1], [7, 7], [0, 0], name='user_block',
+                              verbose=False)
+        return mesh
+
+    elif mode == 'write':
+        pass
+
+filename_mesh = UserMeshIO(mesh_hook)
+
+regions = {
+    'Omega' : 'all',
+    'Left' : ('vertices in (x < -0.499)', 'facet'),
+}
+
+materials = {
+    'm' : ({'D' : nm.array([[3.0, 1.0, 0.0],
+                            [1.0, 3.0, 0.0],
+                            [0.0, 0.0, 1.0]]),
+            'rho' : 2.0,
+            'c' : 0.5},),
+}
+
+fields = {
+    'displacement' : ('real', 'vector', 'Omega', 1),
+    'potential' : ('real', 'scalar', 'Omega', 1),
+}
+
+variables = {
+    'u' : ('unknown field', 'displacement', 0),
+    'v' : ('test field', 'displacement', 'u'),
+    'p' : ('unknown field', 'potential', 1),
+    'q' : ('test field', 'potential', 'p'),
+}
+
+ebcs = {
+    'fixed' : ('Left', {'u.all' : 0.0}),
+}
+
+integrals = {
+    'i' : 2,
+}
+
+equations = {
+    'eq' : 'dw_lin_elastic.i.Omega(m.D, v, u) = 0',
+}
+
+solvers = {
+    'ls' : ('ls.scipy_direct', {}),
+    'newton' : ('nls.newton', {}),
+}
+
+equations_evp = {
+    'lhs' : 'dw_lin_elastic.i.Omega(m.D, v, u)',
+    'rhs' : 'dw_dot.i.Omega(m.rho, v, u)',
+}
+
+equations_schur = {
+    'K,v,u' : 'dw_lin_elastic.i.Omega(m.D, v, u) = 0',
+    'B,q,u' : 'dw_stokes.i.Omega(u, q) = 0',
+    'D,q,p' : 'dw_dot.i.Omega(m.c, q, p) = 0',
+    'M,v,u' : 'dw_dot.i.Omega(m.rho, v, u) = 0',
+}
+
+@pytest.fixture(scope='module')
+def problem(output_dir):
+    import sys
+    from sfepy.discrete import Problem
+    from sfepy.base.conf import ProblemConf
+
+    conf = ProblemConf.from_dict(globals(), sys.modules[__name__])
+    conf.options['output_dir'] = output_dir
+    pb = Problem.from_conf(conf, init_equations=False, init_solvers=False)
+
+    return pb
+
+def _solve_evp(problem, cls, equations, options):
+    evp = cls('evp', problem, {'equations' : equations,
+                               'ebcs' : ['fixed'],
+                               'epbcs' : None,
+                               'save_name' : 'evp',
+                               'options' : options})
+    evp.setup_output(save_formats=['vtk'])
+    return evp, evp()
+
+def test_simple_evp(problem):
+    import sfepy.homogenization.coefs_phononic as cp
+
+    ok = True
+    _, dense = _solve_evp(problem, cp.SimpleEVP, equations_evp, {})
+    _, sparse = _solve_evp(problem, cp.SimpleEVP, equations_evp,
+                           {'n_eigs' : 8})
+
+    tst.report('dense:', dense.eigs[:8])
+    tst.report('sparse:', sparse.eigs)
+
+    _ok = (not dense.is_partial) and sparse.is_partial
+    tst.report('partial spectrum flags:', _ok)
+    ok = ok and _ok
+
+    _ok = ((len(sparse.eigs) == 8)
+           and nm.allclose(sparse.eigs, dense.eigs[:8], rtol=1e-10,
+                           atol=1e-10))
+    tst.report('smallest eigenvalues match:', _ok)
+    ok = ok and _ok
+
+    assert ok
+
+def test_schur_evp(problem):
+    import scipy.linalg as sla
+    import sfepy.homogenization.coefs_phononic as cp
+
+    ok = True
+    schur = {'primary_var' : 'u', 'eliminated_var' : 'p'}
+    _, sparse = _solve_evp(problem, cp.SchurEVP, equations_schur,
+                           {'schur' : schur, 'n_eigs' : 8})
+    app, dense = _solve_evp(problem, cp.SchurEVP, equations_schur,
+                            {'schur' : schur})
+    mtx_s, _, _ = app.prepare_matrices(problem)
+
+    mtx = problem.equations.eval_tangent_matrices(None, problem.mtx_a,
+                                                  by_blocks=True)
+    mtx_k, mtx_b, mtx_d, mtx_m = [mtx[key].toarray() for key in 'KBDM']
+    mtx_a = mtx_k + mtx_b.T @ nm.linalg.solve(mtx_d, mtx_b)
+
+    _ok = nm.allclose(mtx_s.toarray(), mtx_a, rtol=1e-12, atol=1e-12)
+    tst.report('Schur complement matches:', _ok)
+    ok = ok and _ok
+
+    _ok = mtx_s.nnz == nm.count_nonzero(mtx_s.toarray())
+    tst.report('no explicit zeros:', _ok)
+    ok = ok and _ok
+
+    eigs = sla.eigh(mtx_a, mtx_m, eigvals_only=True)
+    tst.report('expected:', eigs[:8])
+    tst.report('dense:', dense.eigs[:8])
+    tst.report('sparse:', sparse.eigs)
+
+    _ok = (nm.allclose(dense.eigs, eigs, rtol=1e-8, atol=1e-8)
+           and nm.allclose(sparse.eigs, eigs[:8], rtol=1e-8, atol=1e-8))
+    tst.report('eigenvalues match:', _ok)
+    ok = ok and _ok
+
+    assert ok
+
+def test_band_gaps_range():
+    from sfepy.base.base import Struct
+    import sfepy.homogenization.coefs_phononic as cp
+
+    ok = True
+    evp = Struct(eigs=nm.arange(1.0, 11.0), is_partial=True)
+    data = {'evp' : evp, 'c.eigenmomenta' : None, 'c.M' : None}
+
+    bg = cp.BandGaps('band_gaps', None,
+                     {'requires' : ['evp', 'c.eigenmomenta', 'c.M'],
+                      'options' : {}})
+    bg.fix_eig_range(len(evp.eigs), is_partial=True)
+    _ok = tuple(bg.app_options.eig_range) == (0, 9)
+    tst.report('default eigenvalue range of partial spectrum:',
+               bg.app_options.eig_range, _ok)
+    ok = ok and _ok
+
+    bg = cp.BandGaps('band_gaps', None,
+                     {'requires' : ['evp', 'c.eigenmomenta', 'c.M'],
+                      'options' : {'eig_range' : (0, 10)}})
+    try:
+        bg(data=data)
+
+    except ValueError as exc:
+        tst.report('range not covered:', exc)
+
+    else:
+        tst.report('range not covered, but no error raised!')
+        ok = False
+
+    assert ok
+
+def test_zero_bracket():
+    import sfepy.homogenization.coefs_phononic as cp
+
+    ok = True
+    log_freqs = nm.linspace(0.0, 1.0, 11)
+    log_eigs = [nm.array([f - 0.55, f - 0.35]) for f in log_freqs]
+
+    for mode, expected in [(0, (0.5, 0.6)), (1, (0.3, 0.4))]:
+        bracket = cp.get_zero_bracket(log_freqs, log_eigs, mode)
+        _ok = (bracket is not None) and nm.allclose(bracket, expected)
+        tst.report('mode %d: bracket %s: %s' % (mode, bracket, _ok))
+        ok = ok and _ok
+
+    bracket = cp.get_zero_bracket(log_freqs, [eigs + 1.0 for eigs in log_eigs],
+                                  0)
+    _ok = bracket is None
+    tst.report('no sign change: bracket %s: %s' % (bracket, _ok))
+    ok = ok and _ok
+
+    log_mevp = cp.trace_freqs(lambda f: (nm.array([f - 0.55, f - 0.35]),),
+                              log_freqs)
+    _ok = ((len(log_mevp) == 1)
+           and nm.allclose(nm.array(log_mevp[0]), nm.array(log_eigs)))
+    tst.report('traced eigenvalues: %s' % _ok)
+    ok = ok and _ok
+
+    assert ok
+
+def test_band_gaps_parallel(output_dir):
+    import os.path as op
+    import sfepy
+    from sfepy.base.base import Struct
+    from sfepy.base.conf import ProblemConf, get_standard_keywords
+    from sfepy.homogenization.band_gaps_app import AcousticBandGapsApp
+    import sfepy.base.multiproc_proc as multi
+
+    required, other = get_standard_keywords()
+    required.remove('equations')
+    filename = op.join(sfepy.base_dir, 'examples/phononic/band_gaps.py')
+
+    options = Struct(output_filename_trunk=None,
+                     save_ebc=False,
+                     save_ebc_nodes=False,
+                     save_regions=False,
+                     save_regions_as_groups=False,
+                     solve_not=False,
+                     detect_band_gaps=True,
+                     analyze_dispersion=False,
+                     phase_velocity=False,
+                     plot=False)
+
+    # Use the process pool even on a single CPU.
+    use_multiprocessing = multi.use_multiprocessing
+    multi.use_multiprocessing = True
+    try:
+        bgs = []
+        for bg_options in [{}, {'n_workers' : 2, 'warm_start' : True}]:
+            conf = ProblemConf.from_file(filename, required, other)
+            conf.options['output_dir'] = output_dir
+            conf.coefs['band_gaps']['options'].update(eig_range=(0, 10),
+                                                     freq_step=1.0,
+                                                     **bg_options)
+            app = AcousticBandGapsApp(conf, options, 'phonon:')
+            coefs = app()
+            bgs.append(coefs.band_gaps)
+
+    finally:
+        multi.use_multiprocessing = use_multiprocessing
+
+    serial, parallel = bgs
+
+    ok = True
+    _ok = serial.kinds == parallel.kinds
+    tst.report('gap kinds match:', _ok)
+    ok = ok and _ok
+
+    _ok = all(nm.allclose(nm.array(gap0, dtype=nm.float64),
+                          nm.array(gap1, dtype=nm.float64),
+                          rtol=1e-10, atol=1e-8)
+              for gap0, gap1 in zip(serial.gaps, parallel.gaps))
+    tst.report('gaps match:', _ok)
+    ok = ok and _ok
+
+    _ok = all(nm.allclose(log0, log1, rtol=1e-10, atol=1e-8)
+              for log0, log1 in zip(serial.logs.eigs + serial.logs.freqs,
+                                    parallel.logs.eigs + parallel.logs.freqs))
+    tst.report('logs match:', _ok)
+    ok = ok and _ok
+
+    assert ok
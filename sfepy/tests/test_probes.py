@@ -0,0 +1,118 @@
+import os.path as op
+
+import numpy as nm
+
+from sfepy.base.base import Struct
+import sfepy.base.testing as tst
+
+def _get_data(coors, step):
+    return nm.c_[nm.sin(coors[:, 0] + step), coors[:, 1] * (step + 1)]
+
+def test_probe_time_history(output_dir):
+    from sfepy import data_dir
+    from sfepy.discrete import FieldVariable
+    from sfepy.discrete.fem import Mesh, FEDomain, Field
+    from sfepy.discrete.probes import (LineProbe, PointsProbe,
+                                       probe_time_history,
+                                       write_results_hdf5,
+                                       read_results_hdf5, read_results)
+    from sfepy.solvers.ts import TimeStepper
+
+    mesh = Mesh.from_file(data_dir + '/meshes/2d/square_quad.mesh')
+    domain = FEDomain('domain', mesh)
+    omega = domain.create_region('Omega', 'all')
+    field = Field.from_args('fu', nm.float64, 2, omega, approx_order=1)
+    u = FieldVariable('u', 'parameter', field,
+                      primary_var_name='(set-to-None)')
+
+    ts = TimeStepper(0.0, 1.0, n_step=5)
+
+    ok = True
+    for ext in ['.h5', '.h5ts']:
+        filename = op.join(output_dir, 'probe_results' + ext)
+        for step, time in ts:
+            out = {'u' : Struct(name='output_data', mode='vertex',
+                                data=_get_data(mesh.coors, step),
+                                dofs=None)}
+            mesh.write(filename, io='auto', out=out, ts=ts)
+
+        probes = [LineProbe([-0.4, -0.3], [0.45, 0.5], -5),
+                  PointsProbe([[0.1, 0.2], [-0.3, 0.0], [0.0, 0.4]])]
+
+        steps, times, results = probe_time_history(filename, probes,
+                                                   {'u' : u},
+                                                   n_step_chunk=2)
+        _ok = (nm.array_equal(steps, nm.arange(5))
+               and nm.allclose(times, ts.times))
+        tst.report('%s steps: %s' % (ext, _ok))
+        ok = ok and _ok
+
+        for ip, probe in enumerate(probes):
+            pars, vals = results[ip]['u']
+            for step in steps:
+                u.set_data(_get_data(mesh.coors, step))
+                pars0, vals0 = probe(u)
+                _ok = (nm.allclose(pars, pars0, rtol=0.0, atol=1e-14)
+                       and nm.allclose(vals[step], vals0[..., 0],
+                                       rtol=0.0, atol=1e-12))
+                ok = ok and _ok
+            tst.report('%s probe %d: %s' % (ext, ip, _ok))
+
+        # Write the results in two parts and read them back.
+        filename = op.join(output_dir, 'probe_%d.h5' % ip)
+        write_results_hdf5(filename, probe, {'u' : (pars, vals[:2])},
+                           steps=steps[:2], times=times[:2])
+        write_results_hdf5(filename, probe,
+                           {'u' : (pars, vals[2:])}, steps=steps[2:],
+                           times=times[2:])
+        header, hresults = read_results_hdf5(filename)
+        hsteps, hpars, hvals = hresults['u']
+        _ok = ((header.probe_class == 'PointsProbe')
+               and (header.n_point == 3)
+               and nm.array_equal(header.steps, steps)
+               and nm.array_equal(hsteps, steps)
+               and nm.array_equal(hpars, pars)
+               and nm.array_equal(hvals, vals))
+        header, sresults = read_results(filename, step=3)
+        _ok = _ok and nm.array_equal(sresults['u'], nm.c_[pars, vals[3]])
+        tst.report('%s HDF5 probe file: %s' % (ext, _ok))
+        ok = ok and _ok
+
+    assert ok
+
+def test_probe_shared_geometry():
+    from sfepy import data_dir
+    from sfepy.discrete import FieldVariable
+    from sfepy.discrete.fem import Mesh, FEDomain, Field
+    from sfepy.discrete.probes import LineProbe
+
+    variables = []
+    for name in ['square_quad.mesh', 'square_tri2.mesh']:
+        mesh = Mesh.from_file(data_dir + '/meshes/2d/' + name)
+        domain = FEDomain('domain', mesh)
+        omega = domain.create_region('Omega', 'all')
+        field = Field.from_args('fu', nm.float64, 2, omega, approx_order=1)
+        u = FieldVariable('u', 'parameter', field,
+                          primary_var_name='(set-to-None)')
+        u.set_data(_get_data(field.get_coor(), 0))
+        variables.append(u)
+
+    ok = True
+    probe = LineProbe([-0.4, -0.3], [0.45, 0.5], 7)
+    for ii, u in enumerate(variables + variables[:1]):
+        # Probes sharing the geometry data with the probes of other meshes.
+        pars, vals = LineProbe([-0.4, -0.3], [0.45, 0.5], 7)(u)
+        pars1, vals1 = probe(u)
+        # The local geometry data.
+        pars0, vals0 = LineProbe([-0.4, -0.3], [0.45, 0.5], 7,
+                                 share_geometry=False)(u)
+        points = probe.get_points()[1]
+        expected = _get_data(points, 0)
+        _ok = (nm.allclose(vals, vals0, rtol=0.0, atol=1e-14)
+               and nm.allclose(vals1, vals0, rtol=0.0, atol=1e-14)
+               and nm.allclose(vals0[..., 0], expected, rtol=0.0,
+                               atol=0.2))
+        tst.report('mesh %d: %s' % (ii, _ok))
+        ok = ok and _ok
+
+    assert ok
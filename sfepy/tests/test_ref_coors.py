@@ -127,3 +127,40 @@ def test_ref_coors_iga():
         ok = ok and _ok
 
     assert ok
+
+def test_potential_cells():
+    from sfepy.discrete.fem import Mesh
+
+    mesh = Mesh.from_file('meshes/2d/square_quad.mesh',
+                          prefix_dir=sfepy.data_dir)
+    cmesh = mesh.cmesh
+
+    bbox = mesh.get_bounding_box()
+    coors = nm.random.RandomState(0).uniform(bbox[0] - 0.2, bbox[1] + 0.2,
+                                             size=(100, 2))
+
+    # Brute force reference.
+    centroids = cmesh.get_centroids(2)
+    cc = cmesh.get_cell_conn().indices.reshape(cmesh.n_el, -1)
+    radii = nm.abs(cmesh.coors[cc] - centroids[:, None]).max(axis=(1, 2))
+    dist = nm.abs(coors[:, None] - centroids[None, :]).max(axis=2)
+
+    cmesh.setup_connectivity(0, 2)
+    vconn = cmesh.get_conn(0, 2)
+    ivs = nm.linalg.norm(coors[:, None] - cmesh.coors[None, :],
+                         axis=2).argmin(axis=1)
+
+    for extrapolate in [False, True]:
+        pcs, offsets = gi.get_potential_cells(coors, cmesh,
+                                              extrapolate=extrapolate)
+        assert offsets.shape == (coors.shape[0] + 1,)
+        assert offsets[-1] == len(pcs)
+
+        for ip in range(coors.shape[0]):
+            expected = nm.where(dist[ip] <= radii)[0]
+            if extrapolate and not len(expected):
+                iv = ivs[ip]
+                expected = vconn.indices[vconn.offsets[iv]:
+                                         vconn.offsets[iv+1]]
+
+            assert nm.array_equal(pcs[offsets[ip]:offsets[ip+1]], expected)
@@ -203,6 +203,25 @@ def data():
     return Struct(domains=domains, integral0=integral0, integral=integral,
                   custom_integral=custom_integral)
 
+def _check_chunks(term, vals, diff_var=None):
+    """
+    Check that the term evaluation in cell chunks gives the same values as
+    the evaluation in all cells.
+    """
+    if isinstance(vals, tuple) or (vals.dtype != nm.float64):
+        return True
+
+    cvals = nm.concatenate([
+        chunk.copy() for chunk, iels, status
+        in term.evaluate_chunks(1, diff_var=diff_var, standalone=False)
+    ])
+    ok = (cvals.shape == vals.shape) and nm.allclose(cvals, vals,
+                                                     rtol=1e-12, atol=1e-12)
+    if not ok:
+        tst.report('chunked evaluation differs!')
+
+    return ok
+
 def _test_single_term(data, term_cls, domain, rname):
     from sfepy.terms import Term
     from sfepy.terms.terms import get_arg_kinds
@@ -278,6 +297,7 @@ def _test_single_term(data, term_cls, domain, rname):
 
             else:
                 vals, iels, status = out
+                ok = _check_chunks(term, vals) and ok
 
             if isinstance(vals, tuple):
                 # Dynamic connectivity terms.
@@ -304,6 +324,7 @@ def _test_single_term(data, term_cls, domain, rname):
                     vals, iels, status = term.evaluate(mode=call_mode,
                                                        diff_var=svar.name,
                                                        ret_status=True)
+                    ok = _check_chunks(term, vals, diff_var=svar.name) and ok
                     if isinstance(vals, tuple):
                         # Dynamic connectivity terms.
                         vals = vals[0]
@@ -323,6 +344,58 @@ def _test_single_term(data, term_cls, domain, rname):
 
     return ok
 
+def test_chunk_fargs(data):
+    from sfepy.discrete.common.mappings import PyCMapping
+    from sfepy.terms import Term, term_table
+    from sfepy.terms.terms import get_arg_kinds
+
+    ok = True
+
+    domain = data.domains[4]
+    term_cls = term_table['dw_laplace']
+    ats = term_cls.arg_types[0]
+    args, str_args, materials, variables = make_term_args(
+        term_cls.arg_shapes[0], get_arg_kinds(ats), ats, None, domain,
+        poly_space_basis='lagrange',
+    )
+    term = Term.new('dw_laplace(%s)' % ', '.join(str_args), data.integral,
+                    domain.regions['Omega'], **args)
+    term.setup()
+    term.standalone_setup()
+
+    varr, diff_var, shape = term.get_weak_shape(None)
+    n_el = shape[0]
+    fargs = term.call_get_fargs(tuple(term.get_args())
+                                + ('weak', None, diff_var), {})
+    cg = [arg for arg in fargs if isinstance(arg, PyCMapping)][0]
+
+    cfargs = term.get_chunk_fargs(fargs, n_el, 1, 2)
+    _ok = cfargs is not None
+    tst.report('declared cell data:', _ok)
+    ok = ok and _ok
+    if _ok:
+        _ok = all((arg.n_el == 1) if isinstance(arg, PyCMapping)
+                  else (arg.shape[0] == 1) if isinstance(arg, nm.ndarray)
+                  else True for arg in cfargs)
+        tst.report('cell data sliced:', _ok)
+        ok = ok and _ok
+
+    conn = nm.zeros((n_el, cg.n_ep), dtype=nm.int32)
+    vec = nm.zeros(n_el, dtype=nm.float64)
+    cfargs = term.get_chunk_fargs(list(fargs) + [conn], n_el, 1, 2)
+    _ok = (cfargs is not None) and (cfargs[-1].shape[0] == 1)
+    tst.report('cell connectivity sliced:', _ok)
+    ok = ok and _ok
+
+    # An array with n_el rows, that is not declared cell data, is not sliced,
+    # the chunked evaluation is not possible.
+    for arg in [vec, nm.zeros((n_el, 2)), (conn,)]:
+        _ok = term.get_chunk_fargs(list(fargs) + [arg], n_el, 1, 2) is None
+        tst.report('undeclared cell data not sliced:', _ok)
+        ok = ok and _ok
+
+    assert ok
+
 @pytest.mark.slow
 def test_term_call_modes(data):
     from sfepy.terms import term_table